@@ -0,0 +1,72 @@
+import sys
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import time
+
+from BenchmarkCPlusPlusInput import driver, create_input, run
+
+usage = """Usage: python BenchmarkCPlusPlusForms.py [MEGABYTES] [RULES_FILE INPUT_FILE]
+MEGABYTES: size of the C source generated as input (default 32).
+RULES_FILE INPUT_FILE: optionally, a rules file to benchmark instead of the C
+    lexer in Example/CLexer, and a file for it to read.
+Generates the lexer with the cpp plug-in in each of its code forms, and
+compares the size of the generated source, the time $CXX (default g++) takes
+to compile it with -O2, the size of the object file, and how fast it reads and
+lexes a large file, in megabytes per second.
+"""
+
+code_forms = ['switch', 'table', 'goto']
+
+def build(rules_file, code_form, directory):
+    """
+    Generates the C++ lexer for a rules file in a code form, and compiles it with the benchmark driver
+    @param rules_file: path to the rules file
+    @param code_form: string containing the code form to pass to --code-form
+    @param directory: directory in which to generate and compile the lexer
+    @return: a tuple with the size of the generated source in bytes, the time taken to compile it in seconds,
+        the size of the object file in bytes, and the path of the compiled executable.
+    """
+    os.mkdir(directory)
+    command = [sys.executable, os.path.join('..', '__main__.py'), '-l', 'cpp', '--code-form', code_form, rules_file, directory]
+    with open(os.devnull, 'w') as null:
+        subprocess.check_call(command, stdout=null)
+    with open(os.path.join(directory, 'driver.cpp'), 'w') as f:
+        f.write(driver)
+    compiler = os.environ.get('CXX', 'g++')
+    start = time.time()
+    subprocess.check_call([compiler, '-O2', '-c', '-o', 'LexicalAnalyzer.o', 'LexicalAnalyzer.cpp'], cwd=directory)
+    compile_time = time.time() - start
+    executable = os.path.join(directory, 'driver')
+    subprocess.check_call([compiler, '-O2', '-o', executable, 'driver.cpp', 'LexicalAnalyzer.o'], cwd=directory)
+    source_size = os.path.getsize(os.path.join(directory, 'LexicalAnalyzer.cpp'))
+    object_size = os.path.getsize(os.path.join(directory, 'LexicalAnalyzer.o'))
+    return source_size, compile_time, object_size, executable
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    megabytes = 32
+    if len(arguments) in (1, 3) and arguments[0].isdigit():
+        megabytes = int(arguments.pop(0))
+    if len(arguments) not in (0, 2):
+        print usage
+        sys.exit(1)
+
+    directory = tempfile.mkdtemp()
+    try:
+        if len(arguments) == 2:
+            rules_file, input_file = [os.path.realpath(i) for i in arguments]
+        else:
+            rules_file = os.path.realpath(os.path.join('..', 'Example', 'CLexer', 'CLexer.rules'))
+            input_file = os.path.join(directory, 'input.c')
+            create_input(input_file, megabytes * 1024 * 1024)
+        size = os.path.getsize(input_file) / (1024.0 * 1024.0)
+        print "%-10s %14s %12s %14s %12s %12s" % ('form', 'source(KB)', 'compile(s)', 'object(KB)', 'tokens', 'MB/s')
+        for code_form in code_forms:
+            source_size, compile_time, object_size, executable = build(rules_file, code_form, os.path.join(directory, code_form))
+            tokens, seconds = run(executable, input_file)
+            print "%-10s %14.1f %12.2f %14.1f %12d %12.1f" % (code_form, source_size / 1024.0, compile_time, object_size / 1024.0, tokens, size / seconds)
+    finally:
+        shutil.rmtree(directory)
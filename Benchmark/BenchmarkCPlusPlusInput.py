@@ -0,0 +1,144 @@
+import sys
+import os
+import os.path
+import random
+import shutil
+import subprocess
+import tempfile
+
+usage = """Usage: python BenchmarkCPlusPlusInput.py [BASELINE_SOURCE] [MEGABYTES]
+BASELINE_SOURCE: optional path to the root of another Poodle-Lex source tree
+    (for instance, a 'git worktree' of an older revision). If given, the C++
+    lexer it generates is timed against the one generated by this tree.
+MEGABYTES: size of the C source generated as input (default 32).
+Generates the C lexer in Example/CLexer with the cpp plug-in, compiles it
+with $CXX (default g++) -O2, and reports how fast it reads and lexes a large
+file, in megabytes per second. Each lexer is timed reading from a stream, and
+again scanning the file mapped into memory, if it has a constructor taking a
+file name. Lexers with tokens referring to their text in the input, generated
+with --token-view, are timed as well if the source tree supports them.
+"""
+
+driver = """#include <iostream>
+#include <fstream>
+#include <ctime>
+#include "LexicalAnalyzer.h"
+
+int main(int argc, char* argv[])
+{
+#if defined(USE_MEMORY_MAP)
+    std::string file_name(argv[1]);
+    Poodle::LexicalAnalyzer lexer(file_name);
+#else
+    std::ifstream f(argv[1], std::ios::in | std::ios::binary);
+    Poodle::LexicalAnalyzer lexer(&f);
+#endif
+    long tokens = 0;
+    std::clock_t start = std::clock();
+    while (lexer.get_token().id != Poodle::LexicalAnalyzer::Token::ENDOFSTREAM)
+        tokens++;
+    std::cout << tokens << " " << (double)(std::clock() - start) / CLOCKS_PER_SEC << std::endl;
+    return 0;
+}
+"""
+
+def create_input(path, size):
+    """
+    Writes a file of C source code made of random declarations, statements and comments
+    @param path: the file to write
+    @param size: the approximate size of the file, in bytes
+    """
+    generator = random.Random(42)
+    words = ["".join(generator.choice("abcdefghijklmnopqrstuvwxyz_") for j in xrange(generator.randint(1, 12))) for i in xrange(500)]
+    lines = []
+    for i in xrange(200):
+        name = generator.choice(words)
+        lines.extend([
+            "/* %s: caf\xc3\xa9 \xe2\x82\xac %d */" % (name, i),
+            "static int %s_%d(int %s, const char* %s)" % (name, i, generator.choice(words), generator.choice(words)),
+            "{",
+            "    double value = %d.%de-3;" % (generator.randint(0, 99999), generator.randint(0, 999)),
+            "    if (%s >= 0x%x && %s != %d) // %s" % (generator.choice(words), generator.randint(0, 0xffff), generator.choice(words), i, generator.choice(words)),
+            "        return %s(\"%s\\n\", value);" % (generator.choice(words), " ".join(generator.sample(words, 3))),
+            "    return %s++ + %s[%d];" % (generator.choice(words), generator.choice(words), generator.randint(0, 63)),
+            "}",
+            ""])
+    block = "\n".join(lines) + "\n"
+    with open(path, 'wb') as f:
+        for i in xrange(max(1, size // len(block))):
+            f.write(block)
+
+def build(source, rules_file, directory, options=[]):
+    """
+    Generates the C++ lexer for a rules file with a source tree, and compiles it with the benchmark driver, once
+    reading from a stream and once from a file mapped into memory.
+    @param source: path to the root of the source tree
+    @param rules_file: path to the rules file
+    @param directory: directory in which to generate and compile the lexer
+    @param options: list of additional command line options to pass to the generator
+    @return: a tuple with the path of the executable reading from a stream, and the path of the executable reading
+        from a file mapped into memory, or None if the lexer can't map files. None is returned instead of the tuple 
+        if the source tree doesn't accept the options.
+    """
+    os.mkdir(directory)
+    with open(os.devnull, 'w') as null:
+        command = [sys.executable, os.path.join(source, '__main__.py'), '-l', 'cpp'] + options + [rules_file, directory]
+        if subprocess.call(command, stdout=null, stderr=null) != 0:
+            if len(options) > 0:
+                return None
+            raise Exception("Unable to generate the lexer with '%s'" % source)
+    with open(os.path.join(directory, 'driver.cpp'), 'w') as f:
+        f.write(driver)
+    compiler = os.environ.get('CXX', 'g++')
+    executable = os.path.join(directory, 'driver')
+    subprocess.check_call([compiler, '-O2', '-o', executable, 'driver.cpp', 'LexicalAnalyzer.cpp'], cwd=directory)
+    mapped_executable = os.path.join(directory, 'driver_mapped')
+    with open(os.devnull, 'w') as null:
+        command = [compiler, '-O2', '-DUSE_MEMORY_MAP', '-o', mapped_executable, 'driver.cpp', 'LexicalAnalyzer.cpp']
+        if subprocess.call(command, cwd=directory, stderr=null) != 0:
+            mapped_executable = None
+    return executable, mapped_executable
+
+def run(executable, input_file, repeat=3):
+    """
+    @return: a tuple with the number of tokens read, and the best time taken to read them, in seconds
+    """
+    results = []
+    for i in xrange(repeat):
+        output = subprocess.check_output([executable, input_file])
+        tokens, seconds = output.split()
+        results.append((int(tokens), float(seconds)))
+    return min(results, key=lambda result: result[1])
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3 or (len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help')):
+        print usage
+        sys.exit(1)
+    sources = [('current', '..')]
+    megabytes = 32
+    for argument in sys.argv[1:]:
+        if argument.isdigit():
+            megabytes = int(argument)
+        else:
+            sources.insert(0, ('baseline', argument))
+
+    rules_file = os.path.realpath(os.path.join('..', 'Example', 'CLexer', 'CLexer.rules'))
+    directory = tempfile.mkdtemp()
+    try:
+        input_file = os.path.join(directory, 'input.c')
+        create_input(input_file, megabytes * 1024 * 1024)
+        size = os.path.getsize(input_file) / (1024.0 * 1024.0)
+        print "%-24s %12s %12s %12s" % ('source', 'tokens', 'time(s)', 'MB/s')
+        for name, source in sources:
+            for variant, options in [('', []), ('view', ['--token-view'])]:
+                executables = build(source, rules_file, os.path.join(directory, name + variant), options)
+                if executables is None:
+                    continue
+                executable, mapped_executable = executables
+                for label, path in [(variant, executable), ((variant + ' mapped').strip(), mapped_executable)]:
+                    if path is not None:
+                        label = "%s (%s)" % (name, label) if label != '' else name
+                        tokens, seconds = run(path, input_file)
+                        print "%-24s %12d %12.3f %12.1f" % (label, tokens, seconds, size / seconds)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,121 @@
+import sys
+sys.path.append("..")
+import imp
+import os.path
+import random
+import timeit
+
+from Generator import CoverageSet as current
+
+usage = """Usage: python BenchmarkCoverageSet.py [BASELINE_SOURCE]
+BASELINE_SOURCE: optional path to the root of another Poodle-Lex source tree
+    (for instance, a 'git worktree' of an older revision). If given, its
+    Generator/CoverageSet.py is timed against the current implementation.
+"""
+
+def random_intervals(generator, count, maximum, width):
+    """
+    Creates a list of random, possibly overlapping intervals
+    @param generator: random.Random object used to produce the intervals
+    @param count: number of intervals to produce
+    @param maximum: largest value an interval may start at
+    @param width: largest number of values covered by a single interval
+    """
+    intervals = []
+    for i in xrange(count):
+        min_v = generator.randint(0, maximum)
+        intervals.append((min_v, min_v + generator.randint(0, width)))
+    return intervals
+
+def get_workloads(module):
+    """
+    Returns a list of (name, function) tuples, each exercising one part of a CoverageSet implementation.
+    @param module: the module containing the CoverageSet class to exercise
+    """
+    CoverageSet = module.CoverageSet
+    generator = random.Random(42)
+    ascii_edges = [random_intervals(generator, 4, 127, 8) for i in xrange(200)]
+    unicode_edges = [random_intervals(generator, 64, 0x10FFFF, 2000) for i in xrange(20)]
+    ascii_sets = [CoverageSet(i) for i in ascii_edges]
+    unicode_sets = [CoverageSet(i) for i in unicode_edges]
+    probes = [generator.randint(0, 0x10FFFF) for i in xrange(2000)]
+    ascii_probes = [generator.randint(0, 127) for i in xrange(2000)]
+
+    def construct():
+        for intervals in ascii_edges:
+            CoverageSet(intervals)
+        for intervals in unicode_edges:
+            CoverageSet(intervals)
+
+    def union():
+        CoverageSet.union(*ascii_sets)
+        CoverageSet.union(*unicode_sets)
+
+    def difference():
+        for coverage_set in unicode_sets:
+            CoverageSet.difference(coverage_set, *unicode_sets[:5])
+
+    def intersection():
+        for i in xrange(len(unicode_sets)-1):
+            CoverageSet.intersection(unicode_sets[i], unicode_sets[i+1])
+
+    def segments():
+        for i in xrange(0, len(ascii_sets), 10):
+            for segment in CoverageSet.segments(*[(edge, j) for j, edge in enumerate(ascii_sets[i:i+10])]):
+                pass
+        for segment in CoverageSet.segments(*[(edge, j) for j, edge in enumerate(unicode_sets)]):
+            pass
+
+    def contains():
+        for coverage_set in unicode_sets:
+            for value in probes:
+                value in coverage_set
+
+    def contains_ascii():
+        for coverage_set in ascii_sets[:20]:
+            for value in ascii_probes:
+                value in coverage_set
+
+    def hash_and_compare():
+        for coverage_set in ascii_sets:
+            hash(coverage_set)
+            coverage_set == ascii_sets[0]
+
+    return [
+        ('construct', construct),
+        ('union', union),
+        ('difference', difference),
+        ('intersection', intersection),
+        ('segments', segments),
+        ('contains', contains),
+        ('contains_ascii', contains_ascii),
+        ('hash/eq', hash_and_compare)
+    ]
+
+def run(module, repeat=3, number=5):
+    """
+    Times each workload against a CoverageSet implementation.
+    @return: dict mapping workload names to the best time, in seconds, of a single run.
+    """
+    results = {}
+    for name, workload in get_workloads(module):
+        results[name] = min(timeit.repeat(workload, repeat=repeat, number=number)) / number
+    return results
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] in ('-h', '--help')):
+        print usage
+        sys.exit(1)
+
+    names = [name for name, workload in get_workloads(current)]
+    current_results = run(current)
+    if len(sys.argv) == 2:
+        baseline = imp.load_source('baseline_coverage_set', os.path.join(sys.argv[1], 'Generator', 'CoverageSet.py'))
+        baseline_results = run(baseline)
+        print "%-16s %12s %12s %8s" % ('workload', 'baseline(ms)', 'current(ms)', 'speedup')
+        for name in names:
+            print "%-16s %12.3f %12.3f %7.1fx" % (name, baseline_results[name]*1000, current_results[name]*1000, baseline_results[name]/current_results[name])
+    else:
+        print "%-16s %12s" % ('workload', 'current(ms)')
+        for name in names:
+            print "%-16s %12.3f" % (name, current_results[name]*1000)
@@ -0,0 +1,237 @@
+import sys
+sys.path.append("..")
+import os
+import os.path
+import json
+import math
+import random
+import shutil
+import tempfile
+import multiprocessing
+
+from Generator import RulesFile
+from Generator import LanguagePlugins
+from Generator.Automata import Minimizer
+from Generator.Profiler import Profiler
+
+usage = """Usage: python BenchmarkGrammars.py [STEPS] [JSON_FILE]
+STEPS: number of sizes to generate each grammar at, each twice the size
+    of the last (default 4).
+JSON_FILE: file to write the results to (default BenchmarkGrammars.json).
+Generates rules files which scale in one direction each, and runs every
+stage of the generator on them: parsing, building NFAs, building DFAs with
+each minimizer, and emitting code with each language plug-in. Each grammar
+is compiled in a new process, so that its peak memory use can be measured.
+The growth printed under each table is the exponent k in time ~ size^k
+between the two largest sizes, which shows where an algorithm blows up.
+"""
+
+minimizers = [
+    ('hopcroft', Minimizer.hopcroft),
+    ('polynomial', Minimizer.polynomial),
+    ('brzozowski', Minimizer.brzozowski),
+    ('incremental', Minimizer.incremental),
+    ('auto', Minimizer.auto),
+    ('none', None)
+]
+
+plugin_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "Plugins", "Plugins.json")
+
+def get_words(count, seed):
+    """
+    Creates a list of distinct random lowercase words
+    @param count: the number of words to create
+    @param seed: seed of the random words, so that the same words are created on every run
+    """
+    generator = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add("".join(generator.choice("abcdefghijklmnopqrstuvwxyz") for i in xrange(generator.randint(3, 10))))
+    return sorted(words)
+
+def keywords(size):
+    """
+    Creates a rules file with a rule for each of many case-insensitive keywords, followed by an identifier rule
+    which overlaps all of them.
+    @param size: the number of keywords
+    """
+    lines = ["Keyword%d: i'%s'" % (i, word) for i, word in enumerate(get_words(size, 1))]
+    lines.append("Capture Identifier: '[a-zA-Z_][a-zA-Z0-9_]*'")
+    return lines
+
+def alternation(size):
+    """
+    Creates a rules file with a single rule alternating between many words.
+    @param size: the number of words in the alternation
+    """
+    return ["Alternation: '%s'" % "|".join(get_words(size, 2))]
+
+def nesting(size):
+    """
+    Creates a rules file with a rule nesting repeated groups inside each other, such as "a(b(x)*b)*a".
+    @param size: the depth to which groups are nested
+    """
+    pattern = "x"
+    for i in xrange(size):
+        letter = "abcdefghijklmnopqrstuvw"[i % 23]
+        pattern = "%s(%s)*%s" % (letter, pattern, letter)
+    return ["Nested: '%s'" % pattern, "Capture Word: '[a-z]+'"]
+
+def unicode_classes(size):
+    """
+    Creates a rules file with rules combining large Unicode classes, which have many overlapping ranges.
+    @param size: the number of rules
+    """
+    classes = ["L", "Lu", "Ll", "N", "Nd", "P", "S", "Greek", "Cyrillic", "Han", "Arabic", "Latin", "Alpha", "XID_Start", "XID_Continue", "White_Space"]
+    lines = []
+    for i in xrange(size):
+        first = classes[i % len(classes)]
+        second = classes[(i * 7 + 3) % len(classes)]
+        third = classes[(i * 5 + 1) % len(classes)]
+        lines.append("Class%d: '%s\\p{%s}[\\p{%s}\\p{%s}]*'" % (i, chr(ord('a') + i % 26), first, second, third))
+    return lines
+
+def counted_repetition(size):
+    """
+    Creates a rules file with rules repeating character classes a counted number of times.
+    @param size: the largest number of repetitions
+    """
+    return [
+        "Exact: '[a-z]{%d,%d}'" % (size, size),
+        "Range: '([a-f][0-9]){%d,%d}'" % (size // 2, size),
+        "Bounded: 'x[a-z0-9]{0,%d}y'" % size
+    ]
+
+def sections(size):
+    """
+    Creates a rules file with many sections, each entered from the main section.
+    @param size: the number of sections
+    """
+    lines = []
+    for i in xrange(size):
+        lines.extend([
+            "Section Section%d" % i,
+            "    Capture Word%d: '[a-z]+'" % i,
+            "    Capture Number%d: '[0-9]+(\\.[0-9]+)?'" % i,
+            "    Leave%d: 'end%d' Exit Section" % (i, i),
+            "End Section",
+            "Enter%d: 'begin%d' Enter Section%d" % (i, i, i)
+        ])
+    lines.append("Skip Whitespace: '[ \\t\\r\\n]+'")
+    return lines
+
+workloads = [
+    ('keywords', keywords, 50),
+    ('alternation', alternation, 50),
+    ('nesting', nesting, 4),
+    ('unicode_classes', unicode_classes, 2),
+    ('counted_repetition', counted_repetition, 8),
+    ('sections', sections, 4)
+]
+
+def run(arguments):
+    """
+    Runs every stage of the generator on a rules file. This is run in a new process for each rules file.
+    @param arguments: a tuple with the lines of the rules file, and a directory in which to write temporary files.
+    @return: a tuple with a list of records made by a Profiler object, one for each stage completed, in which 
+        the phase is the name of the stage, and a string describing the error which stopped the stages, or None.
+        Errors are returned as strings, since not every exception can be passed back from a worker process.
+    """
+    lines, directory = arguments
+    profiler = Profiler()
+    try:
+        run_stages(lines, directory, profiler)
+    except Exception as e:
+        return profiler.records, "%s: %s" % (type(e).__name__, str(e))
+    return profiler.records, None
+    
+def run_stages(lines, directory, profiler):
+    """
+    Runs each stage of the generator, recording it in a profiler
+    @param lines: list of strings, each a line of the rules file
+    @param directory: directory in which to write temporary files
+    @param profiler: Profiler object in which to record the stages
+    """
+    rules_file = os.path.join(directory, "Benchmark.rules")
+    with open(rules_file, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+    with profiler.measure("parse"):
+        rules = RulesFile.parse(rules_file, "utf-8")
+        rules.accept(RulesFile.Traverser(RulesFile.Validator()))
+    with profiler.measure("regex") as counts:
+        nfa_ir = RulesFile.NonDeterministicIR(rules)
+        counts['rules'] = sum(len(section.rules) for section in nfa_ir.sections.itervalues())
+    with profiler.measure("nfa") as counts:
+        nfas = [rule.nfa for section in nfa_ir.sections.itervalues() for rule in section.rules]
+        counts['nfa_states'] = sum(nfa.get_state_count() for nfa in nfas)
+
+    dfa_irs = {}
+    for name, minimizer in minimizers:
+        with profiler.measure("dfa:" + name) as counts:
+            dfa_irs[name] = RulesFile.DeterministicIR(nfa_ir, minimizer)
+            counts['dfa_states'] = sum(len([state for state in section.dfa]) for section in dfa_irs[name].sections.itervalues())
+
+    language_plugins, default_language = LanguagePlugins.load(plugin_file, 'utf-8')
+    for name in sorted(language_plugins):
+        language_plugin = language_plugins[name]
+        language_plugin.load()
+        options = LanguagePlugins.PluginOptions()
+        options.form = LanguagePlugins.PluginOptions.DFA_IR
+        output_directory = os.path.join(directory, name)
+        os.mkdir(output_directory)
+        with profiler.measure("emit:" + name):
+            emitter = language_plugin.create(dfa_irs['hopcroft'], options)
+            LanguagePlugins.Executor(emitter, language_plugin.plugin_files_directory, output_directory).execute()
+
+def get_growth(smaller, larger, smaller_size, larger_size):
+    """
+    @return: the exponent k for which larger / smaller = (larger_size / smaller_size)^k, or None if it can't be found.
+    """
+    if smaller is None or larger is None or smaller <= 0 or larger <= 0:
+        return None
+    return math.log(larger / smaller) / math.log(float(larger_size) / smaller_size)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3 or (len(sys.argv) > 1 and not sys.argv[1].isdigit()):
+        print usage
+        sys.exit(1)
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    json_file = sys.argv[2] if len(sys.argv) > 2 else "BenchmarkGrammars.json"
+
+    results = []
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        for workload, create_rules, base_size in workloads:
+            stages = None
+            rows = []
+            for step in xrange(steps):
+                size = base_size * 2**step
+                directory = tempfile.mkdtemp()
+                try:
+                    records, error = pool.apply(run, ((create_rules(size), directory),))
+                finally:
+                    shutil.rmtree(directory)
+                results.append({'workload': workload, 'size': size, 'records': records, 'error': error})
+                if stages is None and len(records) > 0:
+                    stages = [record['phase'] for record in records]
+                    print "%-24s" % workload + "".join(" %12s" % stage[:12] for stage in stages) + " %12s" % 'peak RSS(MB)'
+                times = dict((record['phase'], record['wall_time']) for record in records)
+                rows.append((size, times))
+                if error is not None:
+                    print "%-24d failed: %s" % (size, error)
+                else:
+                    peak_rss = max(record['peak_rss'] for record in records)
+                    print "%-24d" % size + "".join(" %12.3f" % times[stage] for stage in stages) + " %12s" % ('-' if peak_rss is None else '%.1f' % (peak_rss / (1024.0*1024.0)))
+            if stages is not None and len(rows) > 1:
+                (smaller_size, smaller), (larger_size, larger) = rows[-2:]
+                growths = [get_growth(smaller.get(stage), larger.get(stage), smaller_size, larger_size) for stage in stages]
+                print "%-24s" % 'growth' + "".join(" %12s" % ('-' if growth is None else '%.2f' % growth) for growth in growths)
+            print
+    finally:
+        pool.close()
+        pool.join()
+
+    with open(json_file, 'w') as f:
+        json.dump({'version': sys.version, 'platform': sys.platform, 'steps': steps, 'results': results}, f, indent=4, sort_keys=True, separators=(",", ": "))
+    print "Results written to %s" % json_file
@@ -0,0 +1,110 @@
+import sys
+sys.path.append("..")
+import random
+import time
+
+from Generator import Automata
+from Generator.Automata import Minimizer
+from Generator.CoverageSet import CoverageSet
+
+usage = """Usage: python BenchmarkMinimizers.py [MAX_STATES]
+MAX_STATES: number of states in the largest DFAs to minimize (default 50000).
+    The polynomial minimizer is only run on DFAs of up to 10000 states, as it 
+    compares every pair of states.
+"""
+
+polynomial_limit = 10000
+
+def random_dfa(generator, size, letters=8):
+    """
+    Creates a DFA with random transitions, most states of which are distinguishable.
+    @param generator: random.Random object used to produce the DFA
+    @param size: the number of states in the DFA
+    @param letters: the number of distinct values on which states may have transitions.
+    """
+    states = [Automata.DeterministicState() for i in xrange(size)]
+    for state in states:
+        for letter in xrange(letters):
+            if generator.random() < 0.5:
+                state.edges[generator.choice(states)].add(ord('a') + letter, ord('a') + letter)
+        if generator.random() < 0.1:
+            state.is_final = True
+            state.final_ids = set([generator.choice(['A', 'B', 'C'])])
+    dfa = Automata.DeterministicFinite()
+    dfa.start_state = states[0]
+    return dfa
+
+def keyword_trie(generator, size):
+    """
+    Creates a DFA recognizing random words, which is a tree with the common prefixes of the words merged.
+    Minimizing it merges common suffixes.
+    @param generator: random.Random object used to produce the words
+    @param size: the approximate number of states in the DFA
+    """
+    dfa = Automata.DeterministicFinite()
+    dfa.start_state = Automata.DeterministicState()
+    children = {}
+    count = 1
+    while count < size:
+        state = dfa.start_state
+        for i in xrange(generator.randint(3, 10)):
+            letter = ord(generator.choice('abcdefgh'))
+            if (state, letter) not in children:
+                child = Automata.DeterministicState()
+                state.edges[child].add(letter, letter)
+                children[(state, letter)] = child
+                count += 1
+            state = children[(state, letter)]
+        state.is_final = True
+        state.final_ids = set(['Word'])
+    return dfa
+
+def twin_chains(size):
+    """
+    Creates a DFA with two identical chains of states, which minimize to a single chain. Algorithms which refine
+    their partition one step of the chain per pass take time proportional to the square of the chain's length.
+    @param size: the number of states in the DFA
+    """
+    dfa = Automata.DeterministicFinite()
+    dfa.start_state = Automata.DeterministicState()
+    for first_letter in 'ab':
+        state = dfa.start_state
+        letter = ord(first_letter)
+        for i in xrange(size // 2):
+            next_state = Automata.DeterministicState()
+            state.edges[next_state].add(letter, letter)
+            state = next_state
+            letter = ord('a') + i % 26
+        state.is_final = True
+        state.final_ids = set(['Chain'])
+    return dfa
+
+def time_minimizer(minimizer, dfa):
+    start = time.time()
+    minimizer(dfa)
+    return time.time() - start, len([i for i in dfa])
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and not sys.argv[1].isdigit()):
+        print usage
+        sys.exit(1)
+    max_states = int(sys.argv[1]) if len(sys.argv) == 2 else 50000
+    sizes = [i for i in [500, 1000, 2000, 5000, 10000, 20000, 50000, 100000] if i < max_states] + [max_states]
+    minimizers = [('hopcroft', Minimizer.hopcroft), ('polynomial', Minimizer.polynomial)]
+    
+    print "%-24s %10s %10s" % ('workload', 'states', 'minimized') + "".join(" %12s" % ('%s(s)' % name) for name, minimizer in minimizers)
+    for size in sizes:
+        for name, create_dfa in [
+                ('random', lambda: random_dfa(random.Random(size), size)),
+                ('keyword_trie', lambda: keyword_trie(random.Random(size), size)),
+                ('twin_chains', lambda: twin_chains(size))]:
+            states = len([i for i in create_dfa()])
+            results = []
+            for minimizer_name, minimizer in minimizers:
+                if minimizer is Minimizer.polynomial and states > polynomial_limit:
+                    results.append(None)
+                else:
+                    results.append(time_minimizer(minimizer, create_dfa()))
+            minimized_states = results[0][1]
+            times = "".join(" %12s" % ('-' if result is None else '%.3f' % result[0]) for result in results)
+            print "%-24s %10d %10d%s" % ('%s(%d)' % (name, size), states, minimized_states, times)
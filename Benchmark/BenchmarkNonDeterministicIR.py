@@ -0,0 +1,29 @@
+import sys
+import os.path
+import timeit
+
+usage = """Usage: python BenchmarkNonDeterministicIR.py [RULES_FILE] [SOURCE]
+RULES_FILE: rules file to compile (default ../Example/CLexer/CLexer.rules).
+SOURCE: optional path to the root of a Poodle-Lex source tree to time instead 
+    of this one (for instance, a 'git worktree' of an older revision).
+"""
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3 or (len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help')):
+        print usage
+        sys.exit(1)
+    rules_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join("..", "Example", "CLexer", "CLexer.rules")
+    sys.path.insert(0, sys.argv[2] if len(sys.argv) > 2 else "..")
+    from Generator import RulesFile
+    
+    def parse():
+        rules = RulesFile.parse(rules_file, "utf-8")
+        rules.accept(RulesFile.Traverser(RulesFile.Validator()))
+        return rules
+    rules = parse()
+    
+    print "%-24s %12s" % ('phase', 'time(ms)')
+    for name, phase in [
+            ('parse rules file', parse),
+            ('build NFAs', lambda: RulesFile.NonDeterministicIR(rules))]:
+        print "%-24s %12.3f" % (name, min(timeit.repeat(phase, repeat=5, number=3)) / 3 * 1000)
@@ -0,0 +1,88 @@
+import sys
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import time
+
+usage = """Usage: python BenchmarkStartup.py [BASELINE_SOURCE]
+BASELINE_SOURCE: optional path to the root of another Poodle-Lex source tree
+    (for instance, a 'git worktree' of an older revision). If given, it is
+    timed against this one.
+Times the generator on a small grammar which uses no Unicode properties, run
+from a copy of each source tree without its UnicodeData folder.
+"""
+
+rules = """Let Letter = '[a-zA-Z_]'
+Let Digit = '[0-9]'
+
+If: i'if'
+Else: i'else'
+While: i'while'
+Return: i'return'
+Capture Identifier: '{Letter}({Letter}|{Digit})*'
+Capture Integer: '{Digit}+'
+Capture Float: '{Digit}+\\.{Digit}*|{Digit}*\\.{Digit}+'
+Capture String: '"([^"\\\\]|\\\\.)*"'
+Operator: '[\\-\\+\\*/=<>!]=?|\\&\\&|\\|\\|'
+Punctuation: '[\\(\\)\\{\\};,]'
+Skip Whitespace: '[ \\t\\r\\n]+'
+"""
+
+def copy_source(source, directory):
+    """
+    Copies the parts of a source tree needed to run the generator, leaving out the Unicode database
+    @param source: path to the root of the source tree
+    @param directory: path of the directory to copy the source tree into
+    @return: path to the copy
+    """
+    copy = os.path.join(directory, os.path.basename(os.path.abspath(source)))
+    shutil.copytree(source, copy, ignore=shutil.ignore_patterns('UnicodeData', '.git', 'Test', 'Benchmark', '*.pyc'))
+    return copy
+
+def run(source, rules_file, output_directory, repeat=5):
+    """
+    Times the generator, in a separate process so that its imports are included.
+    @param source: path to the root of the source tree to run
+    @param rules_file: path to the rules file to compile
+    @param output_directory: path of the directory to write the generated lexical analyzer to
+    @return: the best wall time, in seconds, of a single run, or None if the generator failed
+    """
+    environment = dict(os.environ)
+    environment['XDG_CACHE_HOME'] = os.path.join(output_directory, 'cache')
+    command = [sys.executable, os.path.join(source, '__main__.py'), rules_file, output_directory]
+    times = []
+    for i in xrange(repeat):
+        start = time.time()
+        process = subprocess.Popen(command, env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        times.append(time.time() - start)
+        if process.returncode != 0:
+            print output.strip().splitlines()[-1]
+            return None
+    return min(times)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] in ('-h', '--help')):
+        print usage
+        sys.exit(1)
+
+    sources = [('current', "..")]
+    if len(sys.argv) == 2:
+        sources.insert(0, ('baseline', sys.argv[1]))
+    directory = tempfile.mkdtemp()
+    try:
+        rules_file = os.path.join(directory, 'Startup.rules')
+        with open(rules_file, 'w') as f:
+            f.write(rules)
+        print "%-16s %12s" % ('source', 'time(ms)')
+        for name, source in sources:
+            copy = copy_source(source, os.path.join(directory, name))
+            result = run(copy, rules_file, os.path.join(directory, name + '_output'))
+            if result is None:
+                print "%-16s %12s" % (name, 'failed')
+            else:
+                print "%-16s %12.3f" % (name, result * 1000)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,82 @@
+import sys
+sys.path.append("..")
+import time
+
+from Generator import Automata
+from Generator.CoverageSet import CoverageSet
+
+usage = """Usage: python BenchmarkSubsetConstruction.py [MAX_N]
+MAX_N: largest N to build the DFA for '(a|b)*a(a|b){N-1}' (default 17), 
+    which has 2^N states. The suite also builds DFAs for long literals
+    and long chains of epsilon edges, which are scaled with N.
+"""
+
+def nth_from_last(n):
+    """
+    Creates an NFA for '(a|b)*a(a|b){n-1}', the DFA for which has 2^n states.
+    @param n: the number of characters from the end of the input at which an 'a' must appear.
+    """
+    nfa = Automata.NonDeterministicFinite()
+    states = [nfa.start_state] + [nfa.add_state() for i in xrange(n-1)] + [nfa.end_state]
+    nfa.add_edge(states[0], CoverageSet([(ord('a'), ord('b'))]), states[0])
+    nfa.add_edge(states[0], CoverageSet([(ord('a'), ord('a'))]), states[1])
+    for i in xrange(1, n):
+        nfa.add_edge(states[i], CoverageSet([(ord('a'), ord('b'))]), states[i+1])
+    nfa.final_ids[nfa.end_state] = nfa.get_rule_id_bit('Match')
+    return nfa
+
+def long_literal(length):
+    """
+    Creates an NFA for a literal of the given length, joined by epsilon edges as the NFA builder would, 
+    the DFA for which is a single chain of states.
+    @param length: the number of characters in the literal.
+    """
+    nfa = Automata.NonDeterministicFinite()
+    state = nfa.start_state
+    for i in xrange(length):
+        middle_state = nfa.add_state()
+        next_state = nfa.add_state() if i < length-1 else nfa.end_state
+        nfa.add_edge(state, CoverageSet([(ord('a') + i % 26, ord('a') + i % 26)]), middle_state)
+        nfa.add_epsilon_edge(middle_state, next_state)
+        state = next_state
+    nfa.final_ids[nfa.end_state] = nfa.get_rule_id_bit('Match')
+    return nfa
+
+def epsilon_chain(length):
+    """
+    Creates an NFA in which the start state leads through a chain of epsilon edges to states which each 
+    accept a different character, so that the start state's epsilon closure is as large as the NFA.
+    @param length: the number of states in the epsilon chain.
+    """
+    nfa = Automata.NonDeterministicFinite()
+    state = nfa.start_state
+    for i in xrange(length):
+        next_state = nfa.add_state()
+        nfa.add_epsilon_edge(state, next_state)
+        nfa.add_edge(state, CoverageSet([(0x100 + i, 0x100 + i)]), nfa.end_state)
+        state = next_state
+    nfa.add_epsilon_edge(state, nfa.end_state)
+    nfa.final_ids[nfa.end_state] = nfa.get_rule_id_bit('Match')
+    return nfa
+
+def time_build(name, nfa):
+    nfa_states = nfa.get_state_count()
+    start = time.time()
+    dfa = Automata.DeterministicFiniteBuilder.build(nfa)
+    elapsed = time.time() - start
+    dfa_states = len([i for i in dfa])
+    print "%-24s %10d %10d %10.3f %12.0f" % (name, nfa_states, dfa_states, elapsed, dfa_states / max(elapsed, 1e-6))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and not sys.argv[1].isdigit()):
+        print usage
+        sys.exit(1)
+    max_n = int(sys.argv[1]) if len(sys.argv) == 2 else 17
+    
+    print "%-24s %10s %10s %10s %12s" % ('workload', 'nfa states', 'dfa states', 'time(s)', 'states/s')
+    for n in xrange(min(8, max_n), max_n+1, 3):
+        time_build('nth_from_last(%d)' % n, nth_from_last(n))
+    for length in [1 << i for i in xrange(10, max(10, max_n)+1, 2)]:
+        time_build('long_literal(%d)' % length, long_literal(length))
+    for length in [1 << i for i in xrange(8, max(8, max_n-4)+1, 2)]:
+        time_build('epsilon_chain(%d)' % length, epsilon_chain(length))
@@ -21,6 +21,7 @@
 import collections
 import itertools
 from ..CoverageSet import CoverageSet
+from NonDeterministicFinite import NonDeterministicFinite
 
 class DeterministicState(object):
     """
@@ -104,6 +105,52 @@ class DeterministicFinite(object):
            
         return "digraph {\n%s\n}\n" % "\n".join(descriptions)
     
+    def pack(self):
+        """
+        Returns a compact form of the DFA, made of tuples, lists and integers rather than linked state objects, so
+        that it can be pickled quickly, and without recursing through the graph, to pass it between processes.
+        @return: a tuple with a list of the distinct sets of rule ids, and a list describing each state in the order 
+            in which they are iterated, starting with the initial state. Each state is described by a tuple with its 
+            is_final flag, the indices of its ids and final_ids in the list of sets, and a list of tuples with the 
+            index of the destination and the FrozenCoverageSet object for each edge.
+        """
+        states = [state for state in self]
+        state_indices = dict((state, index) for index, state in enumerate(states))
+        id_sets = []
+        id_set_indices = {}
+        def get_id_set_index(ids):
+            ids = frozenset(ids)
+            index = id_set_indices.get(ids)
+            if index is None:
+                index = len(id_sets)
+                id_sets.append(ids)
+                id_set_indices[ids] = index
+            return index
+        packed_states = []
+        for state in states:
+            edges = [(state_indices[destination], edge.freeze()) for destination, edge in state.edges.iteritems()]
+            packed_states.append((state.is_final, get_id_set_index(state.ids), get_id_set_index(state.final_ids), edges))
+        return (id_sets, packed_states)
+        
+    @staticmethod
+    def unpack(packed):
+        """
+        Creates a DFA from its compact form.
+        @param packed: a tuple returned by pack()
+        @return: an Automata.DeterministicFinite object equivalent to the one which was packed.
+        """
+        id_sets, packed_states = packed
+        states = [DeterministicState() for i in xrange(len(packed_states))]
+        for state, (is_final, ids, final_ids, edges) in itertools.izip(states, packed_states):
+            state.is_final = is_final
+            state.ids = set(id_sets[ids])
+            state.final_ids = set(id_sets[final_ids])
+            for destination, edge in edges:
+                state.edges[states[destination]] = edge
+        state_machine = DeterministicFinite()
+        state_machine.start_state = states[0]
+        return state_machine
+        
     def copy(self):
         """
         Returns a copy of the DFA
@@ -128,21 +175,17 @@ class DeterministicFinite(object):
         nfa_state_machine = NonDeterministicFinite()
         
         # First convert to an NFA by copying states and linking to start/end state
-        for dfa_state in self:
-            dfa_state.nfa_proxy = NonDeterministicState()
-            dfa_state.nfa_proxy.is_one_to_many_proxy = False
+        nfa_states = dict((dfa_state, nfa_state_machine.add_state()) for dfa_state in self)
+        for dfa_state, nfa_state in nfa_states.iteritems():
             if dfa_state == self.start_state:
-                dfa_state.nfa_proxy.epsilon_edges.add(nfa_state_machine.end_state)
+                nfa_state_machine.add_epsilon_edge(nfa_state, nfa_state_machine.end_state)
             if dfa_state.is_final:
-                nfa_state_machine.start_state.epsilon_edges.add(dfa_state.nfa_proxy)
+                nfa_state_machine.add_epsilon_edge(nfa_state_machine.start_state, nfa_state)
             
         # Copy edges with the direction reversed
-        for dfa_state in self:
-            for edge in dfa_state.edges:
-                source_nfa_state = dfa_state.edges[edge].nfa_proxy
-                if edge not in source_nfa_state.edges:
-                    source_nfa_state.edges[edge] = set()
-                source_nfa_state.edges[edge].add(dfa_state.nfa_proxy)
+        for dfa_state, nfa_state in nfa_states.iteritems():
+            for destination, edge in dfa_state.edges.iteritems():
+                nfa_state_machine.add_edge(nfa_states[destination], edge, nfa_state)
     
         return nfa_state_machine
 
@@ -21,84 +21,143 @@
 import itertools
 from ..CoverageSet import CoverageSet
 from DeterministicFinite import DeterministicFinite, DeterministicState
+from EquivalenceClasses import EquivalenceClasses
 
 class EpsilonClosureCrawler(object):
     """
     Class which, given a set of NFA states, can be used to find the epsilon closure of those states, 
-    which is all the states reachable through epsilon edges.
+    which is all the states reachable through epsilon edges. The closure of each individual NFA state
+    is memoised, so a single crawler should be reused for every set of states taken from the same NFA.
+    @ivar closures: dict mapping integers representing NFA states to a frozenset of the states in their epsilon closures.
     """
-    def __init__(self, nfa_state_set):
-        self.states = []
-        for nfa_state in nfa_state_set:
-            self.crawl(nfa_state)
+    def __init__(self, nfa_state_machine):
+        """
+        @param nfa_state_machine: an Automata.NonDeterministicFinite object containing the states to be searched.
+        """
+        self.offsets, self.destinations = nfa_state_machine.get_epsilon_index()
+        self.closures = {}
     
     def crawl(self, nfa_state):
         """
-        Recursively searches for states reachable through epsilon edges and appends them to an internal list.
-        @param nfa_state: NonDeterministicState object representing the start from which to start searching
+        Searches for states reachable through epsilon edges from a single state, using an explicit stack 
+        so that long chains of epsilon edges cannot exhaust the recursion limit.
+        @param nfa_state: integer representing the NFA state from which to start searching
+        @return: frozenset of integers representing the NFA states in the epsilon closure of the state.
         """
-        self.states.append(nfa_state)
-        for epsilon_destination in nfa_state.epsilon_edges:
-            if epsilon_destination not in self.states:
-                self.crawl(epsilon_destination)
+        closure = self.closures.get(nfa_state)
+        if closure is not None:
+            return closure
+        offsets = self.offsets
+        destinations = self.destinations
+        states = set([nfa_state])
+        stack = [nfa_state]
+        while len(stack) > 0:
+            state = stack.pop()
+            for epsilon_destination in destinations[offsets[state]:offsets[state+1]]:
+                if epsilon_destination not in states:
+                    # A state whose closure is already known needs no further searching, as its closure is a subset of this one
+                    known_closure = self.closures.get(epsilon_destination)
+                    if known_closure is not None:
+                        states.update(known_closure)
+                    else:
+                        states.add(epsilon_destination)
+                        stack.append(epsilon_destination)
+        closure = frozenset(states)
+        self.closures[nfa_state] = closure
+        return closure
 
-    def get_states(self):
+    def get_states(self, nfa_state_set):
         """
-        Returns the states found through epsilon closure.
-        @return: array of NonDeterministicState objects containing the results of the search.
+        Returns the epsilon closure of a set of states.
+        @param nfa_state_set: iterable of integers representing the NFA states from which to start searching.
+        @return: frozenset of integers representing the NFA states found by the search.
         """
-        return self.states
+        closures = [self.crawl(nfa_state) for nfa_state in nfa_state_set]
+        if len(closures) == 1:
+            return closures[0]
+        return frozenset().union(*closures)
 
 class DeterministicFiniteBuilder(object):
     """
     Creates a deterministic finite automata (DFA) from a non-deterministic finite automata (NFA) via epsilon closure.
+    To keep the number of intervals handled per DFA state small, the NFA's edges are first relabelled with the 
+    equivalence classes of the values they cover, and only converted back to values once the DFA is complete.
+    @ivar alphabet: Automata.EquivalenceClasses object partitioning the values covered by the NFA's edges.
+    @ivar class_edges: list with an entry for each NFA state, a list of tuples, each with a FrozenCoverageSet object
+        representing the class ids of an edge, and an integer representing the NFA state to which the edge leads.
+    @ivar states: dict mapping frozensets of NFA states to the DeterministicState objects created for them.
+    @ivar worklist: list of frozensets of NFA states, the DFA states for which have been created but not yet crawled.
     """
-    def __init__(self, nfa_state_machine):
+    def __init__(self, nfa_state_machine, start_states=None):
         """
         @param nfa_state_machine: an Automata.NonDeterministicFinite object representing the NFA to convert to a DFA
+        @param start_states: optional iterable of integers representing the NFA states from which the DFA starts,
+            in place of the NFA's start state.
         """
         self.states = {}
+        self.worklist = []
         self.nfa_state_machine = nfa_state_machine
+        self.alphabet = EquivalenceClasses(nfa_state_machine.labels)
+        label_class_ids = [self.alphabet.get_class_ids(label) for label in nfa_state_machine.labels]
+        offsets, labels, destinations = nfa_state_machine.get_edge_index()
+        self.class_edges = [
+            [(label_class_ids[labels[i]], destinations[i]) for i in xrange(offsets[nfa_state], offsets[nfa_state+1])]
+            for nfa_state in xrange(nfa_state_machine.get_state_count())]
+        self.epsilon_closures = EpsilonClosureCrawler(nfa_state_machine)
         self.dfa_state_machine = DeterministicFinite()
-        nfa_start_state = set([nfa_state_machine.start_state])
-        nfa_start_state_closed = EpsilonClosureCrawler(nfa_start_state).get_states()
-        dfa_start_state_id = frozenset(nfa_start_state_closed)
-        self.states[dfa_start_state_id] = DeterministicState()
-        for nfa_state in nfa_start_state_closed:
-            self.states[dfa_start_state_id].ids.update(nfa_state.ids)
-            self.states[dfa_start_state_id].final_ids.update(nfa_state.final_ids)
-        self.dfa_state_machine.start_state = self.states[dfa_start_state_id]
-        self.crawl(dfa_start_state_id)
+        if start_states is None:
+            start_states = [nfa_state_machine.start_state]
+        self.dfa_state_machine.start_state = self.add_state(self.epsilon_closures.get_states(start_states))
+        while len(self.worklist) > 0:
+            self.crawl(self.worklist.pop())
+        
+        # Edges are complete once crawling finishes, so convert them from class ids back to values. 
+        # The results are frozen, which makes hashing and comparison cheap for the minimizer.
+        for dfa_state in self.states.itervalues():
+            for destination, class_ids in dfa_state.edges.items():
+                dfa_state.edges[destination] = self.alphabet.get_values(class_ids)
     
     @staticmethod
-    def build(nfa):
-        return DeterministicFiniteBuilder(nfa).get()
+    def build(nfa, start_states=None):
+        return DeterministicFiniteBuilder(nfa, start_states).get()
         
-    def crawl(self, state_id):
+    def add_state(self, state_id):
         """
-        Crawls through the NFA, finding a unique list of epsilon closures for each states. This is done by:
-            1. Creates a DFA state for each unique set of NFA states and store internally
-            2. For each unique set, find an epsilon-closed set of all NFA states reachable for a given edge
-            3. Map the destination state sets found in #2 to DFA states created in #1, and create the DFA state transition table.
-        @param state_id: list of NFA states from which to crawl.
+        Creates a DFA state for an epsilon-closed set of NFA states, and queues it to be crawled.
+        @param state_id: frozenset of NFA states which the DFA state is equivalent to.
+        @return: the new DeterministicState object.
         """
-        # Each DFA state is equivalent to a set of NFA states.
         # Any DFA state containing the NFA's end state is an end state
+        dfa_state = DeterministicState()
+        ids = 0
+        final_ids = 0
+        for nfa_state in state_id:
+            ids |= self.nfa_state_machine.ids[nfa_state]
+            final_ids |= self.nfa_state_machine.final_ids[nfa_state]
+        dfa_state.ids = self.nfa_state_machine.get_ids(ids)
+        dfa_state.final_ids = self.nfa_state_machine.get_ids(final_ids)
         if self.nfa_state_machine.end_state in state_id:
-            self.states[state_id].is_final = True
+            dfa_state.is_final = True
+        self.states[state_id] = dfa_state
+        self.worklist.append(state_id)
+        return dfa_state
         
-        # For each set of epsilon-closed NFA states, find the set of states that each edge leads to and recurse.
-        merged_transitions = itertools.chain(*[i.edges.iteritems() for i in state_id])
-        pairs = iter((edge, destination) for destination, edge in merged_transitions)
-        for (min_v, max_v), destination_nfa_states in CoverageSet.segments(*pairs):
-            destination_state_id = frozenset(EpsilonClosureCrawler(destination_nfa_states).get_states())
-            if destination_state_id not in self.states:
-                self.states[destination_state_id] = DeterministicState()
-                for nfa_state in destination_state_id:
-                    self.states[destination_state_id].ids.update(nfa_state.ids)
-                    self.states[destination_state_id].final_ids.update(nfa_state.final_ids)
-                self.crawl(destination_state_id)
-            self.states[state_id].edges[self.states[destination_state_id]].add(min_v, max_v)
+    def crawl(self, state_id):
+        """
+        Crawls outward from one DFA state. This is done by:
+            1. For the DFA state's set of NFA states, find an epsilon-closed set of all NFA states reachable for a given edge
+            2. Create a DFA state for each set found in #1 which has not been seen before, and add it to the worklist
+            3. Map the sets found in #1 to DFA states, and create the DFA state transition table.
+        @param state_id: frozenset of NFA states equivalent to the DFA state from which to crawl.
+        """
+        dfa_state = self.states[state_id]
+        pairs = itertools.chain(*[self.class_edges[i] for i in state_id])
+        for (min_class, max_class), destination_nfa_states in CoverageSet.segments(*pairs):
+            destination_state_id = self.epsilon_closures.get_states(destination_nfa_states)
+            destination_state = self.states.get(destination_state_id)
+            if destination_state is None:
+                destination_state = self.add_state(destination_state_id)
+            dfa_state.edges[destination_state].add(min_class, max_class)
                     
     def get(self):
         """
@@ -0,0 +1,80 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+import itertools
+from ..CoverageSet import CoverageSet
+
+class EquivalenceClasses(object):
+    """
+    Partitions the values covered by a group of CoverageSet objects into equivalence classes. Two values
+    are in the same class if every CoverageSet object in the group covers either both of them or neither.
+    Each CoverageSet object in the group is therefore a union of whole classes, and may be relabelled as a
+    set of class ids, which is usually far smaller than the set of values it covers.
+    @ivar classes: list of FrozenCoverageSet objects, indexed by class id, representing the values in each class.
+    @ivar class_ids: dict mapping each CoverageSet object in the group, frozen, to a FrozenCoverageSet object representing its class ids.
+    """
+    def __init__(self, coverage_sets):
+        """
+        @param coverage_sets: iterable of CoverageSet objects to partition.
+        """
+        frozen_sets = set(coverage_set.freeze() for coverage_set in coverage_sets)
+        class_by_coverage = {}
+        classes = []
+        class_ids = dict((frozen_set, CoverageSet()) for frozen_set in frozen_sets)
+        
+        # Each distinct combination of covering sets found while sweeping through the values is a class
+        for (min_v, max_v), covering_sets in CoverageSet.segments(*[(frozen_set, frozen_set) for frozen_set in frozen_sets]):
+            class_id = class_by_coverage.get(covering_sets)
+            if class_id is None:
+                class_id = len(classes)
+                class_by_coverage[covering_sets] = class_id
+                classes.append(CoverageSet())
+                for frozen_set in covering_sets:
+                    class_ids[frozen_set].add(class_id, class_id)
+            classes[class_id].add(min_v, max_v)
+            
+        self.classes = [i.freeze() for i in classes]
+        self.class_ids = dict((frozen_set, ids.freeze()) for frozen_set, ids in class_ids.iteritems())
+        self.values = {}
+        
+    def __len__(self):
+        return len(self.classes)
+        
+    def get_class_ids(self, coverage_set):
+        """
+        Relabels a CoverageSet object from the group as the ids of the classes it covers.
+        @param coverage_set: a CoverageSet object which was passed into __init__
+        @return: a FrozenCoverageSet object representing the ids of the classes covered.
+        """
+        return self.class_ids[coverage_set.freeze()]
+        
+    def get_values(self, class_ids):
+        """
+        Converts a set of class ids back into the values they represent.
+        @param class_ids: a CoverageSet object representing a set of class ids.
+        @return: a FrozenCoverageSet object representing all values in the given classes.
+        """
+        class_ids = class_ids.freeze()
+        values = self.values.get(class_ids)
+        if values is None:
+            intervals = [self.classes[i] for min_v, max_v in class_ids for i in xrange(min_v, max_v+1)]
+            values = CoverageSet(sorted(itertools.chain(*intervals))).freeze()
+            self.values[class_ids] = values
+        return values
@@ -0,0 +1,41 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+from ..NonDeterministicFinite import NonDeterministicFinite
+from ..DeterministicFiniteBuilder import DeterministicFiniteBuilder
+from Hopcroft import minimize as hopcroft
+from Incremental import build as incremental
+
+def build(state_machines, incremental_size=100000):
+    """
+    Creates a minimal deterministic finite automata (DFA) from non-deterministic finite automata (NFA), 
+    choosing a strategy by the size of the NFAs. Small NFAs are determinized in one go and minimized using 
+    Hopcroft's algorithm, while larger NFAs are minimized incrementally, which bounds the size of the 
+    unminimized DFA held in memory.
+    @param state_machines: list of Automata.NonDeterministicFinite objects, one for each rule.
+    @param incremental_size: integer representing the number of NFA states from which to minimize incrementally.
+    @return: an Automata.DeterministicFinite object representing the minimized DFA of the alternated rules.
+    """
+    if sum(state_machine.get_state_count() for state_machine in state_machines) >= incremental_size:
+        return incremental(state_machines)
+    dfa = DeterministicFiniteBuilder.build(NonDeterministicFinite.alternate(state_machines))
+    hopcroft(dfa)
+    return dfa
@@ -0,0 +1,113 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+import collections
+import itertools
+from ...CoverageSet import CoverageSet
+from ..NonDeterministicFinite import NonDeterministicFinite
+from ..DeterministicFiniteBuilder import DeterministicFiniteBuilder
+
+# Values above the Unicode range, used to mark which rules match at the end of a word
+marker_base = 0x110000
+
+def build(state_machines):
+    """
+    Creates a minimal deterministic finite automata (DFA) from non-deterministic finite automata (NFA) using 
+    Brzozowski's algorithm, which reverses and determinizes the automata twice. The first determinization is 
+    of the reversed NFA, which can stay small for NFAs whose subset construction explodes in size, such as
+    those matching a value a fixed distance from the end of a word. Since rules are told apart by the ids
+    of the states they end in, a marker value for each rule id is first appended to the words matched, 
+    so that states ending in different rules are never merged.
+    @param state_machines: list of Automata.NonDeterministicFinite objects, one for each rule.
+    @return: an Automata.DeterministicFinite object representing the minimized DFA of the alternated rules.
+    """
+    nfa = NonDeterministicFinite.alternate(state_machines)
+    end_marker = marker_base + len(nfa.rule_ids)
+    markers = CoverageSet([(marker_base, end_marker)])
+    
+    # Step 1: Reverse the NFA, leading from a marker for each rule id matched to the state matching it
+    reversed_nfa = NonDeterministicFinite()
+    offset = reversed_nfa.get_state_count()
+    for state in xrange(nfa.get_state_count()):
+        reversed_nfa.add_state()
+    for state, final_ids in enumerate(nfa.final_ids):
+        state_markers = CoverageSet()
+        if state == nfa.end_state:
+            state_markers.add(end_marker, end_marker)
+        while final_ids != 0:
+            lowest_bit = final_ids & -final_ids
+            state_markers.add(marker_base + lowest_bit.bit_length() - 1, marker_base + lowest_bit.bit_length() - 1)
+            final_ids ^= lowest_bit
+        if not state_markers.is_empty():
+            reversed_nfa.add_edge(reversed_nfa.start_state, state_markers, state + offset)
+    for source, label, destination in itertools.izip(nfa.edge_sources, nfa.edge_labels, nfa.edge_destinations):
+        reversed_nfa.add_edge(destination + offset, nfa.labels[label], source + offset)
+    for source, destination in itertools.izip(nfa.epsilon_sources, nfa.epsilon_destinations):
+        reversed_nfa.add_epsilon_edge(destination + offset, source + offset)
+    reversed_nfa.add_epsilon_edge(nfa.start_state + offset, reversed_nfa.end_state)
+    
+    # Step 2: Determinize, reverse and determinize again, giving the minimal DFA for the marked words. The reversed
+    # DFA reaches its final states through epsilon edges from a start state with no edges of its own, which is left
+    # out of the start of the second determinization. Otherwise the start would differ from the set of final
+    # states alone, and the two equivalent DFA states created for them would never be merged.
+    reversed_dfa = DeterministicFiniteBuilder.build(reversed_nfa).reverse()
+    final_states = reversed_dfa.get_epsilon_edges(reversed_dfa.start_state)
+    dfa = DeterministicFiniteBuilder.build(reversed_dfa, final_states)
+    
+    # Step 3: Replace edges on markers with the rule ids they represent
+    states = [state for state in dfa]
+    for state in states:
+        state.is_final = False
+        state.final_ids = set()
+    for state in states:
+        for destination, edge in state.edges.items():
+            state_markers = CoverageSet.intersection(edge, markers)
+            if state_markers.is_empty():
+                continue
+            for min_v, max_v in state_markers:
+                for marker in xrange(min_v, max_v + 1):
+                    if marker == end_marker:
+                        state.is_final = True
+                    else:
+                        state.final_ids.add(nfa.rule_ids[marker - marker_base])
+            values = CoverageSet.difference(edge, markers)
+            if values.is_empty():
+                del state.edges[destination]
+            else:
+                state.edges[destination] = values.freeze()
+                
+    # Step 4: Find the rule ids which may be matched from each state, as those matched in any state reachable from it
+    states = [state for state in dfa]
+    ids = dict((state, sum(nfa.get_rule_id_bit(i) for i in state.final_ids)) for state in states)
+    sources = collections.defaultdict(list)
+    for state in states:
+        for destination in state.edges.iterkeys():
+            sources[destination].append(state)
+    worklist = [state for state in states if ids[state] != 0]
+    while len(worklist) > 0:
+        state = worklist.pop()
+        for source in sources[state]:
+            if ids[source] | ids[state] != ids[source]:
+                ids[source] |= ids[state]
+                worklist.append(source)
+    for state in states:
+        state.ids = nfa.get_ids(ids[state])
+    return dfa
@@ -0,0 +1,69 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+from ..NonDeterministicFinite import NonDeterministicFinite
+from ..DeterministicFiniteBuilder import DeterministicFiniteBuilder
+from Auto import build as auto
+from Brzozowski import build as brzozowski
+from Incremental import build as incremental
+from ...Profiler import Profiler
+
+# Minimizers which create the minimized DFA from the NFAs themselves, rather than minimizing a complete DFA
+nfa_minimizers = set([auto, brzozowski, incremental])
+
+def count_states(dfa):
+    """
+    @param dfa: an Automata.DeterministicFinite object
+    @return: tuple with the number of states in the DFA, and the number of edges between them
+    """
+    states = [state for state in dfa]
+    return len(states), sum(len(state.edges) for state in states)
+
+def build(state_machines, minimizer, profiler=None, section=None):
+    """
+    Creates a minimized deterministic finite automata (DFA) from a list of non-deterministic finite automata (NFA).
+    @param state_machines: list of Automata.NonDeterministicFinite objects, one for each rule.
+    @param minimizer: a minimizer from this package. Either a function taking a list of NFAs and returning a 
+        minimized DFA, such as auto, brzozowski or incremental, or a function minimizing a complete DFA in 
+        place, such as hopcroft or polynomial, or None if the DFA should not be minimized.
+    @param profiler: optional Profiler object, in which building and minimizing the DFA are recorded as the 
+        phases "dfa" and "minimize".
+    @param section: string containing the qualified name of the section being built, passed to the profiler.
+    @return: an Automata.DeterministicFinite object representing the minimized DFA of the alternated rules.
+    """
+    if profiler is None:
+        profiler = Profiler(False)
+    if minimizer in nfa_minimizers:
+        with profiler.measure("minimize", section) as counts:
+            dfa = minimizer(state_machines)
+            if profiler.is_enabled:
+                counts['dfa_states'], counts['dfa_edges'] = count_states(dfa)
+        return dfa
+    with profiler.measure("dfa", section) as counts:
+        dfa = DeterministicFiniteBuilder.build(NonDeterministicFinite.alternate(state_machines))
+        if profiler.is_enabled:
+            counts['dfa_states'], counts['dfa_edges'] = count_states(dfa)
+    if minimizer is not None:
+        with profiler.measure("minimize", section) as counts:
+            minimizer(dfa)
+            if profiler.is_enabled:
+                counts['dfa_states'], counts['dfa_edges'] = count_states(dfa)
+    return dfa
@@ -20,76 +20,163 @@
 
 import collections
 from ...CoverageSet import CoverageSet
-import pickle
+from ..EquivalenceClasses import EquivalenceClasses
 
-class StateGroup(object):
-    def __init__(self, items=[]):
-        self.states = set(items)
+class Partition(object):
+    """
+    Refinable partition of the integers 0 to n-1, as described by Valmari and Lehtinen. The elements of each set
+    are kept contiguous in a single list, with the marked elements of each set at its front, so that marking 
+    elements and splitting sets takes time proportional to the number of elements marked.
+    @ivar elements: list of all elements, ordered so that the elements of each set are contiguous.
+    @ivar locations: list mapping each element to its index in elements.
+    @ivar sets: list mapping each element to the set containing it.
+    @ivar firsts: list mapping each set to the index in elements of its first element.
+    @ivar ends: list mapping each set to the index in elements following its last element.
+    @ivar marked: list mapping each set to the number of its elements which are marked.
+    @ivar touched: list of the sets which have marked elements.
+    """
+    def __init__(self, groups):
+        """
+        @param groups: list of non-empty lists of integers, representing the initial sets.
+        """
+        self.elements = []
+        self.firsts = []
+        self.ends = []
+        for group in groups:
+            self.firsts.append(len(self.elements))
+            self.elements.extend(group)
+            self.ends.append(len(self.elements))
+        self.locations = [0] * len(self.elements)
+        self.sets = [0] * len(self.elements)
+        for location, element in enumerate(self.elements):
+            self.locations[element] = location
+        for set_index, group in enumerate(groups):
+            for element in group:
+                self.sets[element] = set_index
+        self.marked = [0] * len(groups)
+        self.touched = []
         
-    def add(self, item):
-        self.states.add(item)
-
-    def __contains__(self, item):
-        return item in self.states
-    
-    def __iter__(self):
-        return iter(self.states)
+    def __len__(self):
+        return len(self.firsts)
         
+    def mark(self, element):
+        """
+        Marks an element, by moving it into the marked front of its set. An element may be marked once between splits.
+        @param element: integer representing the element to mark.
+        """
+        set_index = self.sets[element]
+        location = self.locations[element]
+        marked_location = self.firsts[set_index] + self.marked[set_index]
+        displaced_element = self.elements[marked_location]
+        self.elements[location] = displaced_element
+        self.locations[displaced_element] = location
+        self.elements[marked_location] = element
+        self.locations[element] = marked_location
+        if self.marked[set_index] == 0:
+            self.touched.append(set_index)
+        self.marked[set_index] += 1
+        
+    def split(self):
+        """
+        Splits each set with marked elements into its marked and unmarked elements, unless every element is marked.
+        The smaller of the two parts becomes a new set, so that the new sets created by a split contain at most half
+        of the elements of the sets they were split from.
+        """
+        while len(self.touched) > 0:
+            set_index = self.touched.pop()
+            first_unmarked = self.firsts[set_index] + self.marked[set_index]
+            self.marked[set_index] = 0
+            if first_unmarked == self.ends[set_index]:
+                continue
+            new_set_index = len(self.firsts)
+            if first_unmarked - self.firsts[set_index] <= self.ends[set_index] - first_unmarked:
+                self.firsts.append(self.firsts[set_index])
+                self.ends.append(first_unmarked)
+                self.firsts[set_index] = first_unmarked
+            else:
+                self.firsts.append(first_unmarked)
+                self.ends.append(self.ends[set_index])
+                self.ends[set_index] = first_unmarked
+            self.marked.append(0)
+            for location in xrange(self.firsts[new_set_index], self.ends[new_set_index]):
+                self.sets[self.elements[location]] = new_set_index
+
 def minimize(state_machine):
     """
-    Minimizes a deterministic finite automata (DFA) graph using Hopcroft's O(n*log(n)) 
-    algorithm. The automata passed in is modified and nothing is returned.
+    Minimizes a deterministic finite automata (DFA) graph using Valmari and Lehtinen's variant of Hopcroft's 
+    O(n*log(n)) partition refinement algorithm, which works on DFAs with missing transitions. States are 
+    partitioned into blocks, and transitions into cords, each cord holding transitions on the same value. 
+    Each cord is used once to split blocks by the sources of its transitions, and each new block is used once 
+    to split cords by the destinations of their transitions, until neither can be split any further.
+    The automata passed in is modified and nothing is returned.
     @param state_machine: a Automata.DeterministicFinite object representing the DFA to minimize.
     """
     states = [state for state in state_machine]
+    state_indices = dict((state, index) for index, state in enumerate(states))
     
-    # Step 1: Partition based on final states
-    group_map = collections.defaultdict(StateGroup)
-    for state in states:
-        group_map[hash(frozenset(state.final_ids))].add(state)
-    distinct_groups = set(group_map.itervalues())
+    # Transitions are on equivalence classes rather than values, so each state has at most one transition per class
+    alphabet = EquivalenceClasses(edge for state in states for edge in state.edges.itervalues())
+    sources = []
+    classes = []
+    destinations = []
+    for source, state in enumerate(states):
+        for destination_state, edge in state.edges.iteritems():
+            destination = state_indices[destination_state]
+            for min_class, max_class in alphabet.get_class_ids(edge):
+                for class_id in xrange(min_class, max_class + 1):
+                    sources.append(source)
+                    classes.append(class_id)
+                    destinations.append(destination)
     
-    # Step 2: Iteritively partition based the signals going out of each partition
-    group_was_split = True
-    u = 0
-    while group_was_split:
-        u += 1
-        group_was_split = False
-        groups_to_add = set()
-        groups_to_delete = set()
-        state_to_group = {}
-        for group in distinct_groups:
-            for state in group:
-                state_to_group[state] = group
-        for group in distinct_groups:
-            new_groups = collections.defaultdict(StateGroup)
-            for state in group:
-                outgoing_edges = collections.defaultdict(CoverageSet)
-                for destination, edge in state.edges.iteritems():
-                    outgoing_edges[state_to_group[destination]].update(edge)
-                new_groups[tuple(sorted(outgoing_edges.iteritems()))].add(state)
-            if len(new_groups) > 1:
-                groups_to_delete.add(group)
-                groups_to_add.update(new_groups.itervalues())
-        distinct_groups.difference_update(groups_to_delete)
-        distinct_groups.update(groups_to_add)
-        if len(groups_to_add) > 0:
-            group_was_split = True
-                
-    # Step 3: Group non-distinct states
-    for group_set in distinct_groups:
-        group = list(group_set)
-        if len(group) > 1:
-            to_merge = group[1:]
-            for state in group[1:]:
-                for destination, edge in state.edges.iteritems():
-                    group[0].edges[destination].update(edge)
-            for edge in group[0].edges.itervalues():
-                edge.remove_overlap()
-            for state in states:
-                for destination_state in state.edges.keys():
-                    if destination_state in to_merge:
-                        state.edges[group[0]].update(state.edges[destination_state])
-                        del state.edges[destination_state]
-            if state_machine.start_state in to_merge:
-                state_machine.start_state = group[0]
+    # Step 1: Partition states based on final states, and transitions based on their class
+    final_groups = collections.defaultdict(list)
+    for index, state in enumerate(states):
+        final_groups[(state.is_final, frozenset(state.final_ids))].append(index)
+    blocks = Partition(final_groups.values())
+    class_groups = [[] for i in xrange(len(alphabet))]
+    for transition, class_id in enumerate(classes):
+        class_groups[class_id].append(transition)
+    cords = Partition([group for group in class_groups if len(group) > 0])
+    
+    # Find the transitions into each state
+    incoming_offsets = [0] * (len(states) + 1)
+    for destination in destinations:
+        incoming_offsets[destination + 1] += 1
+    for index in xrange(len(states)):
+        incoming_offsets[index + 1] += incoming_offsets[index]
+    incoming_positions = list(incoming_offsets)
+    incoming = [0] * len(destinations)
+    for transition, destination in enumerate(destinations):
+        incoming[incoming_positions[destination]] = transition
+        incoming_positions[destination] += 1
+        
+    # Step 2: Split blocks and cords against each other. Every block but the first acts as a splitter, 
+    # since transitions into the first block are exactly those left over once the others have been split off.
+    block = 1
+    cord = 0
+    while cord < len(cords):
+        for location in xrange(cords.firsts[cord], cords.ends[cord]):
+            blocks.mark(sources[cords.elements[location]])
+        blocks.split()
+        cord += 1
+        while block < len(blocks):
+            for location in xrange(blocks.firsts[block], blocks.ends[block]):
+                state = blocks.elements[location]
+                for incoming_location in xrange(incoming_offsets[state], incoming_offsets[state + 1]):
+                    cords.mark(incoming[incoming_location])
+            cords.split()
+            block += 1
+            
+    # Step 3: Merge the states in each block into one
+    representatives = [states[blocks.elements[blocks.firsts[blocks.sets[index]]]] for index in xrange(len(states))]
+    for block in xrange(len(blocks)):
+        state = states[blocks.elements[blocks.firsts[block]]]
+        merged_edges = collections.defaultdict(CoverageSet)
+        for destination, edge in state.edges.iteritems():
+            representative = representatives[state_indices[destination]]
+            if representative in merged_edges:
+                merged_edges[representative] = CoverageSet.union(merged_edges[representative], edge)
+            else:
+                merged_edges[representative] = edge
+        state.edges = merged_edges
+    state_machine.start_state = representatives[state_indices[state_machine.start_state]]
@@ -0,0 +1,111 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+from ...CoverageSet import CoverageSet
+from ..DeterministicFinite import DeterministicFinite, DeterministicState
+from ..NonDeterministicFinite import NonDeterministicFinite
+from ..DeterministicFiniteBuilder import DeterministicFiniteBuilder
+from Hopcroft import minimize as hopcroft
+
+def merge(first, second):
+    """
+    Creates a deterministic finite automata (DFA) matching the words matched by either of two DFAs, 
+    by running both side by side. Each state of the new DFA represents a pair of states, one from 
+    each DFA, either of which may be None once the corresponding DFA can no longer match.
+    @param first: an Automata.DeterministicFinite object.
+    @param second: an Automata.DeterministicFinite object.
+    @return: an Automata.DeterministicFinite object representing the union of the two DFAs.
+    """
+    dfa = DeterministicFinite()
+    states = {}
+    worklist = []
+    
+    def add_state(pair):
+        state = DeterministicState()
+        for original_state in pair:
+            if original_state is not None:
+                state.is_final = state.is_final or original_state.is_final
+                state.ids = state.ids | original_state.ids
+                state.final_ids = state.final_ids | original_state.final_ids
+        states[pair] = state
+        worklist.append(pair)
+        return state
+        
+    dfa.start_state = add_state((first.start_state, second.start_state))
+    while len(worklist) > 0:
+        pair = worklist.pop()
+        state = states[pair]
+        edges = [(edge, (index, destination)) 
+            for index, original_state in enumerate(pair) if original_state is not None
+            for destination, edge in original_state.edges.iteritems()]
+        for (min_v, max_v), destinations in CoverageSet.segments(*edges):
+            destination_pair = [None, None]
+            for index, destination in destinations:
+                destination_pair[index] = destination
+            destination_pair = tuple(destination_pair)
+            destination_state = states.get(destination_pair)
+            if destination_state is None:
+                destination_state = add_state(destination_pair)
+            state.edges[destination_state].add(min_v, max_v)
+            
+    for state in states.itervalues():
+        for destination, edge in state.edges.items():
+            state.edges[destination] = edge.freeze()
+    return dfa
+
+def build(state_machines, batch_size=20000):
+    """
+    Creates a minimal deterministic finite automata (DFA) from non-deterministic finite automata (NFA), 
+    minimizing as the DFA is built so that the DFA of the full set of rules is never created before it
+    is minimized. Rules are split into batches, the NFA of each of which has around batch_size states. 
+    Each batch is determinized and minimized, and the minimized DFAs are merged in pairs of equal rank, 
+    as in a binary counter, each merge being minimized in turn. The largest DFA created before 
+    minimization is therefore usually the merge of two minimal DFAs, each covering around half the rules.
+    @param state_machines: list of Automata.NonDeterministicFinite objects, one for each rule.
+    @param batch_size: integer representing the number of NFA states above which a batch is closed.
+    @return: an Automata.DeterministicFinite object representing the minimized DFA of the alternated rules.
+    """
+    batches = [[]]
+    batch_state_count = 0
+    for state_machine in state_machines:
+        if batch_state_count >= batch_size:
+            batches.append([])
+            batch_state_count = 0
+        batches[-1].append(state_machine)
+        batch_state_count += state_machine.get_state_count()
+    
+    # Each entry of the stack is a minimized DFA and its rank, with ranks strictly decreasing up the stack
+    stack = []
+    for batch in batches:
+        dfa = DeterministicFiniteBuilder.build(NonDeterministicFinite.alternate(batch))
+        hopcroft(dfa)
+        rank = 0
+        while len(stack) > 0 and stack[-1][0] == rank:
+            dfa = merge(stack.pop()[1], dfa)
+            hopcroft(dfa)
+            rank += 1
+        stack.append((rank, dfa))
+        
+    rank, dfa = stack.pop()
+    while len(stack) > 0:
+        dfa = merge(stack.pop()[1], dfa)
+        hopcroft(dfa)
+    return dfa
@@ -18,102 +18,114 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
-import itertools
+
+import collections
 from ...CoverageSet import CoverageSet
+from ..EquivalenceClasses import EquivalenceClasses
 
-def pair_id(i, j):
+def pair_index(i, j):
     """
-    Sorts a pair of number so that the smaller number is first and the larger is second
+    Finds the position of a pair of states in a triangular table with an entry for each pair of distinct states.
     @param i: an integer representing a state
-    @param j: an integer representing a state
+    @param j: an integer representing a state other than i
+    @return: an integer, the same for (i, j) as for (j, i)
     """
-    return (min(i, j), max(i, j))
+    if i < j:
+        i, j = j, i
+    return i*(i-1)//2 + j
 
 def minimize(state_machine):
     """
-    Minimizes a deterministic finite automata (DFA) graph using an O(n^2) algorithm 
-    which compares the distinctiveness of every pair of states. The automata passed 
-    in is modified and nothing is returned.
+    Minimizes a deterministic finite automata (DFA) graph using Hopcroft and Ullman's O(n^2) table-filling 
+    algorithm, which compares the distinctiveness of every pair of states. Pairs which cannot yet be told 
+    apart are added to the dependency lists of the pairs their transitions lead to, so that marking a pair as 
+    distinct marks every pair depending on it through a queue, rather than by passing over the table again. 
+    The automata passed in is modified and nothing is returned.
     @param state_machine: an Automata.DeterministicFinite object representing the DFA to minimize.
     """   
-    f = open("test.joe.txt", "w")
     states = [state for state in state_machine]
-    is_distinct = set()
+    state_indices = dict((state, index) for index, state in enumerate(states))
     
-    # Step 1: mark final/non-final pairs of states as distinct
-    for i in range(len(states)):
-        for j in range(i):
-            if states[i].final_ids != states[j].final_ids:
-                is_distinct.add(pair_id(i, j))
-                
-    # Step 2: compare destinations for each alphabet to determine that they are unique
-    change_occurred = True
-    while change_occurred:
-        change_occurred = False
-        for i in range(len(states)):
-            for j in range(i):
-                if pair_id(i, j) not in is_distinct:
-                    all_edges = itertools.chain(states[i].edges.itervalues(), states[j].edges.itervalues())
-                    for (min_v, max_v), ids in CoverageSet.segments(*((edge, index) for index, edge in enumerate(all_edges))):
-                        destination_i = next((k for k, v in states[i].edges.iteritems() if min_v in v), None)
-                        destination_j = next((k for k, v in states[j].edges.iteritems() if min_v in v), None)
-                        
-                        # States are distinct if alphabets not the same
-                        if destination_i is None or destination_j is None:
-                            is_distinct.add(pair_id(i, j))
-                            change_occurred = True
-                        else:
-                            # States are distinct if they has an identical edges to distinct states
-                            destination_index_i = states.index(destination_i)
-                            destination_index_j = states.index(destination_j)
-                            if pair_id(destination_index_i, destination_index_j) in is_distinct:
-                                is_distinct.add(pair_id(i, j))
-                                change_occurred = True
-
-    # Step 3: Group non-distinct states
-    non_distinct_pairs = set()
-    for i in range(len(states)):
-        for j in range(i):
-            if pair_id(i, j) not in is_distinct:
-                non_distinct_pairs.add(pair_id(i, j))
-                
-    non_distinct_groups = []
-    for i, j in non_distinct_pairs:
-        found = False
-        for group in non_distinct_groups:
-            if i in group or j in group:
-                group.add(i)
-                group.add(j)
-                found = True             
-        if not found:
-            non_distinct_groups.append(set([i, j]))
-   
-    # Step 4: Merge non-distinct states
-    state_to_merged = {}
-    for i in xrange(len(non_distinct_groups)):
-        non_distinct_groups[i] = list(non_distinct_groups[i])
-    for group in non_distinct_groups:
-        for state_index, state in [(i, states[i]) for i in group]:
-            state_to_merged[state] = states[group[0]]
+    # Transitions are on equivalence classes rather than values, so each state has at most one transition per class
+    alphabet = EquivalenceClasses(edge for state in states for edge in state.edges.itervalues())
+    transitions = []
     for state in states:
-        if state not in state_to_merged:
-            state_to_merged[state] = state
-    for group in non_distinct_groups:
-        to_merge = [states[i] for i in group[1:]]
-        merge_into = states[group[0]]
-        for state in to_merge:
+        state_transitions = {}
+        for destination, edge in state.edges.iteritems():
+            destination_index = state_indices[destination]
+            for min_class, max_class in alphabet.get_class_ids(edge):
+                for class_id in xrange(min_class, max_class + 1):
+                    state_transitions[class_id] = destination_index
+        transitions.append(state_transitions)
+    
+    # Step 1: Group states by whether they are final, the rules they match, and the classes they have transitions on. 
+    # Pairs of states in different groups are distinct, so only pairs within a group are entered in the table.
+    groups = collections.defaultdict(list)
+    for index, state in enumerate(states):
+        groups[(state.is_final, frozenset(state.final_ids), frozenset(transitions[index]))].append(index)
+    group_ids = [0] * len(states)
+    for group_id, group in enumerate(groups.itervalues()):
+        for index in group:
+            group_ids[index] = group_id
+    is_distinct = bytearray(len(states)*(len(states)-1)//2)
+    dependents = collections.defaultdict(list)
+    
+    # Step 2: Mark pairs which lead to distinct pairs as distinct, along with the pairs depending on them
+    for group in groups.itervalues():
+        for i in xrange(len(group)):
+            for j in xrange(i):
+                pair = pair_index(group[i], group[j])
+                if is_distinct[pair]:
+                    continue
+                destination_pairs = set()
+                for class_id, destination_i in transitions[group[i]].iteritems():
+                    destination_j = transitions[group[j]][class_id]
+                    if destination_i == destination_j:
+                        continue
+                    destination_pair = pair_index(destination_i, destination_j)
+                    if group_ids[destination_i] != group_ids[destination_j] or is_distinct[destination_pair]:
+                        break
+                    destination_pairs.add(destination_pair)
+                else:
+                    for destination_pair in destination_pairs:
+                        dependents[destination_pair].append(pair)
+                    continue
+                    
+                is_distinct[pair] = 1
+                queue = [pair]
+                while len(queue) > 0:
+                    for dependent_pair in dependents.pop(queue.pop(), []):
+                        if not is_distinct[dependent_pair]:
+                            is_distinct[dependent_pair] = 1
+                            queue.append(dependent_pair)
+    
+    # Step 3: Join the states of each pair which is not distinct, with the earliest state found representing each set
+    parents = range(len(states))
+    def find(index):
+        root = index
+        while parents[root] != root:
+            root = parents[root]
+        while parents[index] != root:
+            parents[index], index = root, parents[index]
+        return root
+    for group in groups.itervalues():
+        for i in xrange(len(group)):
+            for j in xrange(i):
+                if not is_distinct[pair_index(group[i], group[j])]:
+                    root_i = find(group[i])
+                    root_j = find(group[j])
+                    parents[max(root_i, root_j)] = min(root_i, root_j)
+                    
+    # Step 4: Merge the states in each set into its representative
+    representatives = [states[find(index)] for index in xrange(len(states))]
+    for index, state in enumerate(states):
+        if representatives[index] is state:
+            merged_edges = collections.defaultdict(CoverageSet)
             for destination, edge in state.edges.iteritems():
-                merge_into.edges[state_to_merged[destination]].update(edge)
-        for edge in merge_into.edges.itervalues():
-            edge.remove_overlap()
-        for state in states:
-            for destination in state.edges.keys():
-                if destination in to_merge:
-                    f.write("FROM: " + repr(state.edges[destination]) + "\n")
-                    f.write("  TO: " + repr(state.edges[merge_into]) + "\n")
-                    state.edges[merge_into].update(state.edges[destination])
-                    f.write("RSLT: " + repr(state.edges[merge_into]) + "\n")
-                    del state.edges[destination]
-        if state_machine.start_state in to_merge:
-            state_machine.start_state = merge_into
-    f.close()
\ No newline at end of file
+                representative = representatives[state_indices[destination]]
+                if representative in merged_edges:
+                    merged_edges[representative] = CoverageSet.union(merged_edges[representative], edge)
+                else:
+                    merged_edges[representative] = edge
+            state.edges = merged_edges
+    state_machine.start_state = representatives[state_indices[state_machine.start_state]]
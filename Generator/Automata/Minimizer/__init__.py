@@ -1,2 +1,6 @@
 from Hopcroft import minimize as hopcroft
-from Polynomial import minimize as polynomial
\ No newline at end of file
+from Polynomial import minimize as polynomial
+from Brzozowski import build as brzozowski
+from Incremental import build as incremental
+from Auto import build as auto
+from Builder import build
@@ -20,117 +20,398 @@
 
 import collections
 import itertools
+from array import array
 from ..CoverageSet import CoverageSet
 
+def _index(count, sources, *columns):
+    """
+    Internal function, sorts edges stored in parallel arrays by source state, in compressed sparse row (CSR) form.
+    @param count: the number of states.
+    @param sources: array with the source state of each edge.
+    @param columns: arrays with other information about each edge, such as the destination state.
+    @return: a tuple, the first element of which is an array of offsets, such that the edges leaving state n are 
+        found between offsets[n] and offsets[n+1] of the arrays which follow, one for each column.
+    """
+    offsets = array('l', [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for state in xrange(count):
+        offsets[state + 1] += offsets[state]
+    positions = array('l', offsets)
+    sorted_columns = [array('l', [0]) * len(sources) for column in columns]
+    for edge, source in enumerate(sources):
+        position = positions[source]
+        positions[source] = position + 1
+        for column, sorted_column in itertools.izip(columns, sorted_columns):
+            sorted_column[position] = column[edge]
+    return (offsets,) + tuple(sorted_columns)
+
 class NonDeterministicState(object):
     """
-    Represents a state in a non-deterministic finite automata (NFA)
-    @ivar ids: set of strings with rule ids of possible matches to which this state could lead
-    @ivar final_ids: set of strings which contain, if the state is an end state, rule ids of the matching rules.
-    @ivar edges: dict representing a state transition table, with each item representing an edge in the graph.
-        Keys are NonDeterministicFiniteState objects representing the destination state for an edge
-        Values are CoverageSet objects representing the values which lead to the corresponding destination.
-    @ivar epsilon: set of NonDeterministicState objects representing the destinations of epsilon edges eminating from this state.
+    Read-only view of a state in a non-deterministic finite automata (NFA), for code which walks the graph one state
+    at a time. Views of the same state are equal, so they may be used as dictionary keys.
+    @ivar state_machine: the NonDeterministicFinite object containing the state.
+    @ivar index: integer representing the state within the state machine.
     """
-    def __init__(self):
-        self.ids = set()
-        self.final_ids = set()
+    def __init__(self, state_machine, index):
+        self.state_machine = state_machine
+        self.index = index
         
-        # edges = dict(edge -> set(sink states))
-        self.edges = collections.defaultdict(CoverageSet)
+    def __eq__(self, other):
+        return isinstance(other, NonDeterministicState) and self.index == other.index and self.state_machine is other.state_machine
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return hash(self.index)
+        
+    @property
+    def ids(self):
+        """
+        Set of strings with rule ids of possible matches to which this state could lead
+        """
+        return self.state_machine.get_ids(self.state_machine.ids[self.index])
         
-        # epsilon_edges = set(sink states)
-        self.epsilon_edges = set()
+    @property
+    def final_ids(self):
+        """
+        Set of strings which contain, if the state is an end state, rule ids of the matching rules.
+        """
+        return self.state_machine.get_ids(self.state_machine.final_ids[self.index])
+        
+    @property
+    def edges(self):
+        """
+        Dict representing a state transition table, with each item representing an edge in the graph.
+        Keys are NonDeterministicState objects representing the destination state for an edge.
+        Values are CoverageSet objects representing the values which lead to the corresponding destination.
+        """
+        edges = {}
+        for destination, label in self.state_machine.get_edges(self.index):
+            destination = NonDeterministicState(self.state_machine, destination)
+            if destination in edges:
+                edges[destination] = CoverageSet.union(edges[destination], label)
+            else:
+                edges[destination] = label
+        return edges
+        
+    @property
+    def epsilon_edges(self):
+        """
+        Set of NonDeterministicState objects representing the destinations of epsilon edges eminating from this state.
+        """
+        return set(NonDeterministicState(self.state_machine, i) for i in self.state_machine.get_epsilon_edges(self.index))
         
 class NonDeterministicFinite(object):
     """
-    Represents a non-deterministic finite automata (NFA) graph. 
-    This object may be iterated to yield NonDetermisticState objects for each contained state.
-    @ivar start_state: NonDeterministicState object representing the initial state of the automata.
-    @ivar end_state: NonDeterministicState object representing the final state of the automata. 
+    Represents a non-deterministic finite automata (NFA) graph. States are integers, indexing parallel lists
+    which hold the rule ids of each state as bitsets. Edges are held in parallel arrays of source states, 
+    labels and destination states, and indexed by source state on demand.
+    This object may be iterated to yield NonDeterministicState views of each reachable state.
+    @ivar start_state: integer representing the initial state of the automata.
+    @ivar end_state: integer representing the final state of the automata. 
+    @ivar ids: list with a bitset for each state, representing the rule ids of possible matches to which the state could lead.
+    @ivar final_ids: list with a bitset for each state, representing the rule ids matched if the state is an end state.
+    @ivar rule_ids: list of the rule ids represented by each bit of the bitsets in ids and final_ids.
+    @ivar labels: list of FrozenCoverageSet objects representing the values which lead along edges.
+    @ivar edge_sources: array with the source state of each labelled edge.
+    @ivar edge_labels: array with the index in labels of the values leading along each labelled edge.
+    @ivar edge_destinations: array with the destination state of each labelled edge.
+    @ivar epsilon_sources: array with the source state of each epsilon edge.
+    @ivar epsilon_destinations: array with the destination state of each epsilon edge.
     """
     def __init__(self):
-        self.start_state = NonDeterministicState()
-        self.end_state = NonDeterministicState()
+        self.ids = []
+        self.final_ids = []
+        self.rule_ids = []
+        self.rule_id_bits = {}
+        self.labels = []
+        self.label_indices = {}
+        self.edge_sources = array('l')
+        self.edge_labels = array('l')
+        self.edge_destinations = array('l')
+        self.epsilon_sources = array('l')
+        self.epsilon_destinations = array('l')
+        self.edge_index = None
+        self.epsilon_index = None
+        self.start_state = self.add_state()
+        self.end_state = self.add_state()
+        
+    def __getstate__(self):
+        # Only the parallel arrays are pickled. The lookup tables and edge indices are rebuilt from them on demand.
+        state = dict(self.__dict__)
+        del state['rule_id_bits']
+        del state['label_indices']
+        state['edge_index'] = None
+        state['epsilon_index'] = None
+        return state
+        
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.rule_id_bits = dict((rule_id, 1 << i) for i, rule_id in enumerate(self.rule_ids))
+        self.label_indices = dict((label, i) for i, label in enumerate(self.labels))
+        
+    def get_state_count(self):
+        """
+        @return: the number of states in the automata, including any which are unreachable.
+        """
+        return len(self.ids)
 
-    def __iter__(self):
+    def add_state(self):
+        """
+        @return: integer representing a new state with no edges.
+        """
+        self.ids.append(0)
+        self.final_ids.append(0)
+        return len(self.ids) - 1
+        
+    def add_edge(self, source, values, destination):
+        """
+        Adds a labelled edge between two states.
+        @param source: integer representing the state from which the edge leads.
+        @param values: CoverageSet object representing the values which lead along the edge.
+        @param destination: integer representing the state to which the edge leads.
+        """
+        label = values.freeze()
+        label_index = self.label_indices.get(label)
+        if label_index is None:
+            label_index = len(self.labels)
+            self.labels.append(label)
+            self.label_indices[label] = label_index
+        self.edge_sources.append(source)
+        self.edge_labels.append(label_index)
+        self.edge_destinations.append(destination)
+        self.edge_index = None
+        
+    def add_epsilon_edge(self, source, destination):
+        """
+        Adds an epsilon edge between two states.
+        @param source: integer representing the state from which the edge leads.
+        @param destination: integer representing the state to which the edge leads.
+        """
+        self.epsilon_sources.append(source)
+        self.epsilon_destinations.append(destination)
+        self.epsilon_index = None
+        
+    def get_rule_id_bit(self, rule_id):
+        """
+        @param rule_id: a rule id.
+        @return: the bit representing the rule id in the bitsets in ids and final_ids.
+        """
+        bit = self.rule_id_bits.get(rule_id)
+        if bit is None:
+            bit = 1 << len(self.rule_ids)
+            self.rule_ids.append(rule_id)
+            self.rule_id_bits[rule_id] = bit
+        return bit
+        
+    def get_ids(self, bitset):
+        """
+        @param bitset: integer representing a set of rule ids, as found in ids and final_ids
+        @return: set of the rule ids in the bitset.
+        """
+        rule_ids = set()
+        while bitset != 0:
+            lowest_bit = bitset & -bitset
+            rule_ids.add(self.rule_ids[lowest_bit.bit_length() - 1])
+            bitset ^= lowest_bit
+        return rule_ids
+        
+    def get_edge_index(self):
+        """
+        Returns the labelled edges, sorted by source state, in compressed sparse row form.
+        @return: a tuple with three arrays. The labelled edges leaving state n are found between offsets 
+            n and n+1 of the first array, and their labels and destinations are at those positions in 
+            the second and third arrays.
+        """
+        if self.edge_index is None:
+            self.edge_index = _index(len(self.ids), self.edge_sources, self.edge_labels, self.edge_destinations)
+        return self.edge_index
+        
+    def get_epsilon_index(self):
+        """
+        Returns the epsilon edges, sorted by source state, in compressed sparse row form.
+        @return: a tuple with two arrays. The destinations of the epsilon edges leaving state n are found between 
+            offsets n and n+1 of the first array, at those positions in the second array.
+        """
+        if self.epsilon_index is None:
+            self.epsilon_index = _index(len(self.ids), self.epsilon_sources, self.epsilon_destinations)
+        return self.epsilon_index
+        
+    def get_edges(self, state):
+        """
+        @param state: integer representing a state.
+        @return: a list of tuples, one for each labelled edge leaving the state, with an integer representing
+            the destination state and a FrozenCoverageSet object representing the values which lead to it.
+        """
+        offsets, labels, destinations = self.get_edge_index()
+        return [(destinations[i], self.labels[labels[i]]) for i in xrange(offsets[state], offsets[state+1])]
+        
+    def get_epsilon_edges(self, state):
+        """
+        @param state: integer representing a state.
+        @return: array of integers representing the destinations of the epsilon edges leaving the state.
+        """
+        offsets, destinations = self.get_epsilon_index()
+        return destinations[offsets[state]:offsets[state+1]]
+
+    def get_state(self, state):
+        """
+        @param state: integer representing a state.
+        @return: a NonDeterministicState object, a view of the state for code which walks the graph.
+        """
+        return NonDeterministicState(self, state)
+        
+    def get_terminal_states(self):
+        """
+        @return: a tuple of NonDeterministicState objects, views of the start state and the end state, which compare 
+            equal to the states found by iterating over the NFA.
+        """
+        return NonDeterministicState(self, self.start_state), NonDeterministicState(self, self.end_state)
+        
+    def iter_states(self):
+        """
+        Iterates through the states reachable from the initial state, in breadth-first order.
+        @return: an iterator yielding an integer for each state.
+        """
+        edge_offsets, labels, edge_destinations = self.get_edge_index()
+        epsilon_offsets, epsilon_destinations = self.get_epsilon_index()
         state_queue = collections.deque([self.start_state])
         visited = set([self.start_state])
         while len(state_queue) > 0:
             next_state = state_queue.pop()
-            for destination in next_state.epsilon_edges:
-                if destination not in visited:
-                    visited.add(destination)
-                    state_queue.appendleft(destination)
-            for destination in next_state.edges.iterkeys():
-                if destination not in visited:
-                    visited.add(destination)
-                    state_queue.appendleft(destination)
-                    
+            for destinations, offsets in ((epsilon_destinations, epsilon_offsets), (edge_destinations, edge_offsets)):
+                for destination in destinations[offsets[next_state]:offsets[next_state+1]]:
+                    if destination not in visited:
+                        visited.add(destination)
+                        state_queue.appendleft(destination)
             yield next_state
         
+    def __iter__(self):
+        return (NonDeterministicState(self, state) for state in self.iter_states())
+        
     def __repr__(self):
-        states = [state for state in self]
-        start_state_index = states.index(self.start_state)
-        end_state_index = states.index(self.end_state)
+        states = [state for state in self.iter_states()]
+        state_indices = dict((state, i) for i, state in enumerate(states))
         
         descriptions = []
         descriptions.append('    %d [label="start", shape=none];' % len(states))
         descriptions.append('    %s [label="end", shape=none];' % (len(states)+1))
         for state in states:
-            if len(state.ids) > 0:
-                descriptions.append('    %d [label="%d\\n(%s)"];' % (states.index(state), states.index(state), ", ".join([str(i) for i in state.ids])))
-        descriptions.append('    %d -> %d' % (len(states), start_state_index))
-        descriptions.append('    %d -> %d' % (end_state_index, len(states)+1))
+            if self.ids[state] != 0:
+                descriptions.append('    %d [label="%d\\n(%s)"];' % (state_indices[state], state_indices[state], ", ".join([str(i) for i in self.get_ids(self.ids[state])])))
+        descriptions.append('    %d -> %d' % (len(states), state_indices[self.start_state]))
+        descriptions.append('    %d -> %d' % (state_indices[self.end_state], len(states)+1))
+        
+        def format_codepoint(codepoint):
+            if codepoint in [ord('\\'), ord('"')]:
+                return "'\\%s'" % chr(codepoint)
+            elif codepoint in xrange(32, 127):
+                return "'%s'" % chr(codepoint)
+            else:
+                return "0x%x" % codepoint
+        
+        def format_case(range):
+            if range[0] == range[1]:
+                return "%s" % format_codepoint(range[0])
+            else:
+                return "%s-%s" % tuple([format_codepoint(i) for i in range])
+                
         for state in states:
-            state_index = states.index(state)
-            state_description = ""
-            if len(state.epsilon_edges) > 0:
-                descriptions.extend([unicode('    %d -> %d [label="&epsilon;"]') % (state_index, states.index(i)) for i in state.epsilon_edges])
-
-            def format_codepoint(codepoint):
-                if codepoint in [ord('\\'), ord('"')]:
-                    return "'\\%s'" % chr(codepoint)
-                elif codepoint in xrange(32, 127):
-                    return "'%s'" % chr(codepoint)
-                else:
-                    return "0x%x" % codepoint
-            
-            def format_case(range):
-                if range[0] == range[1]:
-                    return "%s" % format_codepoint(range[0])
-                else:
-                    return "%s-%s" % tuple([format_codepoint(i) for i in range])
-                    
-            for destination, edges in state.edges.iteritems():
+            state_index = state_indices[state]
+            descriptions.extend([unicode('    %d -> %d [label="&epsilon;"]') % (state_index, state_indices[i]) for i in self.get_epsilon_edges(state)])
+            for destination, edges in self.get_edges(state):
                 edge_label = ", ".join([format_case(i) for i in edges])
-                descriptions.append('    %d -> %d [label="%s"]' % (state_index, states.index(destination), edge_label))
+                descriptions.append('    %d -> %d [label="%s"]' % (state_index, state_indices[destination], edge_label))
 
         return "digraph {\n%s\n}\n" % "\n".join(descriptions)
         
+    def absorb(self, state_machine):
+        """
+        Copies the states and edges of another automata into this one, renumbering the copied states.
+        @param state_machine: a NonDeterministicFinite object to copy from. It is not modified.
+        @return: integer which, added to the number of a state in the copied automata, gives the number of its copy.
+        """
+        offset = len(self.ids)
+        
+        # Translate rule id bitsets and labels into those of this automata
+        bits = [self.get_rule_id_bit(i) for i in state_machine.rule_ids]
+        if bits == [1 << i for i in xrange(len(bits))]:
+            self.ids.extend(state_machine.ids)
+            self.final_ids.extend(state_machine.final_ids)
+        else:
+            bitsets = {0: 0}
+            def translate(bitset):
+                if bitset not in bitsets:
+                    bitsets[bitset] = sum(bit for i, bit in enumerate(bits) if bitset & (1 << i))
+                return bitsets[bitset]
+            self.ids.extend(translate(i) for i in state_machine.ids)
+            self.final_ids.extend(translate(i) for i in state_machine.final_ids)
+        label_indices = array('l')
+        for label in state_machine.labels:
+            label_index = self.label_indices.get(label)
+            if label_index is None:
+                label_index = len(self.labels)
+                self.labels.append(label)
+                self.label_indices[label] = label_index
+            label_indices.append(label_index)
+            
+        self.edge_sources.extend(array('l', (i + offset for i in state_machine.edge_sources)))
+        self.edge_labels.extend(array('l', (label_indices[i] for i in state_machine.edge_labels)))
+        self.edge_destinations.extend(array('l', (i + offset for i in state_machine.edge_destinations)))
+        self.epsilon_sources.extend(array('l', (i + offset for i in state_machine.epsilon_sources)))
+        self.epsilon_destinations.extend(array('l', (i + offset for i in state_machine.epsilon_destinations)))
+        self.edge_index = None
+        self.epsilon_index = None
+        return offset
+        
+    def extract(self, first_state, first_edge, first_epsilon_edge):
+        """
+        Copies the most recently added states and edges into a new automata. The edges copied must lead between the copied states.
+        @param first_state: integer representing the first state to copy. It and every state added after it are copied.
+        @param first_edge: integer representing the first labelled edge to copy, in the order in which edges were added.
+        @param first_epsilon_edge: integer representing the first epsilon edge to copy, in the order in which edges were added.
+        @return: a NonDeterministicFinite object, holding only the copied states, renumbered from 0. Its start and end states are 
+            the copies of first_state and the last state added, and should be set by the caller if others are wanted.
+        """
+        state_machine = NonDeterministicFinite()
+        state_machine.ids = self.ids[first_state:]
+        state_machine.final_ids = self.final_ids[first_state:]
+        state_machine.rule_ids = list(self.rule_ids)
+        state_machine.rule_id_bits = dict(self.rule_id_bits)
+        label_indices = {}
+        for label_index in self.edge_labels[first_edge:]:
+            if label_index not in label_indices:
+                label_indices[label_index] = len(state_machine.labels)
+                state_machine.labels.append(self.labels[label_index])
+        state_machine.label_indices = dict((label, i) for i, label in enumerate(state_machine.labels))
+        state_machine.edge_sources = array('l', (i - first_state for i in self.edge_sources[first_edge:]))
+        state_machine.edge_labels = array('l', (label_indices[i] for i in self.edge_labels[first_edge:]))
+        state_machine.edge_destinations = array('l', (i - first_state for i in self.edge_destinations[first_edge:]))
+        state_machine.epsilon_sources = array('l', (i - first_state for i in self.epsilon_sources[first_epsilon_edge:]))
+        state_machine.epsilon_destinations = array('l', (i - first_state for i in self.epsilon_destinations[first_epsilon_edge:]))
+        state_machine.start_state = 0
+        state_machine.end_state = len(state_machine.ids) - 1
+        return state_machine
+        
     @staticmethod
     def concatenate(state_machines):
         """
         Merges a list of state machines by concatenating one after the other.
         Effectively places an epsilon transition between the end state of each automata and the initial state of the next.
-        State machines are consumed by this function and cannot be used afterwards.
+        The state machines are copied and left unchanged.
         @param state_machines: An array of Automata.NonDeterministicFinite objects representing the automata to be merged.
         @return: An Automata.NonDeterministicFinite object representing the merged state machines.
         """
-        if len(state_machines) == 1:
-            return state_machines[0]
-
-        # Chain state machines with epsilons
-        for i in xrange(len(state_machines)-1):
-            for state in state_machines[i]:
-                if state_machines[i].end_state in state.epsilon_edges:
-                    state.epsilon_edges.remove(state_machines[i].end_state)
-                    state.epsilon_edges.add(state_machines[i+1].start_state)
-                if state_machines[i].end_state in state.edges:
-                    state.edges[state_machines[i+1].start_state].update(state.edges[state_machines[i].end_state])
-                    del state.edges[state_machines[i].end_state]
-        state_machines[0].end_state = state_machines[-1].end_state
-        return state_machines[0]
+        concatenated_state_machine = NonDeterministicFinite()
+        previous_end_state = concatenated_state_machine.start_state
+        for state_machine in state_machines:
+            offset = concatenated_state_machine.absorb(state_machine)
+            concatenated_state_machine.add_epsilon_edge(previous_end_state, state_machine.start_state + offset)
+            previous_end_state = state_machine.end_state + offset
+        concatenated_state_machine.add_epsilon_edge(previous_end_state, concatenated_state_machine.end_state)
+        return concatenated_state_machine
     
     @staticmethod
     def alternate(state_machines):
@@ -138,12 +419,13 @@ class NonDeterministicFinite(object):
         Merges a list of state machines by alternating them. 
         Effectively creates a new initial state with epsilon edges to each automata'a initial state, 
         and a final state with epsilon edges from each automata's final state.
-        State machines are consumed and cannot be used after calling this function
+        The state machines are copied and left unchanged.
         @param state_machines: a list of Automata.NonDeterministicFinite objects representing the state machines to be merged.
         @return: an Automata.NonDeterministicFinite object representing the merged state machines.
         """
         alternated_state_machine = NonDeterministicFinite()
         for state_machine in state_machines:
-            alternated_state_machine.start_state.epsilon_edges.add(state_machine.start_state)
-            state_machine.end_state.epsilon_edges.add(alternated_state_machine.end_state)
+            offset = alternated_state_machine.absorb(state_machine)
+            alternated_state_machine.add_epsilon_edge(alternated_state_machine.start_state, state_machine.start_state + offset)
+            alternated_state_machine.add_epsilon_edge(state_machine.end_state + offset, alternated_state_machine.end_state)
         return alternated_state_machine
@@ -19,31 +19,119 @@
 # DEALINGS IN THE SOFTWARE.
 
 from .. import Regex
-import copy
-import string
+from ..CoverageSet import CoverageSet
 from NonDeterministicFinite import NonDeterministicFinite
 
+class FragmentCache(object):
+    """
+    Holds the NFA fragments converted from sub-expressions, so that a sub-expression which appears more than once,
+    within a rule or in several rules, is copied rather than converted again. A fragment is only kept once its 
+    sub-expression has been seen twice, so that the many sub-expressions which appear once take no extra memory.
+    @ivar fragments: dict mapping regular expression objects in the Regex namespace, which compare by structure, to
+        None if the sub-expression has been seen once, or otherwise to a NonDeterministicFinite object holding its fragment.
+    """
+    def __init__(self):
+        self.fragments = {}
+        
 class NonDeterministicFiniteBuilder(object):
     """
     Visitor object which converts a regular expression into a non-deterministic finite automata (NFA) graph. 
+    The whole graph is built in a single NonDeterministicFinite object. Each sub-expression is converted into a 
+    fragment of the graph, a tuple with its start state and end state, so that fragments can be concatenated 
+    or alternated just by adding epsilon edges between them.
+    @ivar state_machine: the NonDeterministicFinite object in which the graph is built.
+    @ivar fragments: stack of tuples, each with the start state and end state of a converted sub-expression.
+    @ivar fragment_cache: FragmentCache object holding fragments which may be copied, or None if fragments are not reused.
     """
-    def __init__(self, id, defines={}):
-        self.state_machines = []
+    def __init__(self, id, defines={}, fragment_cache=None):
+        self.state_machine = NonDeterministicFinite()
+        self.fragments = []
         self.id = id
         self.defines = defines
+        self.fragment_cache = fragment_cache
         
     @staticmethod
-    def build(id, defines, regex):
+    def build(id, defines, regex, fragment_cache=None):
         """
         Build a non-deterministic finite automata object from a regular expression
         @param id: the ID of the non-deterministic finite automata
         @param defines: a dict mapping string variable names to regular expression objects in the Regex namespace.
         @param regex: a regular expression object in the Regex namespace to convert to a non-deterministic finite automata object
+        @param fragment_cache: optional FragmentCache object, shared between builds to reuse the fragments of repeated sub-expressions.
         @return: an Automata.NonDeterministicFinite object
         """
-        builder = NonDeterministicFiniteBuilder(id, defines)
-        regex.accept(builder)
+        # Variables are resolved first, so that cached fragments never depend on the scope in which they were defined
+        resolver = Regex.VariableResolver(defines)
+        regex.accept(resolver)
+        builder = NonDeterministicFiniteBuilder(id, defines, fragment_cache)
+        resolver.get().accept(builder)
         return builder.get()
+        
+    def add_fragment(self, values=None):
+        """
+        Creates a fragment with a new start state and end state.
+        @param values: CoverageSet object representing the values leading from the start state to the end state, 
+            or None if the states should not be connected.
+        @return: a tuple with integers representing the start state and the end state of the fragment.
+        """
+        start_state = self.state_machine.add_state()
+        end_state = self.state_machine.add_state()
+        if values is not None:
+            self.state_machine.add_edge(start_state, values, end_state)
+        return (start_state, end_state)
+        
+    def concatenate(self, fragments):
+        """
+        Joins a list of fragments by linking the end state of each to the start state of the next with an epsilon edge.
+        @param fragments: list of tuples, each with the start state and end state of a fragment.
+        @return: a tuple with the start state and end state of the concatenated fragments.
+        """
+        for (start_state, end_state), (next_start_state, next_end_state) in zip(fragments, fragments[1:]):
+            self.state_machine.add_epsilon_edge(end_state, next_start_state)
+        return (fragments[0][0], fragments[-1][1])
+        
+    def alternate(self, fragments):
+        """
+        Joins a list of fragments with a new start state and end state, linked to each fragment by epsilon edges.
+        @param fragments: list of tuples, each with the start state and end state of a fragment.
+        @return: a tuple with the start state and end state of the alternated fragments.
+        """
+        fragment = self.add_fragment()
+        for start_state, end_state in fragments:
+            self.state_machine.add_epsilon_edge(fragment[0], start_state)
+            self.state_machine.add_epsilon_edge(end_state, fragment[1])
+        return fragment
+        
+    def visit_cached(self, regex, convert):
+        """
+        Converts a sub-expression, or copies the fragment converted for an identical sub-expression if there is one.
+        Pushes the fragment onto a stack.
+        @param regex: a regular expression object in the Regex namespace representing the sub-expression.
+        @param convert: function taking no parameters which converts the sub-expression, pushing its fragment onto the stack.
+        """
+        if self.fragment_cache is None:
+            convert()
+            return
+        # The cache is searched for every sub-expression, which is cheap since each expression's hash is computed
+        # once, when it is created
+        fragment_count = len(self.fragment_cache.fragments)
+        cached_state_machine = self.fragment_cache.fragments.setdefault(regex, None)
+        if cached_state_machine is not None:
+            offset = self.state_machine.absorb(cached_state_machine)
+            self.fragments.append((cached_state_machine.start_state + offset, cached_state_machine.end_state + offset))
+            return
+            
+        first_state = self.state_machine.get_state_count()
+        first_edge = len(self.state_machine.edge_sources)
+        first_epsilon_edge = len(self.state_machine.epsilon_sources)
+        convert()
+        if len(self.fragment_cache.fragments) == fragment_count:
+            # Seen before, so keep the fragment. Every state and edge added by converting belongs to it.
+            start_state, end_state = self.fragments[-1]
+            fragment_state_machine = self.state_machine.extract(first_state, first_edge, first_epsilon_edge)
+            fragment_state_machine.start_state = start_state - first_state
+            fragment_state_machine.end_state = end_state - first_state
+            self.fragment_cache.fragments[regex] = fragment_state_machine
     
     def visit_literal(self, literal):
         """
@@ -51,9 +139,7 @@ class NonDeterministicFiniteBuilder(object):
         Pushes the NFA onto a stack.
         @param literal: a Regex.Literal object representing the literal to convert.
         """
-        state_machine = NonDeterministicFinite()
-        state_machine.start_state.edges[state_machine.end_state].update(literal.characters)
-        self.state_machines.append(state_machine)
+        self.fragments.append(self.add_fragment(literal.characters))
  
     def visit_literal_except(self, literal_except):
         """
@@ -61,10 +147,9 @@ class NonDeterministicFiniteBuilder(object):
         Pushes the NFA onto a stack.
         @param literal_except: a Regex.LiteralExcept object representing the inverse literal to convert.
         """
-        state_machine = NonDeterministicFinite()
-        state_machine.start_state.edges[state_machine.end_state].add(1, 0x10FFFF)
-        state_machine.start_state.edges[state_machine.end_state].difference_update(literal_except.characters)
-        self.state_machines.append(state_machine)        
+        values = CoverageSet([(1, 0x10FFFF)])
+        values.difference_update(literal_except.characters)
+        self.fragments.append(self.add_fragment(values))
  
     def visit_repetition(self, repetition):
         """
@@ -72,40 +157,53 @@ class NonDeterministicFiniteBuilder(object):
         Pushes the NFA onto a stack.
         @param repetition: a Regex.Repetition object representing the repeated expression to convert.
         """
-        state_machine = None
-        repetition.child.accept(self)
-        child_state_machine = self.state_machines.pop()
+        self.visit_cached(repetition, lambda: self.convert_repetition(repetition))
+        
+    def convert_repetition(self, repetition):
+        """
+        Converts a repeated regular expression, without looking for it in the fragment cache.
+        """
+        def copy_child():
+            # Each repetition needs its own states, so the child is converted again, or copied from the fragment cache
+            repetition.child.accept(self)
+            return self.fragments.pop()
+            
+        fragment = None
         
         # Create optional 0 to max-min
         repetition_min = repetition.min
         if repetition.max == Regex.Repetition.Infinity:
             # Kleene star
-            inner_state_machine = copy.deepcopy(child_state_machine)
-            state_machine = NonDeterministicFinite()
-            state_machine.start_state.epsilon_edges.add(inner_state_machine.start_state)
-            inner_state_machine.end_state.epsilon_edges.add(state_machine.end_state)
-            inner_state_machine.end_state.epsilon_edges.add(inner_state_machine.start_state)
+            inner_fragment = copy_child()
+            fragment = self.add_fragment()
+            self.state_machine.add_epsilon_edge(fragment[0], inner_fragment[0])
+            self.state_machine.add_epsilon_edge(inner_fragment[1], fragment[1])
+            self.state_machine.add_epsilon_edge(inner_fragment[1], inner_fragment[0])
             if repetition.min == 0:
-                state_machine.start_state.epsilon_edges.add(state_machine.end_state)
+                self.state_machine.add_epsilon_edge(fragment[0], fragment[1])
             else:
                 repetition_min -= 1
             
         elif repetition.max > repetition_min:
-            state_machines = [copy.deepcopy(child_state_machine) for i in xrange(repetition.max - repetition_min)]
-            for state_machine in state_machines:
-                state_machine.start_state.epsilon_edges.add(state_machine.end_state)
-            state_machine = NonDeterministicFinite.concatenate(state_machines)
+            fragments = [copy_child() for i in xrange(repetition.max - repetition_min)]
+            for start_state, end_state in fragments:
+                self.state_machine.add_epsilon_edge(start_state, end_state)
+            fragment = self.concatenate(fragments)
             
         # Prepend minimal repetition 
         if repetition_min > 0:
-            head_state_machines = [copy.deepcopy(child_state_machine) for i in xrange(repetition_min)]
-            head_state_machine = NonDeterministicFinite.concatenate(head_state_machines)
-            if state_machine is None:
-                state_machine = head_state_machine
+            head_fragment = self.concatenate([copy_child() for i in xrange(repetition_min)])
+            if fragment is None:
+                fragment = head_fragment
             else:
-                state_machine = NonDeterministicFinite.concatenate([head_state_machine, state_machine])
+                fragment = self.concatenate([head_fragment, fragment])
+                
+        # Zero repetitions match only the empty string
+        if fragment is None:
+            fragment = self.add_fragment()
+            self.state_machine.add_epsilon_edge(fragment[0], fragment[1])
                 
-        self.state_machines.append(state_machine)
+        self.fragments.append(fragment)
         
     def visit_concatenation(self, concatenation):
         """
@@ -113,12 +211,17 @@ class NonDeterministicFiniteBuilder(object):
         Pushes the graph onto a stack.
         @param concatenation: a Regex.Concatenation object representing the set of concatenated expressions.
         """
-        child_state_machines = []
+        self.visit_cached(concatenation, lambda: self.convert_concatenation(concatenation))
+        
+    def convert_concatenation(self, concatenation):
+        """
+        Converts a concatenated set of regular expressions, without looking for it in the fragment cache.
+        """
+        child_fragments = []
         for child in concatenation.children:
             child.accept(self)
-            child_state_machines.append(self.state_machines.pop())
-        
-        self.state_machines.append(NonDeterministicFinite.concatenate(child_state_machines))
+            child_fragments.append(self.fragments.pop())
+        self.fragments.append(self.concatenate(child_fragments))
                 
     def visit_alternation(self, alternation):
         """
@@ -126,11 +229,17 @@ class NonDeterministicFiniteBuilder(object):
         Pushes the graph onto a stack.
         @param alternation: a Regex.Alternation object representing the set of alternated expressions.
         """
-        child_state_machines = []
+        self.visit_cached(alternation, lambda: self.convert_alternation(alternation))
+        
+    def convert_alternation(self, alternation):
+        """
+        Converts an alternated set of regular expressions, without looking for it in the fragment cache.
+        """
+        child_fragments = []
         for child in alternation.children:
             child.accept(self)
-            child_state_machines.append(self.state_machines.pop())
-        self.state_machines.append(NonDeterministicFinite.alternate(child_state_machines))
+            child_fragments.append(self.fragments.pop())
+        self.fragments.append(self.alternate(child_fragments))
 
     def visit_variable(self, variable):
         """
@@ -145,9 +254,12 @@ class NonDeterministicFiniteBuilder(object):
         Returns the NFA graph for the top level regular expression visited by this object.
         @return: an Automata.NonDeterministicFinite object representing the NFA.
         """
-        if len(self.state_machines) > 0:
-            for state in self.state_machines[0]:
-                state.ids.add(self.id)
-            self.state_machines[0].end_state.final_ids.add(self.id)
-            return self.state_machines[0]
+        if len(self.fragments) > 0:
+            # The states the automata was created with are left unused, as they are not linked to any fragment
+            self.state_machine.start_state, self.state_machine.end_state = self.fragments[0]
             
+            # Every state was created for this expression, so every state may lead to a match
+            bit = self.state_machine.get_rule_id_bit(self.id)
+            self.state_machine.ids = [bit] * self.state_machine.get_state_count()
+            self.state_machine.final_ids[self.state_machine.end_state] = bit
+            return self.state_machine
@@ -1,4 +1,5 @@
 from NonDeterministicFinite import NonDeterministicState, NonDeterministicFinite
 from DeterministicFinite import DeterministicState, DeterministicFinite
-from NonDeterministicFiniteBuilder import NonDeterministicFiniteBuilder
+from NonDeterministicFiniteBuilder import NonDeterministicFiniteBuilder, FragmentCache
 from DeterministicFiniteBuilder import DeterministicFiniteBuilder
+from EquivalenceClasses import EquivalenceClasses
@@ -34,6 +34,8 @@ def handle():
             return 'list-languages', None
         if sys.argv[1] == 'list-forms':
             return 'list-forms', None
+        if sys.argv[1] == 'compile-unicode':
+            return 'compile-unicode', None
     
     # Parse complex options
     arg_parser = argparse.ArgumentParser()
@@ -46,7 +48,16 @@ def handle():
     arg_parser.add_argument("-c", "--class-name", help="The name of the lexical analyzer class to generate", default=None)
     arg_parser.add_argument("-f", "--file-name", help="The base name of the generated source files", default=None)
     arg_parser.add_argument("-s", "--namespace", help="The namespace name of the lexical analyzer class to generate", default=None)
+    arg_parser.add_argument("--token-view", help="Tokens refer to their text where it is in the input, instead of copying it. Only supported by the cpp language", action="store_true")
+    arg_parser.add_argument("--code-form", help="How the state machine is written. 'switch' writes each state as code, 'table' writes compressed transition tables driven by a loop, and 'goto' writes each state as a label jumped to directly. Only supported by the cpp language", default="switch", choices=['switch', 'table', 'goto'])
     arg_parser.add_argument("-p", "--plugin-file", help="The file describing available language plugins", default=None)
+    arg_parser.add_argument("-j", "--jobs", help="Number of processes among which to divide the sections of the rules file. Use 0 for one per processor", default=1, type=int, metavar="N")
+    arg_parser.add_argument("--cache-dir", help="Directory in which to cache the DFAs of sections between runs. Default is ~/.cache/poodle-lex", default=None, metavar="DIRECTORY")
+    arg_parser.add_argument("--cache-size", help="Size, in megabytes, beyond which the least recently used DFAs are removed from the cache", default=64, type=int, metavar="MEGABYTES")
+    arg_parser.add_argument("--incremental", help="Only write output files whose contents have changed, and skip generating files whose inputs have not changed since the last incremental run", action="store_true")
+    arg_parser.add_argument("--no-cache", help="Build every DFA and Unicode property, without reading or writing the caches", action="store_true")
+    arg_parser.add_argument("--profile", help="Print the time, memory and number of states taken by each phase, and each section, to stderr", action="store_true")
+    arg_parser.add_argument("--profile-json", help="Also write the profile to a JSON file. Implies --profile", default=None, metavar="FILE")
     arguments = arg_parser.parse_args()
 
     return 'build', arguments
@@ -18,77 +18,167 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
-import blist
+from array import array
+import bisect
+import heapq
 import itertools
+import weakref
+
+def _union(starts_a, ends_a, starts_b, ends_b):
+    """
+    Internal function, merges two sorted, non-overlapping interval lists into one.
+    @return: a tuple with two arrays, containing the start values and end values of the merged intervals.
+    """
+    starts = array('l')
+    ends = array('l')
+    i, j = 0, 0
+    len_a, len_b = len(starts_a), len(starts_b)
+    while i < len_a or j < len_b:
+        if j == len_b or (i < len_a and starts_a[i] <= starts_b[j]):
+            min_v, max_v = starts_a[i], ends_a[i]
+            i += 1
+        else:
+            min_v, max_v = starts_b[j], ends_b[j]
+            j += 1
+        if len(ends) > 0 and min_v <= ends[-1] + 1:
+            if max_v > ends[-1]:
+                ends[-1] = max_v
+        else:
+            starts.append(min_v)
+            ends.append(max_v)
+    return starts, ends
+    
+def _difference(starts_a, ends_a, starts_b, ends_b):
+    """
+    Internal function, removes the intervals in one sorted interval list from another.
+    @return: a tuple with two arrays, containing the start values and end values of the remaining intervals.
+    """
+    starts = array('l')
+    ends = array('l')
+    j = 0
+    len_b = len(starts_b)
+    for min_v, max_v in itertools.izip(starts_a, ends_a):
+        while j < len_b and ends_b[j] < min_v:
+            j += 1
+        k = j
+        while k < len_b and starts_b[k] <= max_v:
+            if starts_b[k] > min_v:
+                starts.append(min_v)
+                ends.append(starts_b[k] - 1)
+            min_v = ends_b[k] + 1
+            if min_v > max_v:
+                break
+            k += 1
+        if min_v <= max_v:
+            starts.append(min_v)
+            ends.append(max_v)
+    return starts, ends
+    
+def _intersection(starts_a, ends_a, starts_b, ends_b):
+    """
+    Internal function, finds the intervals covered by both of two sorted interval lists.
+    @return: a tuple with two arrays, containing the start values and end values of the common intervals.
+    """
+    starts = array('l')
+    ends = array('l')
+    i, j = 0, 0
+    len_a, len_b = len(starts_a), len(starts_b)
+    while i < len_a and j < len_b:
+        min_v = max(starts_a[i], starts_b[j])
+        max_v = min(ends_a[i], ends_b[j])
+        if min_v <= max_v:
+            starts.append(min_v)
+            ends.append(max_v)
+        if ends_a[i] < ends_b[j]:
+            i += 1
+        else:
+            j += 1
+    return starts, ends
+    
+def _to_bitmap(starts, ends, limit):
+    """
+    Internal function, converts the part of a sorted interval list below a limit into a bitmap.
+    @return: an integer, in which each bit n is set if the value n is covered by an interval.
+    """
+    bitmap = 0
+    for min_v, max_v in itertools.izip(starts, ends):
+        if min_v >= limit:
+            break
+        max_v = min(max_v, limit - 1)
+        bitmap |= ((1 << (max_v - min_v + 1)) - 1) << min_v
+    return bitmap
+    
+def _from_bitmap(bitmap):
+    """
+    Internal function, converts a bitmap into a sorted interval list.
+    @return: a tuple with two arrays, containing the start values and end values of each run of set bits.
+    """
+    starts = array('l')
+    ends = array('l')
+    offset = 0
+    while bitmap != 0:
+        skipped = (bitmap & -bitmap).bit_length() - 1
+        bitmap >>= skipped
+        offset += skipped
+        length = (~bitmap & (bitmap + 1)).bit_length() - 1
+        starts.append(offset)
+        ends.append(offset + length - 1)
+        bitmap >>= length
+        offset += length
+    return starts, ends
 
 class CoverageSet(object):
     """
-    Uses a set of intervals to define a numerical space. Stored as a sorted list
+    Uses a set of intervals to define a numerical space. Stored as two sorted arrays of 
+    inclusive start and end values, which are kept free of overlapping or adjacent intervals.
+    Sets which only cover ASCII values also keep a bitmap, so that membership tests, comparison
+    and set algebra on them become integer operations.
     """
+    ascii_limit = 0x80
+    
     def __init__(self, intervals=[]):
         """
         @param intervals: a list of tuples, each with a minimum number and a maximum number representing a range of values covered by the set.
         """
-        self.intervals = blist.sortedlist()
-        self.dirty = False
-        for min_v, max_v in intervals:
-            self.add(min_v, max_v)
+        if isinstance(intervals, CoverageSet):
+            self.starts = array('l', intervals.starts)
+            self.ends = array('l', intervals.ends)
+            self.ascii_bitmap = intervals.ascii_bitmap
+        else:
+            self.starts = array('l')
+            self.ends = array('l')
+            self.ascii_bitmap = None
+            for min_v, max_v in intervals:
+                self.add(min_v, max_v)
             
     def __iter__(self):
-        self.remove_overlap()
-        interval_endpoints = iter(self.intervals)
-        while True:
-            try:
-                min_v, is_end = next(interval_endpoints)
-                max_v, is_end = next(interval_endpoints)
-                yield (min_v, max_v)
-            except StopIteration:
-                break
+        return itertools.izip(self.starts, self.ends)
                 
     def is_empty(self):
-        return len(self.intervals) >= 2
-    
-    def merge_adjacent(self):
+        return len(self.starts) == 0
+        
+    def is_ascii(self):
         """
-        Internal method, merges intervals for which the maximum of one interval is one less than the minimum of another interval.
+        @return: True if the set covers no values outside of the ASCII range.
         """
-        if len(self.intervals) < 4:
-            return
-        i = len(self.intervals)-4
-        while i >= 0:
-            if self.intervals[i+1][0] == self.intervals[i+2][0]-1:
-                min_v, is_end = self.intervals[i]
-                max_v, is_end = self.intervals[i+3]
-                del self.intervals[i:i+4]
-                self.add(min_v, max_v)
-            i -= 2
-    
-    def remove_overlap(self):
-        """
-        Internal method. Merges overlapping intervals.
-        """
-        reverse_enumerate = lambda l: itertools.izip(xrange(len(l)-1, -1, -1), reversed(l))
-        if self.dirty:
-            level = 0
-            did_remove = False
-            to_delete = []
-            for i, (value, is_end) in reverse_enumerate(self.intervals):
-                if is_end == 1:
-                    if level > 0:
-                        to_delete.append(i)
-                        did_remove = True
-                    level += 1
-                else:
-                    if level > 1:
-                        to_delete.append(i)
-                        did_remove = True
-                    level -= 1
-            for index in to_delete:
-                del self.intervals[index]
-            self.merge_adjacent()
-            self.dirty = False
-            return did_remove
-        return False
+        return len(self.ends) == 0 or self.ends[-1] < CoverageSet.ascii_limit
+        
+    def get_ascii_bitmap(self):
+        """
+        Returns a bitmap of the ASCII values covered by the set, building it on first use.
+        @return: an integer, in which each bit n is set if the ASCII value n is covered by the set.
+        """
+        if self.ascii_bitmap is None:
+            self.ascii_bitmap = _to_bitmap(self.starts, self.ends, CoverageSet.ascii_limit)
+        return self.ascii_bitmap
+        
+    def set_ascii_bitmap(self, bitmap):
+        """
+        Internal method, replaces the set's coverage with the ASCII values in a bitmap.
+        @param bitmap: an integer, in which each bit n is set if the ASCII value n is to be covered.
+        """
+        self.starts, self.ends = _from_bitmap(bitmap)
+        self.ascii_bitmap = bitmap
 
     def add(self, min_v, max_v):
         """
@@ -97,8 +187,15 @@ class CoverageSet(object):
         @param min_v: the inclusive minimum value covered by the range.
         @param max_v: the inclusive maximum value covered by the range.
         """
-        self.intervals.update(((min_v, 0), (max_v, 1)))
-        self.dirty = True
+        # Intervals which overlap or touch the new range are absorbed into it
+        first = bisect.bisect_left(self.ends, min_v - 1)
+        last = bisect.bisect_right(self.starts, max_v + 1)
+        if first < last:
+            min_v = min(min_v, self.starts[first])
+            max_v = max(max_v, self.ends[last-1])
+        self.starts[first:last] = array('l', [min_v])
+        self.ends[first:last] = array('l', [max_v])
+        self.ascii_bitmap = None
         
     def remove(self, min_v, max_v):
         """
@@ -108,25 +205,21 @@ class CoverageSet(object):
         @param min_v: the inclusive minimum value of the range to be removed.
         @param max_v: the inclusive maximum value of the range to be removed.
         """
-        self.remove_overlap()
-        before_min = self.intervals.bisect_left((min_v, 0))
-        after_max = self.intervals.bisect_right((max_v, 1))
-        if after_max == 0 or before_min == len(self.intervals):
+        first = bisect.bisect_left(self.ends, min_v)
+        last = bisect.bisect_right(self.starts, max_v)
+        if first >= last:
             return
-        if (after_max - before_min) & 0x01 == 0:
-            min_value, min_is_end = self.intervals[before_min]
-            max_value, max_is_end = self.intervals[after_max-1]
-            del self.intervals[before_min:after_max]
-            if min_is_end == 1 and max_is_end == 0:
-                self.intervals.add((min_v-1, 1))
-                self.intervals.add((max_v+1, 0))
-        else:
-            min_value, min_is_end = self.intervals[before_min]
-            del self.intervals[before_min:after_max]
-            if min_is_end == 0:
-                self.intervals.add((max_v + 1, 0))
-            else:
-                self.intervals.add((min_v - 1, 1))
+        remaining_starts = array('l')
+        remaining_ends = array('l')
+        if self.starts[first] < min_v:
+            remaining_starts.append(self.starts[first])
+            remaining_ends.append(min_v - 1)
+        if self.ends[last-1] > max_v:
+            remaining_starts.append(max_v + 1)
+            remaining_ends.append(self.ends[last-1])
+        self.starts[first:last] = remaining_starts
+        self.ends[first:last] = remaining_ends
+        self.ascii_bitmap = None
 
     def update(self, *other_coverage_sets):
         """
@@ -135,8 +228,17 @@ class CoverageSet(object):
         @param other_coverage_sets: one or more CoverageSet objects, the coverage of which will be added to this object.
         """
         for coverage_set in other_coverage_sets:
-            self.intervals.update(coverage_set.intervals)
-        self.dirty = True
+            if len(self.starts) == 0:
+                self.starts = array('l', coverage_set.starts)
+                self.ends = array('l', coverage_set.ends)
+                self.ascii_bitmap = coverage_set.ascii_bitmap
+            elif len(coverage_set.starts) == 0:
+                pass
+            elif self.is_ascii() and coverage_set.is_ascii():
+                self.set_ascii_bitmap(self.get_ascii_bitmap() | coverage_set.get_ascii_bitmap())
+            else:
+                self.starts, self.ends = _union(self.starts, self.ends, coverage_set.starts, coverage_set.ends)
+                self.ascii_bitmap = None
         
     def difference_update(self, *other_coverage_sets):
         """
@@ -144,22 +246,31 @@ class CoverageSet(object):
         @param other_coverage_sets: one or more CoverageSet objects, the coverage of which will be removed from this object.
         """
         for coverage_set in other_coverage_sets:
-            coverage_set.remove_overlap()
-            for i in xrange(0, len(coverage_set.intervals), 2):
-                (min_v, min_is_end), (max_v, max_is_end) = coverage_set.intervals[i:i+2]
-                self.remove(min_v, max_v)
+            if len(self.starts) == 0 or len(coverage_set.starts) == 0:
+                pass
+            elif self.is_ascii():
+                self.set_ascii_bitmap(self.get_ascii_bitmap() & ~coverage_set.get_ascii_bitmap())
+            else:
+                self.starts, self.ends = _difference(self.starts, self.ends, coverage_set.starts, coverage_set.ends)
+                self.ascii_bitmap = None
                 
     def __eq__(self, other_coverage_set):
-        self.remove_overlap()
-        other_coverage_set.remove_overlap()
-        return self.intervals == other_coverage_set.intervals
+        if not isinstance(other_coverage_set, CoverageSet):
+            return NotImplemented
+        if self.ascii_bitmap is not None and other_coverage_set.ascii_bitmap is not None:
+            if self.ascii_bitmap != other_coverage_set.ascii_bitmap:
+                return False
+        return self.starts == other_coverage_set.starts and self.ends == other_coverage_set.ends
     
     def __ne__(self, other_coverage_set):
         return not (self == other_coverage_set)
         
     def __hash__(self):
-        self.remove_overlap()
-        return hash(tuple(sorted(i for i in self)))
+        if len(self.ends) == 0 or self.ends[-1] < CoverageSet.ascii_limit:
+            if self.ascii_bitmap is None:
+                self.ascii_bitmap = _to_bitmap(self.starts, self.ends, CoverageSet.ascii_limit)
+            return hash(self.ascii_bitmap)
+        return hash((self.starts.tostring(), self.ends.tostring()))
     
     def __str__(self):
         def format_codepoint(codepoint):
@@ -176,7 +287,6 @@ class CoverageSet(object):
             else:
                 return "%s-%s" % tuple([format_codepoint(i) for i in intervals])
                 
-        #self.remove_overlap()
         return "CoverageSet([%s])" % ", ".join([repr(remove_duplicates(i)) for i in self])
     
     def __repr__(self):
@@ -188,39 +298,26 @@ class CoverageSet(object):
         
         @param other_coverage_sets: one or more other CoverageSet objects.
         """
-        reverse_enumerate = lambda l: itertools.izip(xrange(len(l)-1, -1, -1), reversed(l))
-        for other_coverage_set in other_coverage_sets:
-            other_coverage_set.remove_overlap()
-        self.update(*other_coverage_sets)
-        IDLE=0
-        EXPECT_MAX=1
-        EXPECT_MIN=2
-        new_intervals = blist.sortedlist()
-        state = IDLE
-        level = 0
-        for i, (value, is_end) in reverse_enumerate(self.intervals):
-            if is_end == 1:
-                level += 1
+        for coverage_set in other_coverage_sets:
+            if self.is_ascii() or coverage_set.is_ascii():
+                self.set_ascii_bitmap(self.get_ascii_bitmap() & coverage_set.get_ascii_bitmap())
             else:
-                level -= 1
-            if state == IDLE:
-                if level == len(other_coverage_sets)+1:
-                    new_intervals.add((value, is_end))
-                    state = EXPECT_MIN
-            elif state == EXPECT_MIN:
-                if is_end == 0:
-                    new_intervals.add((value, is_end))
-                    state = EXPECT_MAX
-                else:
-                    state = IDLE
-            elif state == EXPECT_MAX:
-                if is_end == 1:
-                    new_intervals.add((value, is_end))
-                    state = EXPECT_MIN
-                else:
-                    state = IDLE
-        self.intervals = new_intervals
+                self.starts, self.ends = _intersection(self.starts, self.ends, coverage_set.starts, coverage_set.ends)
+                self.ascii_bitmap = None
     
+    @staticmethod
+    def from_arrays(starts, ends):
+        """
+        Returns a new CoverageSet object from the bounds of its intervals, which are not checked.
+        
+        @param starts: sequence of integers with the inclusive minimum of each interval, in increasing order.
+        @param ends: sequence of integers with the inclusive maximum of each interval. Intervals may not overlap or touch.
+        """
+        new_coverage_set = CoverageSet()
+        new_coverage_set.starts = array('l', starts)
+        new_coverage_set.ends = array('l', ends)
+        return new_coverage_set
+        
     @staticmethod
     def union(*coverage_sets):
         """
@@ -240,8 +337,7 @@ class CoverageSet(object):
         @param first_coverage_set: CoverageSet object representing a range of values
         @param other_coverage_sets: CoverageSet objects representing ranges of values to exclude
         """
-        new_coverage_set = CoverageSet()
-        new_coverage_set.update(first_coverage_set)
+        new_coverage_set = CoverageSet(first_coverage_set)
         new_coverage_set.difference_update(*other_coverage_sets)
         return new_coverage_set
     
@@ -271,54 +367,125 @@ class CoverageSet(object):
             value and inclusive maximum value of the interval. The second element is a list of 
             identifiers, each representing a CoverageSet object that covers the interval.
         """
-        for coverage_set, set_id in coverage_sets_and_ids:
-            coverage_set.remove_overlap()
-        endpoint_lists_with_ids = [zip(coverage_set.intervals, [set_id]*len(coverage_set.intervals)) for coverage_set, set_id in coverage_sets_and_ids]
-        unified = blist.sortedlist()
-        for item in endpoint_lists_with_ids:
-            unified.update(item)
-        unified_iter = iter(unified)
-        (last_value, last_is_end), set_id = next(unified_iter)
-        level = 1
-        set_ids = set([set_id])
-        for (value, is_end), set_id in unified_iter:
-            if level > 0:
-                if value == last_value + 1 and is_end == 0 and last_is_end == 1:
-                    pass
-                elif value == last_value and is_end == 1 and last_is_end == 0:
-                    yield (last_value, value), frozenset(set_ids)
-                elif value != last_value:
-                    if is_end == 0 and last_is_end == 0:
-                        yield (last_value, value-1), frozenset(set_ids)
-                    elif is_end == 0 and last_is_end == 1:
-                        yield (last_value+1, value-1), frozenset(set_ids)
-                    elif is_end == 1 and last_is_end == 0:
-                        yield (last_value, value), frozenset(set_ids)
-                    elif is_end == 1 and last_is_end == 1:
-                        yield (last_value+1, value), frozenset(set_ids)
-            if is_end == 0:
-                level += 1
-                set_ids.add(set_id)
-            else:
-                level -= 1
-                set_ids.remove(set_id)
-            last_value, last_is_end = value, is_end
+        # Each input keeps exactly one pending endpoint in the heap: the start of its next interval while outside
+        # of an interval, or the value following the end of its current interval while inside one. Cursors count
+        # endpoints consumed, so the interval index is cursor/2, and an odd cursor means the input is inside it.
+        inputs = [(coverage_set.starts, coverage_set.ends, set_id) for coverage_set, set_id in coverage_sets_and_ids]
+        cursors = [0]*len(inputs)
+        heap = [(starts[0], index) for index, (starts, ends, set_id) in enumerate(inputs) if len(starts) > 0]
+        heapq.heapify(heap)
+        
+        # Sweep through the endpoints, keeping count of how many intervals of each identifier are active
+        active = {}
+        set_ids = frozenset()
+        segment_min = None
+        while len(heap) > 0:
+            value = heap[0][0]
+            is_changed = False
+            while len(heap) > 0 and heap[0][0] == value:
+                index = heap[0][1]
+                starts, ends, set_id = inputs[index]
+                cursor = cursors[index]
+                cursors[index] = cursor + 1
+                interval = cursor >> 1
+                if cursor & 1 == 0:
+                    if set_id in active:
+                        active[set_id] += 1
+                    else:
+                        active[set_id] = 1
+                        is_changed = True
+                    heapq.heapreplace(heap, (ends[interval] + 1, index))
+                else:
+                    if active[set_id] == 1:
+                        del active[set_id]
+                        is_changed = True
+                    else:
+                        active[set_id] -= 1
+                    if interval + 1 < len(starts):
+                        heapq.heapreplace(heap, (starts[interval + 1], index))
+                    else:
+                        heapq.heappop(heap)
+            if is_changed:
+                if len(set_ids) > 0:
+                    yield (segment_min, value - 1), set_ids
+                set_ids = frozenset(active)
+                segment_min = value
+        
+    def freeze(self):
+        """
+        Returns an immutable copy of the set, shared with every other frozen set of the same coverage.
+        @return: a FrozenCoverageSet object covering the same values as this set.
+        """
+        return FrozenCoverageSet(self)
         
     def __contains__(self, value):
         if isinstance(value, CoverageSet):
             return CoverageSet.intersection(self, value) == value
+        elif 0 <= value < CoverageSet.ascii_limit:
+            bitmap = self.ascii_bitmap
+            if bitmap is None:
+                bitmap = self.get_ascii_bitmap()
+            return (bitmap >> value) & 1 == 1
         else:
-            self.remove_overlap()
-            before_min = self.intervals.bisect_left((value, 1))
-            if before_min == len(self.intervals):
-                return False
-            return self.intervals[before_min][1] == 1
+            index = bisect.bisect_right(self.starts, value) - 1
+            return index >= 0 and self.ends[index] >= value
         
     def __len__(self):
-        self.remove_overlap()
-        n = 0
-        for i in xrange(0, len(self.intervals), 2):
-            (min_v, min_is_end), (max_v, max_is_end) = self.intervals[i:i+2]
-            n += max_v - min_v + 1
-        return n
-        
\ No newline at end of file
+        return sum(self.ends) - sum(self.starts) + len(self.starts)
+        
+class FrozenCoverageSet(CoverageSet):
+    """
+    Immutable CoverageSet. Frozen sets are interned, so that there is only ever one frozen set for 
+    a given coverage. This allows the hash to be computed once, and equality between two frozen sets
+    to be tested by identity, which makes them cheap to use as dictionary keys and in signatures.
+    @cvar interned: dictionary mapping the contents of each live frozen set to the set itself.
+    @ivar hash: the hash of the set, computed when the set is created.
+    """
+    interned = weakref.WeakValueDictionary()
+    
+    def __new__(cls, intervals=[]):
+        """
+        @param intervals: a list of tuples, each with a minimum number and a maximum number representing a range of values covered by the set, or a CoverageSet object to copy.
+        @return: the existing frozen set with the same coverage if there is one, otherwise a new FrozenCoverageSet object.
+        """
+        if not isinstance(intervals, CoverageSet):
+            intervals = CoverageSet(intervals)
+        key = (intervals.starts.tostring(), intervals.ends.tostring())
+        frozen_set = cls.interned.get(key)
+        if frozen_set is None:
+            frozen_set = object.__new__(cls)
+            frozen_set.starts = array('l', intervals.starts)
+            frozen_set.ends = array('l', intervals.ends)
+            frozen_set.ascii_bitmap = intervals.ascii_bitmap
+            frozen_set.hash = CoverageSet.__hash__(frozen_set)
+            cls.interned[key] = frozen_set
+        return frozen_set
+        
+    def __init__(self, intervals=[]):
+        # All initialization is done by __new__, which may return an existing set
+        pass
+        
+    def __reduce__(self):
+        # Unpickled sets are re-interned rather than copied
+        return (FrozenCoverageSet, (list(self),))
+        
+    def freeze(self):
+        return self
+        
+    def __hash__(self):
+        return self.hash
+        
+    def __eq__(self, other_coverage_set):
+        if isinstance(other_coverage_set, FrozenCoverageSet):
+            return self is other_coverage_set
+        return CoverageSet.__eq__(self, other_coverage_set)
+        
+    def _modify(self, *args):
+        raise TypeError("FrozenCoverageSet objects cannot be modified")
+        
+    add = _modify
+    remove = _modify
+    update = _modify
+    difference_update = _modify
+    intersection_update = _modify
+    set_ascii_bitmap = _modify
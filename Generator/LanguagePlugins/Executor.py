@@ -22,16 +22,54 @@ from ..Emitter.FileTemplate import FileTemplate
 from ..Emitter.PluginTemplate import TemplateToken
 from LanguagePlugins import rethrow_formatted
 import shutil
+import filecmp
+import hashlib
+import json
 import os.path
 import os
 import sys
 
+def hash_inputs(files, values):
+    """
+    Computes a hash of the inputs from which files are generated
+    @param files: list of strings, each containing the path of an input file
+    @param values: list of values, such as command line options, converted to strings with repr()
+    @return: string containing a hexadecimal hash
+    """
+    inputs_hash = hashlib.sha1()
+    for value in values:
+        inputs_hash.update("%r\n" % (value,))
+    for file in files:
+        with open(file, 'rb') as f:
+            inputs_hash.update("%d\n" % os.path.getsize(file))
+            inputs_hash.update(f.read())
+    return inputs_hash.hexdigest()
+    
+def hash_file(file):
+    """
+    @param file: string containing the path of a file
+    @return: string containing a hexadecimal hash of the file's contents, or None if the file cannot be read
+    """
+    try:
+        with open(file, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except IOError:
+        return None
+
 class Executor(object):
     """
     Class which contains main code to generate a lexical analyzer using a 
     language plugin.
+    
+    In incremental mode, a manifest in the output directory records, for each generated file, a hash of its inputs 
+    and of its contents. A generated file is skipped if neither has changed since it was written, and files are
+    only replaced if their contents change, so that the modification times of unchanged files are kept.
+    @ivar inputs: string identifying everything from which the files are generated, or None if not incremental.
+    @ivar manifest: dict mapping the name of each generated file to a dict with the hashes of its inputs and contents.
     """
-    def __init__(self, language_plugin, plugin_files_directory, output_directory):
+    manifest_file = ".poodle-lex-manifest.json"
+    
+    def __init__(self, language_plugin, plugin_files_directory, output_directory, inputs=None):
         """
         @param language_plugin: The emitter object created by the 
             representing the emitter plugin
@@ -39,18 +77,67 @@ class Executor(object):
             the emitter plugin
         @param output_directory: The output folder into which the lexical 
             analyzer should be generated
+        @param inputs: optional string identifying everything from which the files are generated, such as a hash
+            returned by hash_inputs() of the rules file, options and plugin sources. If given, files are generated 
+            incrementally.
         """
         self.language_plugin = language_plugin
         self.plugin_files_directory = plugin_files_directory
         self.output_directory = output_directory
+        self.inputs = inputs
+        self.manifest = {}
         
     def execute(self):
         """
         Helper function to generate the entire lexical analyzer
         """
         self.create_directories()
+        if self.inputs is not None:
+            self.read_manifest()
+            previous_manifest = dict(self.manifest)
         self.copy_files()
         self.generate_files()
+        if self.inputs is not None and self.manifest != previous_manifest:
+            self.write_manifest()
+            
+    def read_manifest(self):
+        """
+        Read the manifest left in the output directory by the last incremental run, if any
+        """
+        try:
+            with open(os.path.join(self.output_directory, Executor.manifest_file), 'r') as f:
+                self.manifest = json.load(f)
+            if not isinstance(self.manifest, dict):
+                self.manifest = {}
+        except (IOError, ValueError):
+            # Without a readable manifest, every file is generated
+            self.manifest = {}
+            
+    def write_manifest(self):
+        """
+        Write the manifest into the output directory
+        """
+        try:
+            with open(os.path.join(self.output_directory, Executor.manifest_file), 'w') as f:
+                json.dump(self.manifest, f, indent=4, sort_keys=True)
+        except Exception as e:
+            rethrow_formatted(e, "while writing manifest")
+            
+    def replace_if_changed(self, new_file, file):
+        """
+        Moves a file over another, unless they have the same contents, in which case the new file is removed and 
+        the other left untouched.
+        @param new_file: string containing the path of the file to move
+        @param file: string containing the path of the file to replace
+        """
+        if os.path.exists(file):
+            if filecmp.cmp(new_file, file, shallow=False):
+                os.remove(new_file)
+                return
+            # Renaming replaces the file in one step on POSIX systems, but fails on Windows if the file exists
+            if os.name == 'nt':
+                os.remove(file)
+        os.rename(new_file, file)
         
     def create_directories(self):
         """
@@ -73,7 +160,11 @@ class Executor(object):
         """
         try:
             for file in self.language_plugin.get_files_to_copy():
-                shutil.copy(os.path.join(self.plugin_files_directory, file), os.path.join(self.output_directory, file))
+                real_source_file = os.path.join(self.plugin_files_directory, file)
+                real_output_file = os.path.join(self.output_directory, file)
+                if self.inputs is not None and os.path.exists(real_output_file) and filecmp.cmp(real_source_file, real_output_file, shallow=False):
+                    continue
+                shutil.copy(real_source_file, real_output_file)
         except Exception as e:
             rethrow_formatted(e, "while copying files")
             
@@ -86,12 +177,38 @@ class Executor(object):
             for template_file, output_file in self.language_plugin.get_files_to_generate():
                 real_template_file = os.path.join(self.plugin_files_directory, template_file)
                 real_output_file = os.path.join(self.output_directory, output_file)
-                template_token = TemplateToken(template_file)
-                for stream, token, indent in FileTemplate(real_template_file, real_output_file):
-                    template_token.token = token
-                    template_token.stream = stream
-                    template_token.indent = indent
-                    self.language_plugin.process(template_token)
+                if self.inputs is None:
+                    self.generate_file(template_file, real_template_file, real_output_file)
+                    continue
+                    
+                # Skip the file if neither its inputs nor the file itself have changed since it was generated
+                inputs_hash = hash_inputs([real_template_file], [self.inputs, template_file, output_file])
+                entry = self.manifest.get(output_file)
+                if entry is not None and entry.get('inputs') == inputs_hash and entry.get('output') == hash_file(real_output_file):
+                    continue
+                new_output_file = real_output_file + ".new"
+                try:
+                    self.generate_file(template_file, real_template_file, new_output_file)
+                except:
+                    # Don't leave a partly generated file in the output directory
+                    if os.path.exists(new_output_file):
+                        os.remove(new_output_file)
+                    raise
+                self.replace_if_changed(new_output_file, real_output_file)
+                self.manifest[output_file] = {'inputs': inputs_hash, 'output': hash_file(real_output_file)}
         except Exception as e:
             rethrow_formatted(e, "while generating files")
-            
\ No newline at end of file
+            
+    def generate_file(self, template_file, real_template_file, real_output_file):
+        """
+        Fill in a template file, calling back into the plugin to process tokens
+        @param template_file: string containing the name of the template file, relative to the plugin files directory
+        @param real_template_file: string containing the path of the template file
+        @param real_output_file: string containing the path of the file to write
+        """
+        template_token = TemplateToken(template_file)
+        for stream, token, indent in FileTemplate(real_template_file, real_output_file):
+            template_token.token = token
+            template_token.stream = stream
+            template_token.indent = indent
+            self.language_plugin.process(template_token)
@@ -54,6 +54,8 @@ class PluginOptions(object):
         self.namespace = None
         self.file_name = None
         self.form = PluginOptions.DFA_IR
+        self.is_token_view = False
+        self.code_form = 'switch'
         
 class Plugin(object):
     """
@@ -94,6 +96,12 @@ class Plugin(object):
         if not hasattr(self.module, 'create_emitter') or not isinstance(self.module.create_emitter, types.FunctionType):
             raise Exception("Plug-in does not contain a 'create_emitter' function")
             
+    def get_source_files(self):
+        """
+        @return: a list of strings, each containing the path of a Python source file of the plug-in, including its dependencies
+        """
+        return [self.source_path] + list(self.dependencies)
+        
     def create(self, lexical_analyzer, plugin_options):
         """
         Creates a LanugageEmitter object from the plug-in
@@ -1,3 +1,3 @@
 from LanguagePlugins import *
 from Parser import load
-from Executor import Executor
\ No newline at end of file
+from Executor import Executor, hash_inputs
\ No newline at end of file
@@ -0,0 +1,115 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+import sys
+import time
+import json
+import contextlib
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def get_peak_rss():
+    """
+    @return: the largest amount of memory, in bytes, that this process has held so far, or None if it can't be 
+        measured on this platform.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+    
+def get_cpu_time():
+    """
+    @return: the user and system time, in seconds, used by this process so far
+    """
+    times = os.times()
+    return times[0] + times[1]
+
+class Profiler(object):
+    """
+    Records the time and memory taken by each phase of generating a lexical analyzer, with counts of the 
+    objects built in it. Phases run for each section are recorded once for each section.
+    @ivar is_enabled: False if nothing should be recorded, so that code can be measured unconditionally.
+    @ivar records: list of dicts, one for each phase measured, in the order that the phases ended. Each has 
+        the keys 'phase', 'section' (None if the phase isn't run for a single section), 'wall_time' and 
+        'cpu_time' (in seconds), 'peak_rss' (in bytes, as returned by get_peak_rss) and 'counts' (dict mapping 
+        the name of each kind of object built to its number). Records are plain dicts so that they can be 
+        passed back from worker processes.
+    """
+    def __init__(self, is_enabled=True):
+        self.is_enabled = is_enabled
+        self.records = []
+        
+    @contextlib.contextmanager
+    def measure(self, phase, section=None):
+        """
+        Context manager which records a phase as it runs
+        @param phase: string containing the name of the phase
+        @param section: string containing the qualified name of the section the phase is run for, if any
+        @return: a dict, to which the number of each kind of object built in the phase may be added
+        """
+        counts = {}
+        if not self.is_enabled:
+            yield counts
+            return
+        start_wall_time = time.time()
+        start_cpu_time = get_cpu_time()
+        yield counts
+        self.records.append({
+            'phase': phase,
+            'section': section,
+            'wall_time': time.time() - start_wall_time,
+            'cpu_time': get_cpu_time() - start_cpu_time,
+            'peak_rss': get_peak_rss(),
+            'counts': counts
+        })
+        
+    def get_table(self):
+        """
+        @return: string containing the records as a human-readable table, with a row for each record
+        """
+        rows = [("Phase", "Section", "Wall (ms)", "CPU (ms)", "Peak RSS (MB)", "Counts")]
+        for record in self.records:
+            peak_rss = "-" if record['peak_rss'] is None else "%.1f" % (record['peak_rss'] / (1024.0*1024.0))
+            counts = ", ".join("%s=%d" % (name, count) for name, count in sorted(record['counts'].iteritems()))
+            rows.append((
+                record['phase'],
+                "-" if record['section'] is None else record['section'],
+                "%.1f" % (record['wall_time'] * 1000),
+                "%.1f" % (record['cpu_time'] * 1000),
+                peak_rss,
+                counts))
+        widths = [max(len(row[column]) for row in rows) for column in xrange(len(rows[0]))]
+        lines = []
+        for row in rows:
+            lines.append("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        return "\n".join(lines)
+        
+    def get_json(self):
+        """
+        @return: string containing the records as a JSON list
+        """
+        return json.dumps(self.records, indent=4, sort_keys=True, separators=(",", ": "))
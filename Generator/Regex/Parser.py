@@ -40,14 +40,15 @@ class Parser(object):
     space = ((ord(' '), ord(' ')))
     special = u'(){}[].^$*+-~&?|:'
     closing = u')}]'
-    unicode_db = UnicodeQuery.find_db()
+    unicode_db = None
     set_operators = "-&~|"
     
     def __init__(self, text, is_case_insensitive=False, is_unicode_defaults=False, is_literal=False, unicode_db=None):
         """
         @param text: string containing the regular expression
         @param is_case_insensitive: boolean which is true if the regular expression should be case insensitive
-        @param unicode_db: location of the folder containing the JSON unicode property data files
+        @param unicode_db: location of the folder containing the JSON unicode property data files. If None, the 
+            folder is found the first time an expression needs it.
         """
         self.text = text
         self.index = 0
@@ -56,8 +57,19 @@ class Parser(object):
         self.is_literal = is_literal
         if unicode_db is not None:
             self.unicode_db = unicode_db
-        elif Parser.unicode_db is None and unicode_db is None:
-            raise ValueError("Unicode database not found and no database provided")
+        
+    def get_unicode_query(self):
+        """
+        Finds the Unicode database the first time an expression uses a Unicode property, so that expressions 
+        which don't can be parsed without looking for or loading it.
+        @return: the UnicodeQuery object for the database
+        """
+        if self.unicode_db is None:
+            unicode_db = UnicodeQuery.find_db()
+            if unicode_db is None:
+                raise ValueError("Unicode database not found and no database provided")
+            Parser.unicode_db = unicode_db
+        return UnicodeQuery.instance(self.unicode_db)
         
     def parse(self):
         """
@@ -366,7 +378,7 @@ class Parser(object):
         
         if self.is_unicode_defaults and class_name in unicode_classes:
             class_queries = unicode_classes[class_name]
-            instance = UnicodeQuery.instance(self.unicode_db)
+            instance = self.get_unicode_query()
             coverage = CoverageSet()
             for k, v in class_queries[False]:
                 coverage.update(instance.query(k, v))
@@ -485,7 +497,7 @@ class Parser(object):
             the specified unicode query.
         """
         self.expect("{")
-        coverage = self.parse_unicode_subexpression()
+        coverage = CoverageSet(self.parse_unicode_subexpression())
         while self.get_next_if(u'|'):
             coverage.update(self.parse_unicode_subexpression())
         self.expect("}")
@@ -499,8 +511,8 @@ class Parser(object):
         """
         self.expect("{")
         name = self.parse_unicode_word()
-        coverage = UnicodeQuery.instance(self.unicode_db).query('na', name)
-        if coverage.empty():
+        coverage = self.get_unicode_query().query('na', name)
+        if coverage.is_empty():
             raise ValueError("Name '{name}' not found".format(name=name))
         return coverage
         
@@ -514,7 +526,7 @@ class Parser(object):
             value = self.parse_unicode_word()
         else:
             value = None
-        coverage = UnicodeQuery.instance(self.unicode_db).query(name, value)
+        coverage = self.get_unicode_query().query(name, value)
         return coverage
         
     def parse_unicode_word(self):
@@ -20,17 +20,30 @@
 
 from ..CoverageSet import CoverageSet
 
+# Regular expression objects compare and hash by structure, so identical sub-expressions can be recognized 
+# wherever they appear. The hash of each object is computed once, when it is created from its sub-expressions,
+# so objects must not be modified after they are created.
+
 class Literal(object):
     """
     Visitable regular expression object representing one or more characters
-    @ivar characters: list of two-number tuples, each representing a range of Unicode codepoints covered by this literal.
+    @ivar characters: FrozenCoverageSet object representing the Unicode codepoints covered by this literal.
     """
     def __init__(self, characters):
         """
         @param characters: list of two-number tuples, each representing a range of Unicode codepoints covered by this literal.
         """
-        self.characters = CoverageSet(characters)
+        self.characters = CoverageSet(characters).freeze()
 
+    def __eq__(self, other):
+        return isinstance(other, Literal) and self.characters == other.characters
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return hash(('Literal', self.characters))
+        
     def __repr__(self):
         return "Literal(%s)" % ", ".join(["%d-%d" % (m, n) for m, n in self.characters])
         
@@ -40,14 +53,23 @@ class Literal(object):
 class LiteralExcept(object):
     """
     Visitable regular expression object representing "all except" one or more characters.
-    @ivar characters: list of two-number tuples, each representing a range of Unicode codepoints excluded by this literal.
+    @ivar characters: FrozenCoverageSet object representing the Unicode codepoints excluded by this literal.
     """
     def __init__(self, characters):
         """
         @param characters: list of two-number tuples, each representing a range of Unicode codepoints excluded by this literal.
         """
-        self.characters = CoverageSet(characters)        
+        self.characters = CoverageSet(characters).freeze()
  
+    def __eq__(self, other):
+        return isinstance(other, LiteralExcept) and self.characters == other.characters
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return hash(('LiteralExcept', self.characters))
+        
     def __repr__(self):
         return "LiteralExcept(%s)" % ", ".join(["%d-%d" % (m, n) for m, n in self.characters])
  
@@ -58,12 +80,23 @@ class Alternation(object):
     """
     Visitable regular expression object representing an alternation (e.g. the "|" operator) of one or more sub-expressions
     @ivar children: a list containing visitable regular expression objects representing the alternated sub-expressions.
+    @ivar hash: the hash of the expression, computed when it is created.
     """
     def __init__(self, children):
         """
         @param children: a list containing visitable regular expression objects representing the alternated sub-expressions.
         """
         self.children = children
+        self.hash = hash(('Alternation',) + tuple(children))
+        
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Alternation) and self.hash == other.hash and self.children == other.children)
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return self.hash
         
     def __repr__(self):
         return "Alternation(%s)" % ", ".join([repr(i) for i in self.children])
@@ -75,12 +108,23 @@ class Concatenation(object):
     """
     Visitable regular expression object representing a concatenation of one or more sub-expressions
     @ivar children: a list containing visitable regular expression objects representing the concatenated sub-expressions.
+    @ivar hash: the hash of the expression, computed when it is created.
     """
     def __init__(self, children):
         """
         @param children: a list containing visitable regular expression objects representing the concatenated sub-expressions.
         """
         self.children = children
+        self.hash = hash(('Concatenation',) + tuple(children))
+        
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Concatenation) and self.hash == other.hash and self.children == other.children)
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return self.hash
         
     def __repr__(self):
         return "Concatenation(%s)" % ", ".join([repr(i) for i in self.children])
@@ -94,6 +138,7 @@ class Repetition(object):
     @ivar child: visitable regular expression object representing the repeated sub-expression.
     @ivar min: integer representing the minimum number of times the sub-expression can repeat.
     @ivar max: integer representing the maximum number of times the sub-expression can repeat.
+    @ivar hash: the hash of the expression, computed when it is created.
     """
     Infinity = -1
  
@@ -106,7 +151,18 @@ class Repetition(object):
         self.child = child 
         self.min = min
         self.max = max
+        self.hash = hash(('Repetition', child, min, max))
     
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Repetition) and self.hash == other.hash and 
+            self.child == other.child and self.min == other.min and self.max == other.max)
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return self.hash
+        
     def __repr__(self):
         min_text = str(self.min)
         if (self.min < 0):
@@ -123,6 +179,15 @@ class Variable(object):
     def __init__(self, name):
         self.name = name
         
+    def __eq__(self, other):
+        return isinstance(other, Variable) and self.name == other.name
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    def __hash__(self):
+        return hash(('Variable', self.name))
+        
     def __repr__(self):
         return "Variable(%s)" % self.name
         
@@ -0,0 +1,183 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+import os.path
+import sys
+import json
+import mmap
+import marshal
+import struct
+from array import array
+from ..CoverageSet import CoverageSet
+
+database_file = "UnicodeData.bin"
+_magic = "PLUCD\x00\x00\x01"
+_header = struct.Struct("<8sII")
+
+def _to_bytes(values):
+    """
+    Internal function, encodes a list of integers as little-endian 32-bit integers.
+    """
+    encoded = array('i', values)
+    if sys.byteorder != 'little':
+        encoded.byteswap()
+    return encoded.tostring()
+    
+def get_source_fingerprint(path):
+    """
+    Identifies the version of the JSON copy of the UCD, so that a database compiled from an older version is not used
+    @param path: the directory containing the JSON copy of the UCD
+    @return: tuple of (file name, size, modification time) tuples, one for each JSON file in the directory
+    """
+    fingerprint = []
+    for file_name in sorted(i for i in os.listdir(path) if i.endswith('.json')):
+        status = os.stat(os.path.join(path, file_name))
+        fingerprint.append((file_name, status.st_size, status.st_mtime))
+    return tuple(fingerprint)
+
+def compile_database(path, output_file=None):
+    """
+    Compiles the JSON copy of the UCD into a single binary file, which UnicodeDatabase objects read by memory-mapping 
+    it. The file starts with a header holding the offset and length of an index. The index is a marshalled dict with 
+    the fingerprint of the JSON files it was compiled from, the property and value alias tables, and for each property the offset and length of a marshalled dict mapping
+    each of its values to the offset of the characters with that value. The characters are stored as a count 
+    followed by sorted arrays of the start and end of each interval, all as little-endian 32-bit integers.
+    @param path: the directory containing the JSON copy of the UCD
+    @param output_file: the path of the file to write, or None to write database_file in the same directory.
+    """
+    if output_file is None:
+        output_file = os.path.join(path, database_file)
+    def load(file_name):
+        with open(os.path.join(path, file_name), 'r') as f:
+            return json.load(f)
+            
+    index = {
+        'source': get_source_fingerprint(path),
+        'property_aliases': load("AliasesProperties.json"),
+        'value_aliases': load("AliasesValues.json"),
+        'properties': {}
+    }
+    with open(output_file, 'wb') as f:
+        f.write(_header.pack(_magic, 0, 0))
+        def write_values(values):
+            value_offsets = {}
+            for value, intervals in values.iteritems():
+                coverage_set = CoverageSet(intervals)
+                value_offsets[value] = f.tell()
+                f.write(_to_bytes([len(coverage_set.starts)]))
+                f.write(_to_bytes(coverage_set.starts))
+                f.write(_to_bytes(coverage_set.ends))
+            value_index = marshal.dumps(value_offsets)
+            value_index_offset = f.tell()
+            f.write(value_index)
+            return (value_index_offset, len(value_index))
+            
+        # Binary properties are stored as a single property, with each code as a value
+        index['binary'] = write_values(load("BinaryProperties.json"))
+        for file_name in sorted(os.listdir(path)):
+            if file_name.startswith("Property") and file_name.endswith(".json"):
+                code = file_name[len("Property"):-len(".json")]
+                index['properties'][code] = write_values(load(file_name))
+        index_data = marshal.dumps(index)
+        index_offset = f.tell()
+        f.write(index_data)
+        f.seek(0)
+        f.write(_header.pack(_magic, index_offset, len(index_data)))
+        
+class UnicodeDatabase(object):
+    """
+    Read-only view of a Unicode database compiled by compile_database(). The file is memory-mapped, and only the 
+    parts needed to answer each lookup are read, so that opening the database costs almost nothing.
+    @ivar property_aliases: dict mapping sanitized property names to property codes.
+    @ivar value_aliases: dict mapping sanitized property codes to dicts mapping sanitized values to value codes.
+    @ivar source_fingerprint: the fingerprint of the JSON files the database was compiled from, as returned by 
+        get_source_fingerprint(), or None if it was not recorded.
+    """
+    def __init__(self, file):
+        """
+        @param file: the path of the compiled database
+        """
+        with open(file, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map.size() < _header.size:
+            raise Exception("Unicode database '{file}' is not valid".format(file=file))
+        magic, index_offset, index_length = _header.unpack(self.map[:_header.size])
+        if magic != _magic:
+            raise Exception("Unicode database '{file}' is not valid".format(file=file))
+        self.index = marshal.loads(self.map[index_offset:index_offset+index_length])
+        self.property_aliases = self.index['property_aliases']
+        self.value_aliases = self.index['value_aliases']
+        self.source_fingerprint = self.index.get('source')
+        self.value_indices = {}
+        
+    def read_values(self, offset, count):
+        """
+        @return: an array of integers read from the file
+        """
+        values = array('i')
+        values.fromstring(self.map[offset:offset+count*values.itemsize])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+        
+    def get_value_index(self, code):
+        """
+        @param code: a property code, or None for the binary properties
+        @return: dict mapping the values of the property to the offsets of their characters, or None if the 
+            property is not in the database.
+        """
+        if code not in self.value_indices:
+            location = self.index['binary'] if code is None else self.index['properties'].get(code)
+            if location is None:
+                self.value_indices[code] = None
+            else:
+                offset, length = location
+                self.value_indices[code] = marshal.loads(self.map[offset:offset+length])
+        return self.value_indices[code]
+        
+    def has_property(self, code):
+        """
+        @param code: a property code
+        @return: True if the database has values for the non-binary property
+        """
+        return code in self.index['properties']
+        
+    def get_binary_property(self, code):
+        """
+        @param code: the code of a binary property
+        @return: a CoverageSet object of the characters for which the property is true, or None if there is no such property
+        """
+        return self.get_characters(None, code)
+        
+    def get_characters(self, code, value):
+        """
+        @param code: a property code, or None for the binary properties
+        @param value: a value code of the property, or a binary property code.
+        @return: a CoverageSet object of the characters with the value, or None if the value is not in the database.
+        """
+        value_index = self.get_value_index(code)
+        if value_index is None or value not in value_index:
+            return None
+        offset = value_index[value]
+        count = self.read_values(offset, 1)[0]
+        values = self.read_values(offset + 4, count*2)
+        return CoverageSet.from_arrays(values[:count], values[count:])
@@ -1,11 +1,27 @@
+import os
 import os.path
 import sys
 from itertools import chain
 import json
+import marshal
+import tempfile
 from ..CoverageSet import CoverageSet
+import UnicodeDatabase
 
 class UnicodeQuery(object):
+    """
+    Looks up the characters matching Unicode properties. Results are frozen and kept for the lifetime of the instance, 
+    keyed by the abbreviated property and value, and are optionally saved next to the database so that later runs 
+    don't need to build them again.
+    @cvar use_persistent_cache: if True, results are read from and written to the file named by _db_results.
+    @ivar results: dict mapping (property code, value code) tuples to FrozenCoverageSet objects.
+    @ivar saved_results: dict mapping (property code, value code) tuples to lists of interval starts and ends, 
+        as read from the persistent cache, or None if it hasn't been read.
+    """
     _instance = {}
+    _db_results = "QueryCache.dat"
+    _db_results_version = 1
+    use_persistent_cache = False
     _db_binary = "BinaryProperties.json"
     _db_property = "Property{code}.json"
     _db_property_aliases = "AliasesProperties.json"
@@ -42,28 +58,55 @@ class UnicodeQuery(object):
         if realpath not in cls._instance:
             cls._instance[realpath] = cls(realpath)
         return cls._instance[realpath]
+        
+    @classmethod
+    def save_caches(cls):
+        """
+        Writes the new results of every instance to its persistent cache
+        """
+        for instance in cls._instance.itervalues():
+            instance.save_results()
     
     def __init__(self, path):
         """
-        @param path: the directory containing the JSON copy of the UCD
+        @param path: the directory containing the JSON copy of the UCD, and optionally a binary copy compiled from 
+            it by UnicodeDatabase.compile_database(), which is used instead if present and compiled from the same 
+            version of the JSON files.
         """
         self.path = path
         self.cache = {}
+        self.results = {}
+        self.saved_results = None
+        self.database = None
+        database_path = os.path.join(path, UnicodeDatabase.database_file)
+        if os.path.exists(database_path):
+            database = UnicodeDatabase.UnicodeDatabase(database_path)
+            if database.source_fingerprint == UnicodeDatabase.get_source_fingerprint(path):
+                self.database = database
         
     def get_property(self, property, value=None):
         """
         Retrieves a CoverageSet of every character matching the property
         @param property: the name of the property to look up
         @param value: if the property is non-binary, the value of the property to filter by
+        @return: a FrozenCoverageSet, which is shared by every query for the same property and value.
         """
         code = self.get_property_code(property)
         if value is not None:
             value = self.get_value_code(code, value)
             
-        if code in self._db_binary_names:
-            return self.get_binary_property(code)
-        else:
-            return self.get_string_property(code, value)
+        key = (code, value)
+        if key not in self.results:
+            saved_results = self.get_saved_results()
+            if key in saved_results:
+                starts, ends = saved_results[key]
+                result = CoverageSet.from_arrays(starts, ends)
+            elif code in self._db_binary_names:
+                result = self.get_binary_property(code)
+            else:
+                result = self.get_string_property(code, value)
+            self.results[key] = result.freeze()
+        return self.results[key]
             
     def query(self, property, value=None):
         """
@@ -92,6 +135,12 @@ class UnicodeQuery(object):
         @param code: The shorthand abbreviation for the property to look up
         @returns a CoverageSet containing every character for which the property is True.
         """
+        if self.database is not None:
+            result = self.database.get_binary_property(code)
+            if result is None:
+                raise ValueError("Code '{code}' not found".format(code=code))
+            return result
+            
         if self._db_binary not in self.cache:
             with open(os.path.join(self.path, self._db_binary), 'r') as f:
                 self.cache[self._db_binary] = json.load(f)
@@ -106,37 +155,97 @@ class UnicodeQuery(object):
         @param code: The shorthand abbreviation for the property to look up
         @param value: The value which matching codepoints must have for the property
         """
-        code_file = self._db_property.format(code=code)
-        code_path = os.path.join(self.path, code_file)
-        if code_path not in self.cache:
-            if not os.path.exists(code_path):
+        if self.database is not None:
+            if not self.database.has_property(code):
                 raise ValueError("Code '{code}' not found".format(code=code))
-            with open(code_path, 'r')as f:  
-                self.cache[code_path] = json.load(f)
-        cache = self.cache[code_path]
+        else:
+            code_file = self._db_property.format(code=code)
+            code_path = os.path.join(self.path, code_file)
+            if code_path not in self.cache:
+                if not os.path.exists(code_path):
+                    raise ValueError("Code '{code}' not found".format(code=code))
+                with open(code_path, 'r')as f:  
+                    self.cache[code_path] = json.load(f)
+            cache = self.cache[code_path]
         value_code = self.get_value_code(code, value)
         if code == 'gc' and len(value_code) == 1 and value_code in self._db_category:
             # 1st-level categories are just combinations of finer-grained categories
-            return CoverageSet.union(*[self.get_string_property(code, i) for i in self._db_category[value_code]])
+            return CoverageSet.union(*[self.get_property(code, i) for i in self._db_category[value_code]])
+        if self.database is not None:
+            result = self.database.get_characters(code, value_code)
+            return result if result is not None else CoverageSet()
         if value_code not in cache:
             return CoverageSet()
         else:
             return CoverageSet(cache[value_code])
             
+    def get_fingerprint(self):
+        """
+        Identifies the version of the database that results are looked up in, so that saved results are discarded 
+        when it changes
+        @return: tuple of (file name, size, modification time) tuples, one for each file the database is read from
+        """
+        if self.database is None:
+            return UnicodeDatabase.get_source_fingerprint(self.path)
+        status = os.stat(os.path.join(self.path, UnicodeDatabase.database_file))
+        return ((UnicodeDatabase.database_file, status.st_size, status.st_mtime),)
+        
+    def get_saved_results(self):
+        """
+        Reads the persistent cache the first time it is needed. A missing, unreadable, or out-of-date cache is 
+        treated as empty.
+        @return: dict mapping (property code, value code) tuples to lists of interval starts and ends
+        """
+        if self.saved_results is None:
+            self.saved_results = {}
+            if self.use_persistent_cache:
+                try:
+                    with open(os.path.join(self.path, self._db_results), 'rb') as f:
+                        version, fingerprint, results = marshal.load(f)
+                    if version == self._db_results_version and fingerprint == self.get_fingerprint():
+                        self.saved_results = results
+                except Exception:
+                    pass
+        return self.saved_results
+        
+    def save_results(self):
+        """
+        Adds any new results to the persistent cache, if use_persistent_cache is set. Failing to write is not an error, 
+        as the cache only saves time.
+        """
+        if not self.use_persistent_cache:
+            return
+        saved_results = self.get_saved_results()
+        new_keys = [key for key in self.results if key not in saved_results]
+        if len(new_keys) == 0:
+            return
+        results = dict(saved_results)
+        for key in new_keys:
+            results[key] = (list(self.results[key].starts), list(self.results[key].ends))
+        try:
+            # Write to a temporary file first, so that other processes never read a partial cache
+            handle, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+            with os.fdopen(handle, 'wb') as f:
+                marshal.dump((self._db_results_version, self.get_fingerprint(), results), f)
+            path = os.path.join(self.path, self._db_results)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temporary_path, path)
+            self.saved_results = results
+        except (IOError, OSError):
+            pass
+            
     def get_property_code(self, property):
         """
         Given a property's full name or abbreviated name, return its abbreviated name
         @param property: The name or abbreviation of the property
         @return: string containing the abbreviation to use, sanitized
         """
-        property_path = os.path.join(self.path, self._db_property_aliases)
-        if property_path not in self.cache:
-            with open(property_path, 'r') as f:
-                self.cache[property_path] = json.load(f)
+        property_aliases = self.get_aliases(self._db_property_aliases)
         sanitized_property = self.sanitize_input(property)
-        if sanitized_property not in self.cache[property_path]:
+        if sanitized_property not in property_aliases:
             return property
-        return self.cache[property_path][sanitized_property]
+        return property_aliases[sanitized_property]
         
     def get_value_code(self, property_code, value):
         """
@@ -144,17 +253,30 @@ class UnicodeQuery(object):
         @param property_code: the abbreviated name of the property
         @param value: the full or abbreviated property value to look up
         """
-        value_path = os.path.join(self.path, self._db_value_aliases)
-        if value_path not in self.cache:
-            with open(value_path, 'r') as f:
-                self.cache[value_path] = json.load(f)
+        value_aliases = self.get_aliases(self._db_value_aliases)
         code_sanitized = self.sanitize_input(property_code)
         value_sanitized = self.sanitize_input(value)
-        if code_sanitized not in self.cache[value_path]:
+        if code_sanitized not in value_aliases:
             return value_sanitized
-        if value_sanitized not in self.cache[value_path][code_sanitized]:
+        if value_sanitized not in value_aliases[code_sanitized]:
             return value_sanitized
-        return self.cache[value_path][code_sanitized][value_sanitized]
+        return value_aliases[code_sanitized][value_sanitized]
+        
+    def get_aliases(self, file_name):
+        """
+        Retrieves a table of aliases
+        @param file_name: the name of the JSON file holding the table, either _db_property_aliases or _db_value_aliases
+        @return: dict mapping sanitized names to abbreviations
+        """
+        if self.database is not None:
+            if file_name == self._db_property_aliases:
+                return self.database.property_aliases
+            return self.database.value_aliases
+        alias_path = os.path.join(self.path, file_name)
+        if alias_path not in self.cache:
+            with open(alias_path, 'r') as f:
+                self.cache[alias_path] = json.load(f)
+        return self.cache[alias_path]
         
     @staticmethod
     def sanitize_input(input):
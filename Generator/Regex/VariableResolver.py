@@ -24,6 +24,7 @@ from Exceptions import *
 class VariableResolver(object):
     """
     Visitor object which copies a regular expression, except for variables. Variables are replaced with a regular expression found in defines.
+    Literals cannot be modified, so they are shared with the copy rather than copied.
     """
     def __init__(self, defines):
         self.defines = defines
@@ -31,34 +32,29 @@ class VariableResolver(object):
         self.stack = []
     
     def visit_literal(self, literal):
-        new_literal = Regex.Literal([])
-        new_literal.characters = literal.characters
-        self.stack.append(new_literal)
+        self.stack.append(literal)
         
     def visit_literal_except(self, literal_except):
-        new_literal_except = Regex.LiteralExcept([])
-        new_literal_except.characters = literal_except.characters
-        self.stack.append(new_literal_except)
+        self.stack.append(literal_except)
         
     def visit_repetition(self, repetition):
-        new_repetition = Regex.Repetition(None, repetition.min, repetition.max)
+        # Expressions are hashed when they are created, so the copy is created once its sub-expressions are
         repetition.child.accept(self)
-        new_repetition.child = self.stack.pop()
-        self.stack.append(new_repetition)
+        self.stack.append(Regex.Repetition(self.stack.pop(), repetition.min, repetition.max))
         
     def visit_concatenation(self, concatenation):
-        new_concatenation = Regex.Concatenation([])
+        children = []
         for child in concatenation.children:
             child.accept(self)
-            new_concatenation.children.append(self.stack.pop())
-        self.stack.append(new_concatenation)
+            children.append(self.stack.pop())
+        self.stack.append(Regex.Concatenation(children))
             
     def visit_alternation(self, alternation):
-        new_alternation = Regex.Alternation([])
+        children = []
         for child in alternation.children:
             child.accept(self)
-            new_alternation.children.append(self.stack.pop())
-        self.stack.append(new_alternation)
+            children.append(self.stack.pop())
+        self.stack.append(Regex.Alternation(children))
             
     def visit_variable(self, variable):
         """
@@ -0,0 +1,149 @@
+# Copyright (C) 2014 Parker Michaels
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a 
+# copy of this software and associated documentation files (the "Software"), 
+# to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+# and/or sell copies of the Software, and to permit persons to whom the 
+# Software is furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE.
+
+
+import os
+import os.path
+import hashlib
+import tempfile
+import zlib
+import cPickle as pickle
+
+class DFACache(object):
+    """
+    Content-addressed cache of the minimized DFAs of sections, stored on disk. Each entry is a file named after 
+    a hash of everything the DFA is built from, holding the DFA in the compact form returned by 
+    Automata.DeterministicFinite.pack, pickled and compressed. Rule ids are hashes which differ from one run to the 
+    next, so entries refer to rules by their position in the section instead. Reading an entry marks it as recently used, and the 
+    least recently used entries are removed when the entries grow larger than the size limit.
+    @cvar version: integer included in every key, which must be changed whenever changes to NFA construction, DFA 
+        construction or minimization would build a different DFA from the same rules, so that old entries are ignored.
+    @ivar directory: string containing the path of the directory holding the entries.
+    @ivar max_size: the largest total size, in bytes, of the entries kept in the directory.
+    """
+    version = 1
+    extension = ".dfa"
+    
+    def __init__(self, directory=None, max_size=64*1024*1024):
+        """
+        @param directory: string containing the path of the directory holding the entries, or None to use the default.
+        @param max_size: the largest total size, in bytes, of the entries kept in the directory.
+        """
+        if directory is None:
+            directory = DFACache.get_default_directory()
+        self.directory = directory
+        self.max_size = max_size
+        
+    @staticmethod
+    def get_default_directory():
+        """
+        @return: string containing the path of the default cache directory for the current user.
+        """
+        base_directory = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+        if base_directory is None:
+            base_directory = os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(base_directory, 'poodle-lex')
+        
+    @staticmethod
+    def get_key(rules, minimizer):
+        """
+        Computes the key of a section's DFA. The key covers the regular expressions of the section's rules, in 
+        order, and the minimizer. Unicode properties and case-insensitivity are resolved into characters by the 
+        regular expression parser, so a change to the Unicode database changes the regular expressions it affects.
+        @param rules: list of NonDeterministicIR.Rule objects, in order of priority, with variables resolved.
+        @param minimizer: the minimizer passed to Minimizer.build, or None if the DFA is not minimized.
+        @return: string containing a hexadecimal hash.
+        """
+        key = hashlib.sha1()
+        minimizer_name = "%s.%s" % (minimizer.__module__, minimizer.__name__) if minimizer is not None else "none"
+        key.update("poodle-lex dfa %d %s\n" % (DFACache.version, minimizer_name))
+        for rule in rules:
+            key.update("%r\n" % rule.regex)
+        return key.hexdigest()
+        
+    def get_path(self, key):
+        """
+        @param key: string returned by get_key.
+        @return: string containing the path of the file holding the entry for the key.
+        """
+        return os.path.join(self.directory, key + DFACache.extension)
+        
+    def get(self, key, rules):
+        """
+        Reads an entry from the cache, and marks it as recently used. 
+        @param key: string returned by get_key.
+        @param rules: list of NonDeterministicIR.Rule objects from which the key was computed.
+        @return: the DFA in compact form, or None if there is no readable entry for the key.
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                id_sets, packed_states = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path, None)
+            id_sets = [frozenset(rules[i].id for i in id_set) for id_set in id_sets]
+            return (id_sets, packed_states)
+        except Exception:
+            # Missing, unreadable or damaged entries are rebuilt
+            return None
+            
+    def set(self, key, rules, packed_dfa):
+        """
+        Writes an entry to the cache, then removes the least recently used entries if the cache is too large. 
+        Failing to write is not an error, as the cache only saves time.
+        @param key: string returned by get_key.
+        @param rules: list of NonDeterministicIR.Rule objects from which the key was computed.
+        @param packed_dfa: the DFA in the compact form returned by Automata.DeterministicFinite.pack.
+        """
+        id_sets, packed_states = packed_dfa
+        positions = dict((rule.id, position) for position, rule in enumerate(rules))
+        id_sets = [frozenset(positions[i] for i in id_set) for id_set in id_sets]
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+                
+            # Write to a temporary file first, so that other processes never read a partial entry
+            handle, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            with os.fdopen(handle, 'wb') as f:
+                f.write(zlib.compress(pickle.dumps((id_sets, packed_states), pickle.HIGHEST_PROTOCOL)))
+            path = self.get_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temporary_path, path)
+            self.evict()
+        except (IOError, OSError):
+            pass
+            
+    def evict(self):
+        """
+        Removes the least recently used entries until the total size of the entries is no larger than max_size.
+        """
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(DFACache.extension):
+                path = os.path.join(self.directory, file_name)
+                status = os.stat(path)
+                entries.append((status.st_mtime, status.st_size, path))
+        entries.sort()
+        total_size = sum(size for last_used, size, path in entries)
+        for last_used, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            os.remove(path)
+            total_size -= size
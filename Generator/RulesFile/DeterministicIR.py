@@ -18,8 +18,25 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
-from .. import Automata
+import multiprocessing
 from ..Automata import Minimizer
+from ..Automata import DeterministicFinite
+from ..Profiler import Profiler
+
+def build_section_dfa(arguments):
+    """
+    Creates the minimized DFA of a section. Sections are independent, so this is run in a pool of worker 
+    processes when several jobs are requested.
+    @param arguments: a tuple with a list of Automata.NonDeterministicFinite objects, one for each rule in the 
+        section, the minimizer to pass to Minimizer.build, the qualified name of the section, and True if 
+        building the DFA should be profiled.
+    @return: a tuple with the DFA of the section, in the compact form returned by 
+        Automata.DeterministicFinite.pack, and a list of the records made by the profiler.
+    """
+    state_machines, minimizer, section, is_profiled = arguments
+    profiler = Profiler(is_profiled)
+    packed_dfa = Minimizer.build(state_machines, minimizer, profiler, section).pack()
+    return packed_dfa, profiler.records
 
 class DeterministicIR(object):
     """
@@ -82,19 +99,75 @@ class DeterministicIR(object):
         def has_action(self, action):
             return action in self.action
 
-    def __init__(self, non_deterministic_ir, minimizer=Minimizer.polynomial):
+    def __init__(self, non_deterministic_ir, minimizer=Minimizer.polynomial, jobs=1, cache=None, profiler=None):
+        """
+        @param non_deterministic_ir: NonDeterministicIR object representing the lexical analyzer to reduce.
+        @param minimizer: the minimizer to pass to Minimizer.build, or None if DFAs should not be minimized.
+        @param jobs: the number of processes among which sections are divided. If 1, every section is built
+            in this process. If 0, one process is used for each processor.
+        @param cache: optional DFACache object. Sections found in it are not converted to NFAs or DFAs at all, and 
+            the DFAs of the other sections are added to it.
+        @param profiler: optional Profiler object, in which looking up each section in the cache, and building 
+            its NFAs, DFA and minimized DFA, are recorded.
+        """
+        if profiler is None:
+            profiler = Profiler(False)
         self.automata_type = "dfa"
         self.rule_ids = dict(non_deterministic_ir.rule_ids)
         self.sections = {}
-        for id, section in non_deterministic_ir.sections.items():
-            section_nfas = []
-            section_rules = []
-            for rule in section.rules:
-                section_nfas.append(rule.nfa)
-                section_rules.append(DeterministicIR.Rule(rule.name, rule.id, rule.action, rule.section_action))
-            combined_nfa = Automata.NonDeterministicFinite.alternate(section_nfas)
-            dfa = Automata.DeterministicFiniteBuilder.build(combined_nfa)
-            minimizer.__call__(dfa)
+        
+        # Sections are built in a fixed order, so that the result does not depend on which job finishes first
+        ids = sorted(non_deterministic_ir.sections.keys())
+        sections = [non_deterministic_ir.sections[id] for id in ids]
+        dfas = [None] * len(ids)
+        keys = [None] * len(ids)
+        if cache is not None:
+            for index, section in enumerate(sections):
+                with profiler.measure("cache", ids[index]) as counts:
+                    keys[index] = cache.get_key(section.rules, minimizer)
+                    packed_dfa = cache.get(keys[index], section.rules)
+                    if packed_dfa is not None:
+                        dfas[index] = DeterministicFinite.unpack(packed_dfa)
+                    counts['hits'] = int(packed_dfa is not None)
+                    
+        # Build the sections which were not cached
+        missing = [index for index, dfa in enumerate(dfas) if dfa is None]
+        arguments = []
+        for index in missing:
+            with profiler.measure("nfa", ids[index]) as counts:
+                section_nfas = [rule.nfa for rule in sections[index].rules]
+                counts['nfa_states'] = sum(nfa.get_state_count() for nfa in section_nfas)
+                counts['nfa_edges'] = sum(len(nfa.edge_sources) + len(nfa.epsilon_sources) for nfa in section_nfas)
+            arguments.append((section_nfas, minimizer, ids[index], profiler.is_enabled))
+        if jobs == 0:
+            jobs = multiprocessing.cpu_count()
+        if jobs > 1 and len(missing) > 1:
+            pool = multiprocessing.Pool(min(jobs, len(missing)))
+            try:
+                results = pool.map(build_section_dfa, arguments, chunksize=1)
+                pool.close()
+            except:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+            packed_dfas = [packed_dfa for packed_dfa, records in results]
+            for packed_dfa, records in results:
+                profiler.records.extend(records)
+            built_dfas = [DeterministicFinite.unpack(i) for i in packed_dfas]
+        else:
+            built_dfas = [Minimizer.build(section_nfas, section_minimizer, profiler, section_id) 
+                for section_nfas, section_minimizer, section_id, is_profiled in arguments]
+            if cache is not None:
+                packed_dfas = [dfa.pack() for dfa in built_dfas]
+        for index, dfa in zip(missing, built_dfas):
+            dfas[index] = dfa
+        if cache is not None:
+            for index, packed_dfa in zip(missing, packed_dfas):
+                cache.set(keys[index], sections[index].rules, packed_dfa)
+            
+        for id, section, dfa in zip(ids, sections, dfas):
+            section_rules = [DeterministicIR.Rule(rule.name, rule.id, rule.action, rule.section_action) for rule in section.rules]
             self.sections[id] = DeterministicIR.Section(dfa, section_rules, section.inherits, section.exits, section.parent)
             
         
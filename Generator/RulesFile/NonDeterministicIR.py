@@ -47,7 +47,9 @@ class NonDeterministicIR(object):
         """
         Represents a rule in the intermediate representation
         @ivar name: a string identifying the name of the rule's token
-        @ivar nfa: a NonDeterministicFinite object representing the NFA representation of rule's regular expression
+        @ivar regex: a regular expression object in the Regex namespace, with its variables resolved, representing the 
+            rule's pattern
+        @ivar fragment_cache: Automata.FragmentCache object used when converting the regular expression into an NFA
         @ivar action: a list of strings, each representing an action to take after matching the rule
         @ivar section_action: a tuple, with a string and Section object. The action can be 'enter', 
             'exit' or None. If the action is 'enter', the Section object represents the section into 
@@ -55,13 +57,27 @@ class NonDeterministicIR(object):
         @ivar line_number: the line of the rules file where the rule was declared.
         @ivar id: a unique string for this rule and its properties
         """
-        def __init__(self, name, id, nfa, action, section_action, line_number):
+        def __init__(self, name, id, regex, action, section_action, line_number, fragment_cache=None):
             self.name = name
-            self.nfa = nfa
+            self.regex = regex
             self.action = action
             self.section_action = section_action
             self.line_number = line_number
             self.id = id
+            self.fragment_cache = fragment_cache
+            self.converted_nfa = None
+            
+        @property
+        def nfa(self):
+            """
+            A NonDeterministicFinite object representing the NFA representation of rule's regular expression. 
+            It is converted on first use, so that it is never converted if the DFA of the section is found in a cache.
+            """
+            if self.converted_nfa is None:
+                builder = Automata.NonDeterministicFiniteBuilder(self.id, fragment_cache=self.fragment_cache)
+                self.regex.accept(builder)
+                self.converted_nfa = builder.get()
+            return self.converted_nfa
             
     def __init__(self, root):
         # Build non-deterministic finite automata from AST node
@@ -81,13 +97,59 @@ class NonDeterministicIR(object):
         AST node.
         @ivar sections: array of sections
         @ivar rule_ids: dictionary of case-insensitiv rule ID strings to case-sensitive rule ID strings
+        @ivar parsed_defines: dictionary of Define objects to the regular expression objects parsed from their patterns,
+            shared by every section, as a definition parses the same way wherever it is used
+        @ivar define_lookups: dictionary of Section objects to DefineLookup objects for variables used in that section
+        @ivar fragment_cache: Automata.FragmentCache object shared by every rule, so that repeated sub-expressions are converted to NFAs once
         """
+        class DefineLookup(object):
+            """
+            Lookup table class to resolve variable definition names into regular expression objects. 
+            Each name is looked up in the section once, and each definition parsed once.
+            @ivar section: the Section object in which variables are looked up
+            @ivar defines: dictionary of variable names to the Define objects found for them, or None if not found
+            @ivar parsed_defines: dictionary of Define objects to the regular expression objects parsed from their patterns
+            """
+            def __init__(self, section, parsed_defines):
+                self.section = section
+                self.defines = {}
+                self.parsed_defines = parsed_defines
+                
+            def get_define(self, item_name):
+                """
+                @param item_name: the name of a variable
+                @return: the Define object for the variable within the section, or None if there is none
+                """
+                if item_name not in self.defines:
+                    result = self.section.find('define', item_name)
+                    self.defines[item_name] = result[0] if result is not None else None
+                return self.defines[item_name]
+                
+            def __contains__(self, item_name):
+                return self.get_define(item_name) is not None
+            
+            def __getitem__(self, item_name):
+                define = self.get_define(item_name)
+                if define is None:
+                    raise Exception("variable '{id}' not found".format(id=item_name))
+                regex = self.parsed_defines.get(define)
+                if regex is None:
+                    try:
+                        regex = Regex.Parser(define.pattern.regex, define.pattern.attributes.is_case_insensitive).parse() 
+                    except Exception as e:
+                        define.pattern.throw(str(e), is_sealed=True)
+                    self.parsed_defines[define] = regex
+                return regex
+                
         def __init__(self):            
             self.current_ast_section = None
             self.current_ir_section = None
             self.sections = {}
             self.rule_ids = {}
             self.rule_hashes = list()
+            self.parsed_defines = {}
+            self.define_lookups = {}
+            self.fragment_cache = Automata.FragmentCache()
                     
         def visit_section(self, section):
             self.current_ast_section = section
@@ -112,22 +174,10 @@ class NonDeterministicIR(object):
             Resolve section references and variables, compile the rule
             into an NFA, and add to the currently visited section.
             """
-            current_ast_section = self.current_ast_section
-            class DefineLookup(object):
-                """
-                Lookup table class to resolve variable definition names into regular expression objects
-                """
-                def __contains__(self, item_name):
-                    return current_ast_section.find('define', item_name) is not None
-                
-                def __getitem__(self, item_name):
-                    result = current_ast_section.find('define', item_name)
-                    if result is None:
-                        raise Exception("variable '{id}' not found".format(id=item_name))
-                    try:
-                        return Regex.Parser(result[0].pattern.regex, result[0].pattern.attributes.is_case_insensitive).parse() 
-                    except Exception as e:
-                        result[0].pattern.throw(str(e), is_sealed=True)
+            define_lookup = self.define_lookups.get(self.current_ast_section)
+            if define_lookup is None:
+                define_lookup = NonDeterministicIR.Builder.DefineLookup(self.current_ast_section, self.parsed_defines)
+                self.define_lookups[self.current_ast_section] = define_lookup
                 
             try:
                 if 'reserve' not in rule.rule_action:
@@ -136,7 +186,9 @@ class NonDeterministicIR(object):
                     nfa_id = hash(rule)
                     attributes = rule.pattern.attributes
                     regex = Regex.Parser(rule.pattern.regex, attributes.is_case_insensitive, attributes.is_unicode_defaults, attributes.is_literal).parse()
-                    nfa = Automata.NonDeterministicFiniteBuilder.build(nfa_id, DefineLookup(), regex)
+                    resolver = Regex.VariableResolver(define_lookup)
+                    regex.accept(resolver)
+                    regex = resolver.get()
                     section_action = None
                     if section is not None:
                         rule_section = SectionResolver.resolve(section, self.current_ast_section)
@@ -144,12 +196,11 @@ class NonDeterministicIR(object):
                             raise Exception("section '{id}' not found".format(id=section.name))
                         section = rule_section.get_qualified_name()
                     section_action = (action, section)
-                    ir_rule = NonDeterministicIR.Rule(rule.id, nfa_id, nfa, rule.rule_action, section_action, rule.line_number)
+                    ir_rule = NonDeterministicIR.Rule(rule.id, nfa_id, regex, rule.rule_action, section_action, rule.line_number, self.fragment_cache)
                     if nfa_id in self.rule_hashes[-1]:
                         # Merge identical rules if already exists
                         rule = next((r for r in self.current_ir_section.rules if r.id == nfa_id), None)
-                        rule.nfa = nfa.alternate((rule.nfa, nfa))
-                        self.current_ir_section.rules
+                        rule.regex = Regex.Alternation([rule.regex, regex])
                     else:
                         # Otherwise, add the rule to the set
                         self.current_ir_section.rules.append(ir_rule)
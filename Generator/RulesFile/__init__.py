@@ -2,6 +2,7 @@ from ASTBase import Node, Scope
 from AST import Pattern, Define, Rule, Section, SectionReference
 from NonDeterministicIR import NonDeterministicIR
 from DeterministicIR import DeterministicIR
+from DFACache import DFACache
 from Parser import parse
 from Visitor import Visitor, Traverser
 from Validator import Validator
@@ -60,7 +60,14 @@ class CPlusPlusEmitter(PluginTemplate):
         self.dfa_ir = dfa_ir
         self.plugin_options = plugin_options
         self.VariableFormatter = dependencies["VariableFormatter"].VariableFormatter
-        self.StateMachineEmitter = dependencies["StateMachine"].StateMachineEmitter
+        state_machine_emitters = {
+            'switch': dependencies["StateMachine"].StateMachineEmitter,
+            'table': dependencies["StateMachine"].TableStateMachineEmitter,
+            'goto': dependencies["StateMachine"].GotoStateMachineEmitter
+        }
+        if plugin_options.code_form not in state_machine_emitters:
+            raise Exception("Unsupported code form '%s'" % plugin_options.code_form)
+        self.StateMachineEmitter = state_machine_emitters[plugin_options.code_form]
         
         # Process plugin options
         for name, description in [
@@ -111,6 +118,8 @@ class CPlusPlusEmitter(PluginTemplate):
             token.stream.write(self.base_file_name)
         elif token.token == 'CLASS_NAME':
             token.stream.write(self.class_name)
+        elif token.token == 'DECODED_TOKEN_TEXT':
+            token.stream.write('token.text.decode()' if self.plugin_options.is_token_view else 'token.text')
         elif token.token == 'ENUM_TOKEN_IDS':
             ids = sorted(rule for rule in self.dfa_ir.rule_ids.values() if rule is not None)
             ids.insert(0, 'invalidcharacter')
@@ -144,6 +153,12 @@ class CPlusPlusEmitter(PluginTemplate):
             token.stream.write("{indent}#include \"{file_name}.h\"".format(
                 indent=' '*token.indent,
                 file_name=self.base_file_name))
+        elif token.token == 'KEEP_TOKEN_TEXT':
+            token.stream.write('this->keep_token_text()' if self.plugin_options.is_token_view else '0')
+        elif token.token == 'MARK_CHARACTER_START':
+            if self.plugin_options.is_token_view:
+                token.stream.write('{indent}this->character_start = c0 == -1 ? this->input_position : this->input_position - 1;\n'.format(
+                    indent=' '*token.indent))
         elif token.token == 'MODE_STACK_DECLARATION':
             token.stream.write('{indent}std::istream* stream;\n'.format(indent=' '*token.indent))
             if len(self.dfa_ir.sections) > 1:
@@ -185,8 +200,10 @@ class CPlusPlusEmitter(PluginTemplate):
             if len(self.dfa_ir.sections) > 1:
                 self.emit_state_machine_switch(code)
             for section in self.dfa_ir.sections:
-                state_machine_emitter = self.StateMachineEmitter(self.dfa_ir, section, self.formatter, code)
+                state_machine_emitter = self.StateMachineEmitter(self.dfa_ir, section, self.formatter, code, self.plugin_options.is_token_view)
                 state_machine_emitter.emit_state_machine()
+        elif token.token == 'TOKEN_TEXT_TYPE':
+            token.stream.write('Unicode::StringView' if self.plugin_options.is_token_view else 'Unicode::String')
         else:
             raise Exception("Unrecognized token: {0}".format(token.token))
 
@@ -18,9 +18,30 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
+from Generator.Automata.EquivalenceClasses import EquivalenceClasses
+
+def get_integer_type(values):
+    """
+    @param values: list of integers to be stored in a C++ array.
+    @return: string containing the smallest C++ integer type which can hold every value in the list.
+    """
+    min_v = min(values) if len(values) > 0 else 0
+    max_v = max(values) if len(values) > 0 else 0
+    for type_name, min_type, max_type in [
+        ('unsigned char', 0, 2**8-1),
+        ('signed char', -2**7, 2**7-1),
+        ('unsigned short', 0, 2**16-1),
+        ('short', -2**15, 2**15-1),
+        ('unsigned int', 0, 2**32-1)
+    ]:
+        if min_v >= min_type and max_v <= max_type:
+            return type_name
+    return 'int'
+
 class StateMachineEmitter(object):
-    def __init__(self, dfa_ir, section_id, formatter, emitter):
+    def __init__(self, dfa_ir, section_id, formatter, emitter, is_token_view=False):
         self.section_id = section_id
+        self.is_token_view = is_token_view
         self.dfa_ir = dfa_ir
         self.formatter = formatter
         self.emitter = emitter
@@ -52,28 +73,63 @@ class StateMachineEmitter(object):
             method_name = self.formatter.get_state_machine_method_name(section_id, is_relative=False)))
         with self.block("{", "}"):
             self.emit_state_enum()
+            self.emit_tables()
             self.emit([
                 '{token_type} token;'.format(
                     token_type = self.formatter.get_type('token', is_relative=False)),
                 '{state_type} state = {initial_state};'.format(
                     state_type = self.formatter.get_type('state', is_relative=False),
-                    initial_state = self.get_state_id(self.start_state)),
-                'Unicode::String text;',
-                'bool capture = false;'
+                    initial_state = self.get_state_id(self.start_state))])
+            if self.is_token_view:
+                # Tokens refer to the input from where the token started, rather than capturing text
+                self.line('this->token_start = this->get_position();')
+            else:
+                self.emit([
+                    'Unicode::String text;',
+                    'bool capture = false;'])
+            self.emit([
                 '',
                 '// State Machine',
                 'while (true)'])
             with self.block("{", "}"):
                 self.line("Unicode::Codepoint c = this->peek_utf8_char();")
-                self.line("switch(state)")
-                with self.block("{", "}"):
-                    self.emit_state_machine_cases()
+                self.emit_dispatch()
                 self.line("this->get_utf8_char();")
-                self.line("if (capture)")
-                self.line("text += c;")
+                if not self.is_token_view:
+                    self.line("if (capture)")
+                    self.line("text += c;")
             self.line()
             self.line("return Token();")
 
+    def emit_tables(self):
+        """
+        Emits any tables used by the state machine. Each state is written as code, so there are none.
+        """
+        pass
+        
+    def emit_table(self, name, values, type_name=None):
+        """
+        Emits a static array of integers
+        @param name: the name of the array.
+        @param values: list of integers in the array.
+        @param type_name: the type of the integers, or None for the smallest type which can hold them.
+        """
+        if type_name is None:
+            type_name = get_integer_type(values)
+        self.line("static const {type} {name}[{size}] =".format(type=type_name, name=name, size=len(values)))
+        with self.block("{", "};"):
+            for start in xrange(0, len(values), 16):
+                chunk = ', '.join(str(value) for value in values[start:start + 16])
+                self.line(chunk + (',' if start + 16 < len(values) else ''))
+                
+    def emit_dispatch(self):
+        """
+        Emits the code which decides what to do with the character c in the current state
+        """
+        self.line("switch(state)")
+        with self.block("{", "}"):
+            self.emit_state_machine_cases()
+
     def emit_state_enum(self):
         self.line("enum State")
         with self.block("{", "};"):
@@ -96,13 +152,33 @@ class StateMachineEmitter(object):
             with self.block():
                 self.emit_state(state)
             
+    def is_capture_state(self, state):
+        """
+        @return: True if a capture rule may be completed from the state, meaning its characters are captured
+        """
+        if state == 'invalid_char_state':
+            return False
+        return any(rule.id in state.ids and 'capture' in rule.action for rule in self.section.rules)
+        
+    def get_restart_lines(self):
+        """
+        @return: list of lines which start scanning a new token, once a token has been skipped
+        """
+        return [
+            'state = {id};'.format(id=self.get_state_id(self.start_state)),
+            'this->token_start = this->get_position();' if self.is_token_view else 'text.clear();',
+            'continue;']
+            
+    def get_invalid_char_line(self):
+        """
+        @return: line which moves to the invalid character state, where an error is raised
+        """
+        return 'state = {id};'.format(id=self.get_state_id('invalid_char_state'))
+            
     def emit_state(self, state):
         # Capture a character if there is a possibility of completing a capture rule
-        capture = False
-        for rule in self.section.rules:
-            if rule.id in state.ids and 'capture' in rule.action:
-                self.line("capture = true;")
-                break
+        if not self.is_token_view and self.is_capture_state(state):
+            self.line("capture = true;")
 
         if len(state.edges) > 0:
             # Transition table
@@ -146,12 +222,11 @@ class StateMachineEmitter(object):
                 if len(self.dfa_ir.sections) > 1:
                     block = ['return Token(Token::{id});'.format(id=self.formatter.get_token_id('skippedtoken'))]
                 else:
-                    block = [
-                        'state = {id};'.format(id=self.get_state_id(self.start_state)),
-                        'text.clear();',
-                        'continue;']
+                    block = self.get_restart_lines()
             elif 'capture' in rule.action:
-                block = ['return Token(Token::{id}, text);'.format(id=self.formatter.get_token_id(rule.name))]
+                block = ['return Token(Token::{id}, {text});'.format(
+                    id=self.formatter.get_token_id(rule.name),
+                    text='Unicode::StringView(this->token_start, this->get_position())' if self.is_token_view else 'text')]
             else:
                 block = ['return Token(Token::{id});'.format(id=self.formatter.get_token_id(rule.name))]
                 
@@ -173,7 +248,7 @@ class StateMachineEmitter(object):
                     self.line('mode.pop();')
                     self.line('return {method}();'.format(method=self.formatter.get_state_machine_method_name(self.parent, is_relative=False)))
             else:
-                self.line('state = {id};'.format(id=self.get_state_id('invalid_char_state')))
+                self.line(self.get_invalid_char_line())
 
     def emit_transition(self, statement, destination, edges):
         cases = []
@@ -189,10 +264,18 @@ class StateMachineEmitter(object):
             
         
     def emit_invalid_char_case(self):
+        self.line("case {invalid_char_state_id}:".format(invalid_char_state_id = self.get_state_id('invalid_char_state')))
+        self.emit_invalid_token_error()
+        
+    def emit_invalid_token_error(self):
+        """
+        Emits a block which raises an error containing the text of the invalid token
+        """
+        text = []
+        if self.is_token_view:
+            text = ['Unicode::String text = Unicode::StringView(this->token_start, this->get_position()).decode();']
         self.emit([
-           "case {invalid_char_state_id}:".format(
-                invalid_char_state_id = self.get_state_id('invalid_char_state')),
-            '{', [
+            '{', text + [
                 'std::ostringstream oss;',
                 'oss << "Invalid token: \'";',
                 'for (int i=0; i < text.size(); i++)',
@@ -205,3 +288,388 @@ class StateMachineEmitter(object):
                 'oss << "\'" << std::endl;',
                 'this->throw_error(oss.str());'
             ], '}'])
+
+class TableStateMachineEmitter(StateMachineEmitter):
+    """
+    Emits a state machine as a loop driven by tables, rather than as code for each state. Codepoints are mapped
+    to equivalence classes through a two-level table, which shares identical blocks of codepoints. As in flex,
+    the transitions of all states are packed into a single pair of next state and check tables, by giving each
+    state a base offset at which its transitions fit into the gaps left by the states already packed. Only the 
+    actions taken when a state has no transition for a character are written as code.
+    @ivar states: list of the states of the DFA, in the order they are numbered, followed by the invalid character state.
+    @ivar class_limit: integer one greater than the largest codepoint with a transition.
+    @ivar no_class: integer id of the class of codepoints which have no transitions.
+    @ivar class_blocks: list mapping each block of codepoints to its index in the list of unique blocks.
+    @ivar classes: list mapping each codepoint of each unique block to its class id.
+    @ivar bases: list mapping each state to its offset in the next state and check tables.
+    @ivar next_states: list of destination states, indexed by a state's base offset plus a class id.
+    @ivar checks: list of the states owning each entry in next_states. Unused entries hold a number which isn't a state.
+    """
+    block_bits = 8
+    
+    def __init__(self, dfa_ir, section_id, formatter, emitter, is_token_view=False):
+        StateMachineEmitter.__init__(self, dfa_ir, section_id, formatter, emitter, is_token_view)
+        self.states = [self.start_state] + [state for state in self.dfa if state != self.start_state]
+        self.states.append('invalid_char_state')
+        alphabet = EquivalenceClasses(edge for state in self.states[:-1] for edge in state.edges.itervalues())
+        self.no_class = len(alphabet)
+        self.build_class_map(alphabet)
+        
+        # Each state is a row of the transition table, with a column for each class
+        state_indices = dict((state, index) for index, state in enumerate(self.states))
+        rows = [[] for state in self.states]
+        for index, state in enumerate(self.states[:-1]):
+            for destination, edge in state.edges.iteritems():
+                for min_class, max_class in alphabet.get_class_ids(edge):
+                    rows[index].extend((class_id, state_indices[destination]) for class_id in xrange(min_class, max_class + 1))
+            rows[index].sort()
+        self.pack_rows(rows, self.no_class + 1)
+        
+    def build_class_map(self, alphabet):
+        """
+        Maps each codepoint with a transition to its class, in blocks of 2^block_bits codepoints.
+        @param alphabet: EquivalenceClasses object representing the classes of codepoints with transitions.
+        """
+        block_size = 2**self.block_bits
+        self.class_limit = max([max_v + 1 for codepoints in alphabet.classes for min_v, max_v in codepoints] + [1])
+        block_count = (self.class_limit + block_size - 1) // block_size
+        codepoint_classes = [self.no_class] * (block_count * block_size)
+        for class_id, codepoints in enumerate(alphabet.classes):
+            for min_v, max_v in codepoints:
+                codepoint_classes[min_v:max_v + 1] = [class_id] * (max_v - min_v + 1)
+                
+        unique_blocks = {}
+        self.class_blocks = []
+        self.classes = []
+        for block_start in xrange(0, len(codepoint_classes), block_size):
+            block = tuple(codepoint_classes[block_start:block_start + block_size])
+            if block not in unique_blocks:
+                unique_blocks[block] = len(unique_blocks)
+                self.classes.extend(block)
+            self.class_blocks.append(unique_blocks[block])
+    
+    def pack_rows(self, rows, column_count):
+        """
+        Packs the rows of a sparse transition table into next state and check tables, placing the fullest rows first.
+        @param rows: list with a row for each state, each a list of (class id, destination state index) tuples, sorted by class id.
+        @param column_count: the number of classes, and so the number of columns in each row.
+        """
+        self.bases = [0] * len(rows)
+        self.next_states = []
+        self.checks = []
+        first_free = 0
+        for index in sorted(xrange(len(rows)), key=lambda i: -len(rows[i])):
+            row = rows[index]
+            if len(row) == 0:
+                continue
+            base = max(0, first_free - row[0][0])
+            while any(base + class_id < len(self.checks) and self.checks[base + class_id] is not None for class_id, destination in row):
+                base += 1
+            size = base + row[-1][0] + 1
+            if size > len(self.checks):
+                self.checks.extend([None] * (size - len(self.checks)))
+                self.next_states.extend([0] * (size - len(self.next_states)))
+            for class_id, destination in row:
+                self.checks[base + class_id] = index
+                self.next_states[base + class_id] = destination
+            self.bases[index] = base
+            while first_free < len(self.checks) and self.checks[first_free] is not None:
+                first_free += 1
+                
+        # Every state must be able to look up every column, including those past the last entry
+        size = max(self.bases) + column_count
+        self.checks.extend([None] * (size - len(self.checks)))
+        self.next_states.extend([0] * (size - len(self.next_states)))
+        self.checks = [len(rows) if state is None else state for state in self.checks]
+        
+    def emit_state_enum(self):
+        # The states are numbered explicitly, since they index the tables
+        self.line("enum State")
+        with self.block("{", "};"):
+            for index, state in enumerate(self.states):
+                self.line("{id} = {index}{separator}".format(
+                    id = self.get_state_id(state),
+                    index = index,
+                    separator = ',' if index != len(self.states) - 1 else ''))
+    
+    def emit_tables(self):
+        self.emit_table('class_blocks', self.class_blocks)
+        self.emit_table('classes', self.classes)
+        self.emit_table('bases', self.bases)
+        self.emit_table('next_states', self.next_states)
+        self.emit_table('checks', self.checks)
+        if not self.is_token_view and self.has_captures():
+            self.emit_table('captures', [1 if self.is_capture_state(state) else 0 for state in self.states])
+            
+    def has_captures(self):
+        return any(self.is_capture_state(state) for state in self.states)
+    
+    def emit_dispatch(self):
+        if not self.is_token_view and self.has_captures():
+            self.emit(['if (captures[state])', ['capture = true;']])
+        self.line("unsigned int class_id = (unsigned int)c < {limit}u ? classes[(class_blocks[c >> {bits}] << {bits}) | (c & {mask})] : {no_class};".format(
+            limit = self.class_limit,
+            bits = self.block_bits,
+            mask = hex(2**self.block_bits - 1),
+            no_class = self.no_class))
+        self.emit([
+            'unsigned int index = bases[state] + class_id;',
+            'if (checks[index] == state)', [
+                'state = (State)next_states[index];'],
+            'else'])
+        with self.block("{", "}"):
+            self.line("switch(state)")
+            with self.block("{", "}"):
+                self.emit_action_cases()
+                
+    def emit_action_cases(self):
+        """
+        Emits the actions taken by each state when it has no transition for a character. States which are neither final 
+        nor the start state all move to the invalid character state.
+        """
+        self.emit_invalid_char_case()
+        for state in self.states[:-1]:
+            if len(state.final_ids) == 0 and state != self.start_state:
+                continue
+            self.line()
+            self.line("case {id}:".format(id=self.get_state_id(state)))
+            with self.block():
+                if state == self.start_state and len(state.edges) > 0:
+                    with self.block("if (c == -1)"):
+                        self.line("return Token(Token::{token_id});".format(token_id=self.formatter.get_token_id('endofstream')))
+                self.emit_else_case(state)
+                self.line('break;')
+        self.line()
+        with self.block("default:"):
+            self.line(self.get_invalid_char_line())
+            self.line('break;')
+
+class GotoStateMachineEmitter(StateMachineEmitter):
+    """
+    Emits a state machine as directly coded states, as re2c does. Each state is a block of code, and each transition 
+    jumps straight to the next state with goto, so there is no state variable to dispatch on for every character.
+    Each state reads its character straight from the input, rather than peeking at it and then consuming it, and 
+    only hands the character back to the lexer when the token ends without it. Within a state, ASCII characters 
+    are dispatched by a switch statement, which compilers turn into a jump table. Other characters are tested directly if the state has only a few ranges of them, or
+    found by a binary search of a table of where each range starts.
+    @ivar is_always_capturing: True if characters are captured from the start of every token, so that no flag is 
+        needed to decide whether to capture each character.
+    @ivar take_labels: set of states with a label which captures the character leading into the state.
+    @ivar is_start_labelled: True if the start state needs a label, because it is jumped back to.
+    @ivar transitions: dict mapping each state to a tuple with a list of its ASCII ranges, and a list of its other 
+        ranges, each a sorted list of (minimum value, maximum value, destination state) tuples.
+    @ivar range_tables: dict mapping states which search their ranges to a tuple with the id of the table of range 
+        starts, the id of the table of destination numbers, and the list of destinations they are numbered from.
+    @ivar range_starts: list of unique tables of range starts.
+    @ivar range_destinations: list of unique tables of destination numbers, in which 0 means no transition.
+    """
+    ascii_limit = 128
+    max_tested_ranges = 4
+    
+    def __init__(self, dfa_ir, section_id, formatter, emitter, is_token_view=False):
+        StateMachineEmitter.__init__(self, dfa_ir, section_id, formatter, emitter, is_token_view)
+        self.is_always_capturing = self.is_capture_state(self.start_state)
+        self.take_labels = set(destination for state in self.dfa for destination in state.edges)
+        self.take_labels.add('invalid_char_state')
+        is_restarted = len(dfa_ir.sections) == 1 and any('skip' in rule.action for rule in self.section.rules)
+        self.is_start_labelled = is_restarted or self.start_state in self.take_labels
+        
+        self.transitions = {}
+        self.range_tables = {}
+        self.range_starts = []
+        self.range_destinations = []
+        unique_starts = {}
+        unique_destinations = {}
+        for state in self.dfa:
+            ascii_ranges = []
+            other_ranges = []
+            for min_v, max_v, destination in sorted((min_v, max_v, destination) for destination, edge in state.edges.iteritems() for min_v, max_v in edge):
+                if min_v < self.ascii_limit:
+                    ascii_ranges.append((min_v, min(max_v, self.ascii_limit - 1), destination))
+                if max_v >= self.ascii_limit:
+                    other_ranges.append((max(min_v, self.ascii_limit), max_v, destination))
+            self.transitions[state] = (ascii_ranges, other_ranges)
+            if len(other_ranges) <= self.max_tested_ranges:
+                continue
+                
+            # Number the destinations, and give each gap between ranges a range with no destination
+            destinations = []
+            starts = []
+            numbers = []
+            position = self.ascii_limit
+            for min_v, max_v, destination in other_ranges:
+                if destination not in destinations:
+                    destinations.append(destination)
+                if min_v > position:
+                    starts.append(position)
+                    numbers.append(0)
+                starts.append(min_v)
+                numbers.append(destinations.index(destination) + 1)
+                position = max_v + 1
+            starts.append(position)
+            numbers.append(0)
+            starts = tuple(starts)
+            numbers = tuple(numbers)
+            if starts not in unique_starts:
+                unique_starts[starts] = len(self.range_starts)
+                self.range_starts.append(starts)
+            if numbers not in unique_destinations:
+                unique_destinations[numbers] = len(self.range_destinations)
+                self.range_destinations.append(numbers)
+            self.range_tables[state] = (unique_starts[starts], unique_destinations[numbers], destinations)
+        
+    def get_take_label(self, state):
+        return 'TAKE_{id}'.format(id=self.get_state_id(state))
+        
+    def get_restart_lines(self):
+        return [
+            'this->token_start = this->get_position();' if self.is_token_view else 'text.clear();',
+            'goto {id};'.format(id=self.get_state_id(self.start_state))]
+            
+    def get_invalid_char_line(self):
+        return 'goto {label};'.format(label=self.get_take_label('invalid_char_state'))
+        
+    def emit_state_machine(self):
+        section_id = self.section_id if len(self.dfa_ir.sections) > 1 else ''
+        self.line("{token_type} {method_name}()".format(
+            token_type = self.formatter.get_type('token', is_relative=False),
+            method_name = self.formatter.get_state_machine_method_name(section_id, is_relative=False)))
+        with self.block("{", "}"):
+            self.emit_tables()
+            if self.is_token_view:
+                # Tokens refer to the input from where the token started, rather than capturing text
+                self.line('this->token_start = this->get_position();')
+            else:
+                self.line('Unicode::String text;')
+                if not self.is_always_capturing:
+                    self.line('bool capture = false;')
+            self.line('Unicode::Codepoint c;')
+            
+            # The start state comes first, so that it is entered without consuming a character
+            self.emit_state(self.start_state)
+            for state in self.dfa:
+                if state != self.start_state:
+                    self.line()
+                    self.emit_take(state)
+                    self.emit_state(state)
+            if self.start_state in self.take_labels:
+                self.line()
+                self.emit_take(self.start_state)
+                self.line('goto {id};'.format(id=self.get_state_id(self.start_state)))
+            self.line()
+            self.emit_take('invalid_char_state')
+            self.line('c = this->peek_utf8_char();')
+            self.emit_invalid_token_error()
+            self.line('return Token();')
+            
+    def emit_tables(self):
+        for index, starts in enumerate(self.range_starts):
+            self.emit_table('range_starts_{index}'.format(index=index), starts, 'Unicode::Codepoint')
+        for index, numbers in enumerate(self.range_destinations):
+            self.emit_table('range_destinations_{index}'.format(index=index), numbers)
+            
+    def emit_take(self, state):
+        """
+        Emits the label at which the character leading into a state is captured, if necessary. The character has 
+        already been consumed by the state it leads from.
+        """
+        self.emitter.dedent()
+        self.line('{label}:'.format(label=self.get_take_label(state)))
+        self.emitter.indent()
+        if self.is_token_view:
+            pass
+        elif self.is_always_capturing:
+            self.line('text += c;')
+        else:
+            self.emit(['if (capture)', ['text += c;']])
+            
+    def is_invalid_char_else_case(self, state):
+        """
+        @return: True if the state raises an error when it has no transition for a character
+        """
+        if len(state.final_ids) > 0:
+            return False
+        return not (state == self.start_state and (self.inherits or self.exits))
+        
+    def emit_state(self, state):
+        # Other states are only entered from the label which captures the character leading into them
+        if state == self.start_state and self.is_start_labelled:
+            self.emitter.dedent()
+            self.line('{id}:'.format(id=self.get_state_id(state)))
+            self.emitter.indent()
+        else:
+            self.line('// {id}'.format(id=self.get_state_id(state)))
+        if not self.is_token_view and not self.is_always_capturing and self.is_capture_state(state):
+            self.line('capture = true;')
+            
+        # A state which ends the token whatever the next character is doesn't need to read it
+        is_invalid_char = self.is_invalid_char_else_case(state)
+        if len(state.edges) == 0 and not is_invalid_char:
+            self.emit_else_case(state)
+            return
+            
+        # Only the start state can be given a character handed back by the previous token
+        if state == self.start_state:
+            self.line('c = this->get_utf8_char();')
+        else:
+            self.line('c = this->read_utf8_char();')
+        ascii_ranges, other_ranges = self.transitions[state]
+        if len(ascii_ranges) > 0 and len(other_ranges) > 0:
+            self.line('if (c < {limit})'.format(limit=self.ascii_limit))
+            with self.block('{', '}'):
+                self.emit_ascii_switch(ascii_ranges)
+            self.line('else')
+            with self.block('{', '}'):
+                self.emit_range_dispatch(state, other_ranges)
+        elif len(ascii_ranges) > 0:
+            self.emit_ascii_switch(ascii_ranges)
+        elif len(other_ranges) > 0:
+            self.emit_range_dispatch(state, other_ranges)
+        
+        # No transition
+        if state == self.start_state and len(state.edges) > 0:
+            with self.block("if (c == -1)"):
+                self.line("return Token(Token::{token_id});".format(token_id=self.formatter.get_token_id('endofstream')))
+        if not is_invalid_char:
+            self.line('this->unread_utf8_char(c);')
+        self.emit_else_case(state)
+        
+    def emit_ascii_switch(self, ranges):
+        """
+        Emits a switch statement which jumps to the next state for each ASCII character with a transition
+        @param ranges: sorted list of (minimum value, maximum value, destination state) tuples
+        """
+        cases = {}
+        for min_v, max_v, destination in ranges:
+            cases.setdefault(destination, []).extend(xrange(min_v, max_v + 1))
+        self.line('switch (c)')
+        with self.block('{', '}'):
+            for destination, values in sorted(cases.iteritems(), key=lambda item: item[1][0]):
+                labels = ['case {value}:'.format(value=value) for value in values]
+                for start in xrange(0, len(labels), 8):
+                    self.line(' '.join(labels[start:start + 8]))
+                self.emit([['goto {label};'.format(label=self.get_take_label(destination))]])
+                
+    def emit_range_dispatch(self, state, ranges):
+        """
+        Emits code which jumps to the next state for characters outside of ASCII
+        @param state: the state whose transitions are emitted.
+        @param ranges: sorted list of (minimum value, maximum value, destination state) tuples, which don't overlap
+        """
+        if state not in self.range_tables:
+            for min_v, max_v, destination in ranges:
+                if min_v == max_v:
+                    condition = 'c == {value}'.format(value=min_v)
+                else:
+                    condition = 'c >= {min} && c <= {max}'.format(min=min_v, max=max_v)
+                self.emit(['if ({condition})'.format(condition=condition), ['goto {label};'.format(label=self.get_take_label(destination))]])
+            return
+        starts_id, destinations_id, destinations = self.range_tables[state]
+        self.line('switch (range_destinations_{destinations}[std::upper_bound(range_starts_{starts}, range_starts_{starts} + {size}, c) - range_starts_{starts} - 1])'.format(
+            destinations = destinations_id,
+            starts = starts_id,
+            size = len(self.range_starts[starts_id])))
+        with self.block('{', '}'):
+            for number, destination in enumerate(destinations):
+                self.line('case {number}:'.format(number=number + 1))
+                self.emit([['goto {label};'.format(label=self.get_take_label(destination))]])
@@ -20,7 +20,6 @@
  */
  
  #include <iostream>
- #include <fstream>
  #include <stdexcept>
  #include "$BASE_FILE_NAME.h"
  
@@ -37,17 +36,11 @@
         return 1;
     }
     
-    std::ifstream f;
-    f.open(argv[1], std::fstream::in);
-    if (f.fail())
-    {
-        std::cerr << "Unable to open '" << argv[1] << "'" << std::endl;
-        return 1;
-    }
-    
     try
     {
-        $NAMESPACE::$CLASS_NAME lexer(&f);
+        // The file is mapped into memory and scanned in place
+        std::string file_name(argv[1]);
+        $NAMESPACE::$CLASS_NAME lexer(file_name);
         $CLASS_NAME::Token token = lexer.get_token();
         while (token.id != $CLASS_NAME::Token::ENDOFSTREAM)
         {
@@ -59,7 +52,6 @@
     {
         std::cerr << "Error while retrieving token: " << ex.what() << std::endl;
     }
-    f.close();
     return 0;
  }
 
@@ -79,7 +71,7 @@
     if (token.text.empty())
         std::cout << "Token(" << id_string << ")" << std::endl;
     else
-        std::cout << "Token(" << id_string << ", '" << to_str(token.text) << "')" << std::endl;
+        std::cout << "Token(" << id_string << ", '" << to_str($DECODED_TOKEN_TEXT) << "')" << std::endl;
  }
  
  std::string to_str(Unicode::String str)
@@ -20,23 +20,194 @@
  */
  
 #include <string>
+#include <cstring>
+#include <algorithm>
 #include <iostream>
 #include <iomanip>
 #include <sstream>
 #include <stdexcept>
+#if defined(_WIN32)
+#define WIN32_LEAN_AND_MEAN
+#define NOMINMAX
+#include <windows.h>
+#else
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#endif
 $INCLUDES
 
 using namespace $NAMESPACE;
 
 $CLASS_NAME::$CLASS_NAME(std::istream* stream)
+    : input_buffer(input_buffer_size)
+{
+    this->initialize();
+    this->stream = stream;
+    this->input_position = &this->input_buffer[0];
+    this->input_end = this->input_position;
+}
+
+$CLASS_NAME::$CLASS_NAME(const char* begin, const char* end)
+{
+    // The text is scanned where it is, so it must outlive the lexical analyzer
+    this->initialize();
+    this->input_position = begin;
+    this->input_end = end;
+}
+
+$CLASS_NAME::$CLASS_NAME(const std::string& file_name)
+{
+    this->initialize();
+    this->map_file(file_name);
+}
+
+$CLASS_NAME::~$CLASS_NAME()
+{
+    this->unmap_file();
+}
+
+void $CLASS_NAME::initialize()
 {
     this->line = 1;
     this->character = 1;
     this->is_buffered = false;
-    this->stream = stream;
+    this->stream = NULL;
+    this->mapped_data = NULL;
+    this->mapped_size = 0;
+    this->token_start = NULL;
+    this->character_start = NULL;
     $PUSH_INITIAL_MODE
 }
 
+void $CLASS_NAME::map_file(const std::string& file_name)
+{
+    // Empty files can't be mapped, and are left as an empty range
+#if defined(_WIN32)
+    HANDLE file = CreateFileA(file_name.c_str(), GENERIC_READ, FILE_SHARE_READ, NULL, OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, NULL);
+    if (file == INVALID_HANDLE_VALUE)
+        throw std::runtime_error("Unable to open '" + file_name + "'");
+    LARGE_INTEGER size;
+    if (!GetFileSizeEx(file, &size))
+    {
+        CloseHandle(file);
+        throw std::runtime_error("Unable to open '" + file_name + "'");
+    }
+    if (size.QuadPart > 0)
+    {
+        HANDLE mapping = CreateFileMappingA(file, NULL, PAGE_READONLY, 0, 0, NULL);
+        if (mapping != NULL)
+        {
+            this->mapped_data = MapViewOfFile(mapping, FILE_MAP_READ, 0, 0, 0);
+            CloseHandle(mapping);
+        }
+        if (this->mapped_data == NULL)
+        {
+            CloseHandle(file);
+            throw std::runtime_error("Unable to map '" + file_name + "' into memory");
+        }
+        this->mapped_size = (std::size_t)size.QuadPart;
+    }
+    CloseHandle(file);
+#else
+    int file = open(file_name.c_str(), O_RDONLY);
+    if (file == -1)
+        throw std::runtime_error("Unable to open '" + file_name + "'");
+    struct stat status;
+    if (fstat(file, &status) == -1)
+    {
+        close(file);
+        throw std::runtime_error("Unable to open '" + file_name + "'");
+    }
+    if (status.st_size > 0)
+    {
+        void* data = mmap(NULL, (std::size_t)status.st_size, PROT_READ, MAP_PRIVATE, file, 0);
+        if (data == MAP_FAILED)
+        {
+            close(file);
+            throw std::runtime_error("Unable to map '" + file_name + "' into memory");
+        }
+#if defined(MADV_SEQUENTIAL)
+        madvise(data, (std::size_t)status.st_size, MADV_SEQUENTIAL);
+#endif
+        this->mapped_data = data;
+        this->mapped_size = (std::size_t)status.st_size;
+    }
+    close(file);
+#endif
+    this->input_position = (const char*)this->mapped_data;
+    this->input_end = this->input_position + this->mapped_size;
+}
+
+void $CLASS_NAME::unmap_file()
+{
+    if (this->mapped_data == NULL)
+        return;
+#if defined(_WIN32)
+    UnmapViewOfFile(this->mapped_data);
+#else
+    munmap(this->mapped_data, this->mapped_size);
+#endif
+    this->mapped_data = NULL;
+    this->mapped_size = 0;
+}
+
+std::size_t $CLASS_NAME::keep_token_text()
+{
+    // Move the part of the current token read so far to the front of the buffer, since tokens refer to their 
+    // text in the buffer. The buffer grows if a single token fills all of it.
+    std::size_t kept = this->input_end - this->token_start;
+    std::size_t token_offset = this->token_start - &this->input_buffer[0];
+    bool is_in_token = this->character_start >= this->token_start;
+    std::size_t character_offset = is_in_token ? this->character_start - this->token_start : 0;
+    if (kept == this->input_buffer.size())
+        this->input_buffer.resize(this->input_buffer.size() * 2);
+    char* begin = &this->input_buffer[0];
+    std::memmove(begin, begin + token_offset, kept);
+    this->token_start = begin;
+    if (is_in_token)
+        this->character_start = begin + character_offset;
+    return kept;
+}
+
+bool $CLASS_NAME::fill_input_buffer()
+{
+    // Text given as a range, or mapped from a file, is already all in memory
+    if (this->stream == NULL)
+        return false;
+        
+    // Take everything the stream has ready in one call. If nothing is ready, wait for a single byte, so 
+    // that interactive input is lexed as soon as it arrives, then take anything that arrived with it.
+    std::size_t kept = $KEEP_TOKEN_TEXT;
+    char* begin = &this->input_buffer[0] + kept;
+    std::streamsize size = this->input_buffer.size() - kept;
+    this->input_position = begin;
+    this->input_end = begin;
+    std::streamsize count = this->stream->readsome(begin, size);
+    if (count <= 0)
+    {
+        if (!this->stream->read(begin, 1))
+            return false;
+        count = 1 + this->stream->readsome(begin + 1, size - 1);
+    }
+    this->input_end = begin + count;
+    return true;
+}
+
+inline int $CLASS_NAME::get_byte()
+{
+    if (this->input_position == this->input_end && !this->fill_input_buffer())
+        return -1;
+    return (unsigned char)*this->input_position++;
+}
+
+inline const char* $CLASS_NAME::get_position()
+{
+    // The next character to be consumed has already been read from the input if it was peeked
+    return this->is_buffered ? this->character_start : this->input_position;
+}
+
 Unicode::Codepoint $CLASS_NAME::peek_utf8_char()
 {
     if (this->is_buffered)
@@ -54,8 +225,10 @@ Unicode::Codepoint $CLASS_NAME::get_utf8_char()
         return this->buffer;
     }
 
-    unsigned char c0, c1, c2, c3;
-    this->stream->read((char*)&c0, 1);
+    int c0 = this->get_byte();
+    $MARK_CHARACTER_START
+    if (c0 == -1)
+        return -1;
     if (c0 == '\n')
     {
         this->line++;
@@ -64,39 +237,62 @@ Unicode::Codepoint $CLASS_NAME::get_utf8_char()
     else
         this->character++;
         
-    if (this->stream->eof())
-        return -1;
     if (c0 < 128)
         return (Unicode::Codepoint) c0;
-    else if ((c0 & 0b11100000) == 0b11000000)
+        
+    // Decode the continuation bytes of a multi-byte character
+    Unicode::Codepoint codepoint;
+    int continuation_bytes;
+    if ((c0 & 0b11100000) == 0b11000000)
     {
-        this->stream->read((char*)&c1, 1);
-        return 
-            ((Unicode::Codepoint)(c0 & 0b00011111) << 6) | 
-            (Unicode::Codepoint)(c1 & 0b00111111); 
+        codepoint = c0 & 0b00011111;
+        continuation_bytes = 1;
     }
     else if ((c0 & 0b11110000) == 0b11100000)
     {
-        this->stream->read((char*)&c1, 1);
-        this->stream->read((char*)&c2, 1);
-        return 
-            ((Unicode::Codepoint)(c0 & 0b00001111) << 12) |
-            ((Unicode::Codepoint)(c1 & 0b00111111) << 6) |
-            (Unicode::Codepoint)(c2 & 0b00111111);
+        codepoint = c0 & 0b00001111;
+        continuation_bytes = 2;
     }
     else if ((c0 & 0b11111000) == 0b11110000)
     {
-        this->stream->read((char*)&c1, 1);
-        this->stream->read((char*)&c2, 1);
-        this->stream->read((char*)&c3, 1);
-        return 
-            ((Unicode::Codepoint)(c0 && 0b00000111) << 18) |
-            ((Unicode::Codepoint)(c1 && 0b00111111) << 12) |
-            ((Unicode::Codepoint)(c2 && 0b00111111) << 6) |
-            (Unicode::Codepoint)(c3 && 0b00111111);
+        codepoint = c0 & 0b00000111;
+        continuation_bytes = 3;
     }
     else
         this->throw_error("Invalid unicode character");
+    for (int i = 0; i < continuation_bytes; i++)
+    {
+        int c = this->get_byte();
+        if (c == -1)
+            this->throw_error("Incomplete unicode character at end of stream");
+        codepoint = (codepoint << 6) | (Unicode::Codepoint)(c & 0b00111111);
+    }
+    return codepoint;
+}
+
+inline Unicode::Codepoint $CLASS_NAME::read_utf8_char()
+{
+    // Reads the next character, which must not have been peeked, without going through get_byte() for ASCII 
+    // characters which are already in the input buffer
+    if (this->input_position == this->input_end || (unsigned char)*this->input_position >= 128)
+        return this->get_utf8_char();
+    int c0 = (unsigned char)*this->input_position++;
+    $MARK_CHARACTER_START
+    if (c0 == '\n')
+    {
+        this->line++;
+        this->character = 1;
+    }
+    else
+        this->character++;
+    return (Unicode::Codepoint) c0;
+}
+
+inline void $CLASS_NAME::unread_utf8_char(Unicode::Codepoint c)
+{
+    // Hands back a character which was read, as if it had only been peeked
+    this->buffer = c;
+    this->is_buffered = true;
 }
 
 void $CLASS_NAME::throw_error(std::string message)
@@ -116,6 +312,62 @@ $CLASS_NAME::Token::Token($CLASS_NAME::Token::TokenId id)
     : id(id)
 { }
 
-$CLASS_NAME::Token::Token($CLASS_NAME::Token::TokenId id, const Unicode::String& text)
+$CLASS_NAME::Token::Token($CLASS_NAME::Token::TokenId id, const $TOKEN_TEXT_TYPE& text)
     : id(id), text(text)
-{ }
\ No newline at end of file
+{ }
+
+Unicode::StringView::StringView()
+    : begin(NULL), end(NULL)
+{ }
+
+Unicode::StringView::StringView(const char* begin, const char* end)
+    : begin(begin), end(end)
+{ }
+
+std::size_t Unicode::StringView::size() const
+{
+    return this->end - this->begin;
+}
+
+bool Unicode::StringView::empty() const
+{
+    return this->begin == this->end;
+}
+
+std::string Unicode::StringView::str() const
+{
+    return std::string(this->begin, this->end);
+}
+
+Unicode::String Unicode::StringView::decode() const
+{
+    // The text was checked when it was lexed, so it is assumed to be valid UTF-8
+    Unicode::String text;
+    text.reserve(this->size());
+    const char* position = this->begin;
+    while (position != this->end)
+    {
+        int c0 = (unsigned char)*position++;
+        Unicode::Codepoint codepoint = c0;
+        int continuation_bytes = 0;
+        if ((c0 & 0b11100000) == 0b11000000)
+        {
+            codepoint = c0 & 0b00011111;
+            continuation_bytes = 1;
+        }
+        else if ((c0 & 0b11110000) == 0b11100000)
+        {
+            codepoint = c0 & 0b00001111;
+            continuation_bytes = 2;
+        }
+        else if ((c0 & 0b11111000) == 0b11110000)
+        {
+            codepoint = c0 & 0b00000111;
+            continuation_bytes = 3;
+        }
+        for (int i = 0; i < continuation_bytes && position != this->end; i++)
+            codepoint = (codepoint << 6) | (Unicode::Codepoint)(*position++ & 0b00111111);
+        text += codepoint;
+    }
+    return text;
+}
\ No newline at end of file
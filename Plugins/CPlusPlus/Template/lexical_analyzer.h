@@ -23,6 +23,7 @@
 #define $HEADER_GUARD
 
 #include <string>
+#include <vector>
 #include <iostream>
 $MODE_STACK_INCLUDE
 namespace $NAMESPACE
@@ -31,6 +32,22 @@ namespace $NAMESPACE
     {
         typedef int Codepoint;
         typedef std::basic_string<Codepoint> String;
+        
+        // UTF-8 text which is left where it is in the input, rather than copied. When the lexer reads from a 
+        // stream, the input is refilled and moved within its buffer, so a view is only valid until the next 
+        // call to get_token(). Views of a range of memory are valid as long as the memory is, and views of a 
+        // mapped file as long as the lexer is.
+        struct StringView
+        {
+            StringView();
+            StringView(const char* begin, const char* end);
+            const char* begin;
+            const char* end;
+            std::size_t size() const;
+            bool empty() const;
+            std::string str() const;
+            String decode() const;
+        };
     }
     
     class $CLASS_NAME
@@ -46,23 +63,45 @@ namespace $NAMESPACE
             
             Token();
             Token(TokenId id);
-            Token(TokenId id, const Unicode::String& text);
+            Token(TokenId id, const $TOKEN_TEXT_TYPE& text);
             TokenId id;
-            Unicode::String text;
+            $TOKEN_TEXT_TYPE text;
         };
         $ENUM_SECTION_IDS
         $CLASS_NAME(std::istream* stream);
+        $CLASS_NAME(const char* begin, const char* end);
+        $CLASS_NAME(const std::string& file_name);
+        ~$CLASS_NAME();
         $STATE_MACHINE_METHOD_DECLARATIONS
         void throw_error(std::string message);
         
         private:
+        $CLASS_NAME(const $CLASS_NAME&);
+        $CLASS_NAME& operator=(const $CLASS_NAME&);
+        static const std::streamsize input_buffer_size = 65536;
+        std::vector<char> input_buffer;
+        const char* input_position;
+        const char* input_end;
+        void* mapped_data;
+        std::size_t mapped_size;
+        const char* token_start;
+        const char* character_start;
         Unicode::Codepoint buffer;
         bool is_buffered;
         $MODE_STACK_DECLARATION
         int line;
         int character;
+        void initialize();
+        void map_file(const std::string& file_name);
+        void unmap_file();
+        std::size_t keep_token_text();
+        bool fill_input_buffer();
+        int get_byte();
+        const char* get_position();
         Unicode::Codepoint get_utf8_char();
         Unicode::Codepoint peek_utf8_char();
+        Unicode::Codepoint read_utf8_char();
+        void unread_utf8_char(Unicode::Codepoint c);
 
     };
 }
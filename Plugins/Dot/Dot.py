@@ -78,11 +78,13 @@ class DotPlugin(PluginTemplate):
         
         # Generate the state machine factory
         self.get_state_machine = lambda section: section.dfa
+        self.get_start_state = lambda state_machine: state_machine.start_state
         if self.plugin_options.form == self.plugin_options.NFA_IR:
             nfas = {}
             for section in self.rules_file.sections.values():
                 nfas[section] = section.rules[0].nfa.alternate(rule.nfa for rule in section.rules)
             self.get_state_machine = lambda section: nfas[section]
+            self.get_start_state = lambda state_machine: state_machine.get_terminal_states()[0]
 
         # Generate vertices
         for id, section in self.rules_file.sections.items():
@@ -202,7 +204,7 @@ class DotPlugin(PluginTemplate):
         state_machine = self.get_state_machine(section)
         
         if self.entry_vertex is not None and id == 'cluster_main':
-            self.draw_edge(code, self.entry_vertex, self.state_map[state_machine.start_state])
+            self.draw_edge(code, self.entry_vertex, self.state_map[self.get_start_state(state_machine)])
             
         for state in state_machine:
             for destination, edge in state.edges.items():
@@ -223,7 +225,7 @@ class DotPlugin(PluginTemplate):
                         destination = self.exit_vertices[id]
                     elif rule.section_action[0] in ('enter', 'switch'):
                         destination_section = self.rules_file.sections[rule.section_action[1]]
-                        destination = self.get_state_machine(destination_section).start_state
+                        destination = self.get_start_state(self.get_state_machine(destination_section))
                         if destination not in self.state_map:
                             self.allocate_vertex(destination)
                         destination = self.state_map[destination]
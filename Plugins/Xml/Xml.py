@@ -151,15 +151,12 @@ class XmlPlugin(PluginTemplate):
         ), **rule_attributes())
         
     def generate_state_machine(self, E, section, state_machine):
-        def state_machine_start_state():
-            return self.format_state_id(state_machine.start_state, section)
-        def state_machine_end_state():
-            return self.format_state_id(state_machine.end_state, section)
         def state_machine_attributes():
             if hasattr(state_machine, 'end_state'):
-                return {'start': state_machine_start_state(), 'end': state_machine_end_state()}
+                start_state, end_state = state_machine.get_terminal_states()
+                return {'start': self.format_state_id(start_state, section), 'end': self.format_state_id(end_state, section)}
             else:
-                return {'start': state_machine_start_state()}
+                return {'start': self.format_state_id(state_machine.start_state, section)}
             
         return E.StateMachine(
             *list(self.generate_states(E, section, state_machine)), 
@@ -3,11 +3,16 @@ import unittest
 import RulesFile
 from TestCExample import *
 from TestCoverageSet import *
+from TestDFAConstruction import *
+from TestDFACache import *
 from TestDFAEquivalency import *
 from TestDFAMinimization import *
+from TestEquivalenceClasses import *
+from TestExecutor import *
 from TestLexicalAnalyzer import *
 from TestRegexParsing import *
 from TestRegexVariableResolver import *
+from TestUnicodeDatabase import *
 #from RulesFile.TestParser import *
 #from RulesFile.TestValidator import *
 #from RulesFile.TestNonDeterministicIR import *
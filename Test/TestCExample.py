@@ -13,8 +13,90 @@ from Generator import LanguagePlugins
 
 base_directory = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
 
+# Reads a file through each constructor of the C++ lexer, and writes the id of each token and a checksum of its text
+cpp_driver = """#include <iostream>
+#include <fstream>
+#include <sstream>
+#include <stdexcept>
+#include "LexicalAnalyzer.h"
+
+unsigned long checksum(const Poodle::Unicode::String& text)
+{
+    unsigned long result = text.size();
+    for (std::size_t i = 0; i < text.size(); i++)
+        result = result * 31 + text[i];
+    return result;
+}
+
+unsigned long checksum(const Poodle::Unicode::StringView& text)
+{
+    return checksum(text.decode());
+}
+
+void lex(Poodle::LexicalAnalyzer& lexer)
+{
+    try
+    {
+        Poodle::LexicalAnalyzer::Token token = lexer.get_token();
+        while (token.id != Poodle::LexicalAnalyzer::Token::ENDOFSTREAM)
+        {
+            std::cout << token.id << " " << checksum(token.text) << std::endl;
+            token = lexer.get_token();
+        }
+    }
+    catch (std::runtime_error& e)
+    {
+        std::cout << "error: " << e.what() << std::endl;
+    }
+}
+
+int main(int argc, char* argv[])
+{
+    std::string mode(argv[1]);
+    if (mode == "stream")
+    {
+        std::ifstream f(argv[2], std::ios::in | std::ios::binary);
+        Poodle::LexicalAnalyzer lexer(&f);
+        lex(lexer);
+    }
+    else if (mode == "range")
+    {
+        std::ifstream f(argv[2], std::ios::in | std::ios::binary);
+        std::stringstream contents;
+        contents << f.rdbuf();
+        std::string data = contents.str();
+        Poodle::LexicalAnalyzer lexer(data.data(), data.data() + data.size());
+        lex(lexer);
+    }
+    else
+    {
+        std::string file_name(argv[2]);
+        Poodle::LexicalAnalyzer lexer(file_name);
+        lex(lexer);
+    }
+    return 0;
+}
+"""
+
+def create_large_input(path):
+    """
+    Writes C source several times larger than the buffer a C++ lexer reads a stream into, with tokens longer than
+    the buffer, and multi-byte characters at many offsets, so that tokens and characters span refills.
+    @param path: the file to write
+    """
+    lines = []
+    for i in xrange(6000):
+        lines.append("int value_%d = %d; /* caf\xc3\xa9 %d */" % (i, i * 7, i))
+        lines.append("const char* text_%d = \"\xe2\x82\xac%s\";" % (i, "x" * (i % 11)))
+        if i == 1000:
+            lines.append("const char* long_text = \"%s\";" % ("\xc3\xa9abc" * 30000))
+        if i == 4000:
+            lines.append("int %s = 0;" % ("long_identifier_" * 6000))
+    with open(path, 'wb') as f:
+        f.write("\n".join(lines) + "\n")
+
 class TestCExampleFreeBasic(unittest.TestCase):
-    def run_poodle_lex(self, language):
+    def run_poodle_lex(self, language, plugin_options=None):
         output_dir = tempfile.mkdtemp()
         rules_file_path = os.path.join(base_directory, "Example", "CLexer", "CLexer.rules")
         rules_file = RulesFile.Parser.parse(rules_file_path, "utf-8")
@@ -28,7 +110,8 @@ class TestCExampleFreeBasic(unittest.TestCase):
         representation = dfa_ir
         if language_plugin.default_form == LanguagePlugins.PluginOptions.NFA_IR:
             representation = nfa_ir
-        plugin_options = LanguagePlugins.PluginOptions()
+        if plugin_options is None:
+            plugin_options = LanguagePlugins.PluginOptions()
         emitter = language_plugin.create(representation, plugin_options)
         executor = LanguagePlugins.Executor(emitter, language_plugin.plugin_files_directory, output_dir)
         executor.execute()
@@ -70,6 +153,72 @@ class TestCExampleFreeBasic(unittest.TestCase):
     def test_cexample_cpp(self):
         output_dir = self.run_poodle_lex("cpp")
         self.run_demo(output_dir, "demo")
+        
+    def get_cpp_demo_output(self, plugin_options):
+        output_dir = self.run_poodle_lex("cpp", plugin_options)
+        working_dir = os.path.join(output_dir, "demo")
+        demo_input = os.path.join(base_directory, "Example", "CLexer", "HelloWorld.c")
+        with open(os.devnull, 'w') as f:
+            subprocess.call('sh make_demo.sh' if os.name == 'posix' else 'make_demo.bat', cwd=working_dir, shell=True, stdout=f)
+        demo_exe = os.path.join(working_dir, "demo" if os.name == 'posix' else "demo.exe")
+        output = subprocess.check_output([demo_exe, demo_input], cwd=working_dir)
+        shutil.rmtree(output_dir)
+        return output
+        
+    def get_cpp_driver_outputs(self, plugin_options):
+        """
+        Lexes a large input through each constructor of the C++ lexer
+        @param plugin_options: LanguagePlugins.PluginOptions object with which to generate the lexer
+        @return: dict mapping 'stream', 'range' and 'file' to the output of the driver reading through each constructor
+        """
+        output_dir = self.run_poodle_lex("cpp", plugin_options)
+        try:
+            input_file = os.path.join(output_dir, "input.c")
+            create_large_input(input_file)
+            with open(os.path.join(output_dir, "driver.cpp"), 'w') as f:
+                f.write(cpp_driver)
+            driver_exe = os.path.join(output_dir, "driver" if os.name == 'posix' else "driver.exe")
+            subprocess.check_call([os.environ.get('CXX', 'g++'), '-o', driver_exe, 'driver.cpp', 'LexicalAnalyzer.cpp'], cwd=output_dir)
+            return dict((mode, subprocess.check_output([driver_exe, mode, input_file], cwd=output_dir)) for mode in ['stream', 'range', 'file'])
+        finally:
+            shutil.rmtree(output_dir)
+            
+    def test_cexample_cpp_constructors(self):
+        # Reading a stream, a range of memory, or a mapped file should lex the same tokens, even once the stream 
+        # is refilled and its buffer grown to hold long tokens
+        outputs = self.get_cpp_driver_outputs(LanguagePlugins.PluginOptions())
+        self.assertTrue(outputs['stream'].count("\n") > 12000)
+        self.assertFalse("error" in outputs['stream'])
+        self.assertEqual(outputs['range'], outputs['stream'])
+        self.assertEqual(outputs['file'], outputs['stream'])
+        
+    def test_cexample_cpp_token_view(self):
+        # Tokens referring to the input should hold the same text as tokens with a copy of it
+        outputs = []
+        for is_token_view in [False, True]:
+            plugin_options = LanguagePlugins.PluginOptions()
+            plugin_options.is_token_view = is_token_view
+            outputs.append(self.get_cpp_demo_output(plugin_options))
+        self.assertNotEqual(outputs[0], "")
+        self.assertEqual(outputs[0], outputs[1])
+        
+        # Tokens being read are kept in the buffer when a stream is refilled, growing it for tokens longer than it
+        expected = self.get_cpp_driver_outputs(LanguagePlugins.PluginOptions())['stream']
+        plugin_options = LanguagePlugins.PluginOptions()
+        plugin_options.is_token_view = True
+        for mode, output in self.get_cpp_driver_outputs(plugin_options).iteritems():
+            self.assertEqual(output, expected)
+        
+    def test_cexample_cpp_code_forms(self):
+        # Each code form should lex the same tokens
+        outputs = []
+        for code_form in ['switch', 'table', 'goto']:
+            plugin_options = LanguagePlugins.PluginOptions()
+            plugin_options.code_form = code_form
+            outputs.append(self.get_cpp_demo_output(plugin_options))
+        self.assertNotEqual(outputs[0], "")
+        for output in outputs[1:]:
+            self.assertEqual(outputs[0], output)
             
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,8 @@ import sys
 import os.path
 sys.path.append("..")
 import unittest
-from Generator.CoverageSet import CoverageSet
+import pickle
+from Generator.CoverageSet import CoverageSet, FrozenCoverageSet
 
 class TestCoverageSet(unittest.TestCase):
     def test_overlap_removal(self):
@@ -77,6 +78,99 @@ class TestCoverageSet(unittest.TestCase):
         coverage_set[2].add(10, 20)
         difference = CoverageSet.difference(coverage_set[0], *coverage_set[1:3])
         self.assertEqual([i for i in difference], [(21, 24), (41, 44)])
+
+    def test_remove(self):
+        coverage_set = CoverageSet([(10, 20), (30, 40), (50, 60)])
+        coverage_set.remove(15, 35)
+        self.assertEqual([i for i in coverage_set], [(10, 14), (36, 40), (50, 60)])
+        coverage_set.remove(45, 70)
+        self.assertEqual([i for i in coverage_set], [(10, 14), (36, 40)])
+        coverage_set.remove(12, 12)
+        self.assertEqual([i for i in coverage_set], [(10, 11), (13, 14), (36, 40)])
+
+    def test_membership(self):
+        coverage_set = CoverageSet([(10, 20), (30, 40)])
+        self.assertTrue(10 in coverage_set)
+        self.assertTrue(20 in coverage_set)
+        self.assertTrue(35 in coverage_set)
+        self.assertFalse(9 in coverage_set)
+        self.assertFalse(25 in coverage_set)
+        self.assertFalse(41 in coverage_set)
+        self.assertTrue(CoverageSet([(12, 14), (31, 31)]) in coverage_set)
+        self.assertFalse(CoverageSet([(12, 31)]) in coverage_set)
+        self.assertEqual(len(coverage_set), 22)
+        self.assertTrue(CoverageSet().is_empty())
+        self.assertFalse(coverage_set.is_empty())
+
+    def test_equality(self):
+        coverage_set1 = CoverageSet([(1, 5), (6, 10), (20, 30)])
+        coverage_set2 = CoverageSet([(20, 25), (1, 10), (26, 30)])
+        self.assertEqual(coverage_set1, coverage_set2)
+        self.assertEqual(hash(coverage_set1), hash(coverage_set2))
+        coverage_set2.add(11, 11)
+        self.assertNotEqual(coverage_set1, coverage_set2)
+
+    def test_ascii_bitmap(self):
+        ascii_set = CoverageSet([(48, 57), (65, 90), (97, 122)])
+        mixed_set = CoverageSet([(60, 70), (120, 0x20ac)])
+        self.assertEqual(ascii_set.get_ascii_bitmap() >> 48 & 0x3ff, 0x3ff)
+        self.assertTrue(ascii_set.is_ascii())
+        self.assertFalse(mixed_set.is_ascii())
+        self.assertTrue(127 in mixed_set)
+        self.assertFalse(71 in mixed_set)
+        self.assertEqual([i for i in CoverageSet.intersection(ascii_set, mixed_set)], [(65, 70), (120, 122)])
+        self.assertEqual([i for i in CoverageSet.difference(ascii_set, mixed_set)], [(48, 57), (71, 90), (97, 119)])
+        self.assertEqual([i for i in CoverageSet.union(ascii_set, CoverageSet([(58, 64), (127, 127)]))], [(48, 90), (97, 122), (127, 127)])
+
+        # Bitmaps are built lazily, so equal sets must hash alike whether or not one has been built
+        copy_set = CoverageSet([(48, 57), (65, 90), (97, 122)])
+        self.assertTrue(50 in ascii_set)
+        self.assertEqual(ascii_set, copy_set)
+        self.assertEqual(hash(ascii_set), hash(copy_set))
+        copy_set.add(58, 58)
+        self.assertNotEqual(ascii_set, copy_set)
+        self.assertTrue(58 in copy_set)
+
+    def test_segmentation_shared_id(self):
+        coverage_set = [CoverageSet([(1, 10)]), CoverageSet([(5, 20)]), CoverageSet([(8, 12)])]
+        segments = CoverageSet.segments((coverage_set[0], 'a'), (coverage_set[1], 'a'), (coverage_set[2], 'b'))
+        expected = [
+            ((1, 7), set(['a'])),
+            ((8, 12), set(['a', 'b'])),
+            ((13, 20), set(['a']))
+        ]
+        self.assertEqual([i for i in segments], expected)
+
+    def test_segmentation_adjacent(self):
+        coverage_set = [CoverageSet([(1, 10), (30, 40)]), CoverageSet([(11, 20)]), CoverageSet()]
+        segments = CoverageSet.segments(*[(cset, i) for i, cset in enumerate(coverage_set)])
+        expected = [
+            ((1, 10), set([0])),
+            ((11, 20), set([1])),
+            ((30, 40), set([0]))
+        ]
+        self.assertEqual([i for i in segments], expected)
+        self.assertEqual([i for i in CoverageSet.segments()], [])
+
+    def test_frozen(self):
+        coverage_set = CoverageSet([(10, 20), (0x100, 0x200)])
+        frozen_set = coverage_set.freeze()
+        self.assertTrue(frozen_set is CoverageSet([(0x100, 0x200), (10, 20)]).freeze())
+        self.assertTrue(frozen_set is FrozenCoverageSet([(10, 20), (0x100, 0x200)]))
+        self.assertTrue(frozen_set is frozen_set.freeze())
+        self.assertTrue(frozen_set is pickle.loads(pickle.dumps(frozen_set)))
+        self.assertFalse(frozen_set is CoverageSet([(10, 21), (0x100, 0x200)]).freeze())
+        self.assertEqual(frozen_set, coverage_set)
+        self.assertEqual(hash(frozen_set), hash(coverage_set))
+        self.assertRaises(TypeError, frozen_set.add, 30, 40)
+        self.assertRaises(TypeError, frozen_set.update, CoverageSet([(30, 40)]))
         
+        # Modifying the original set, or a thawed copy, must not affect the frozen set
+        coverage_set.add(30, 40)
+        thawed_set = CoverageSet(frozen_set)
+        thawed_set.remove(10, 10)
+        self.assertEqual([i for i in frozen_set], [(10, 20), (0x100, 0x200)])
+        self.assertEqual([i for i in CoverageSet.union(frozen_set, thawed_set)], [(10, 20), (0x100, 0x200)])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import sys
+sys.path.append("..")
+import os
+import shutil
+import tempfile
+import unittest
+from Generator.Automata import Minimizer
+from Generator import RulesFile
+
+def build_nfa_ir():
+    rules = RulesFile.Parser.parse("../Example/FBCLexer/FreeBasicLexer.rules", "utf8")
+    rules.accept(RulesFile.Traverser(RulesFile.Validator()))
+    return RulesFile.NonDeterministicIR(rules)
+
+class TestDFACache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        
+    def test_cache_hit(self):
+        cache = RulesFile.DFACache(self.directory)
+        RulesFile.DeterministicIR(build_nfa_ir(), minimizer=Minimizer.hopcroft, cache=cache)
+        
+        # Cached sections are never converted to NFAs. Rule ids differ between runs, so entries must not hold them.
+        nfa_ir = build_nfa_ir()
+        self.assertEqual(len(os.listdir(self.directory)), len(nfa_ir.sections))
+        cached_dfa_ir = RulesFile.DeterministicIR(nfa_ir, minimizer=Minimizer.hopcroft, cache=cache)
+        self.assertEqual([rule.converted_nfa for section in nfa_ir.sections.itervalues() for rule in section.rules], [None] * sum(len(section.rules) for section in nfa_ir.sections.itervalues()))
+        uncached_dfa_ir = RulesFile.DeterministicIR(nfa_ir, minimizer=Minimizer.hopcroft)
+        for id, section in uncached_dfa_ir.sections.iteritems():
+            cached_dfa = cached_dfa_ir.sections[id].dfa
+            self.assertEqual(cached_dfa, section.dfa)
+            self.assertEqual(cached_dfa.start_state.ids, section.dfa.start_state.ids)
+            self.assertEqual(len([state for state in cached_dfa]), len([state for state in section.dfa]))
+            
+        # Each minimizer has its own entries, and damaged entries are rebuilt
+        key = cache.get_key(nfa_ir.sections['::main::'].rules, Minimizer.hopcroft)
+        self.assertNotEqual(key, cache.get_key(nfa_ir.sections['::main::'].rules, None))
+        with open(cache.get_path(key), 'wb') as f:
+            f.write("damaged")
+        self.assertEqual(cache.get(key, nfa_ir.sections['::main::'].rules), None)
+        RulesFile.DeterministicIR(build_nfa_ir(), minimizer=Minimizer.hopcroft, cache=cache)
+        self.assertNotEqual(cache.get(key, nfa_ir.sections['::main::'].rules), None)
+        
+    def test_eviction(self):
+        cache = RulesFile.DFACache(self.directory)
+        nfa_ir = build_nfa_ir()
+        RulesFile.DeterministicIR(nfa_ir, minimizer=Minimizer.hopcroft, cache=cache)
+        sections = nfa_ir.sections.values()
+        keys = [cache.get_key(section.rules, Minimizer.hopcroft) for section in sections]
+        sizes = dict((key, os.path.getsize(cache.get_path(key))) for key in keys)
+        
+        # The most recently used entry is kept when the cache is shrunk to fit it
+        for index, key in enumerate(keys):
+            os.utime(cache.get_path(key), (index, index))
+        cache.get(keys[0], sections[0].rules)
+        cache.max_size = sizes[keys[0]]
+        cache.evict()
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(cache.get_path(keys[0]))])
+        
+if __name__ == '__main__':
+    unittest.main()
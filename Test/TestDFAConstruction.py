@@ -0,0 +1,85 @@
+import sys
+sys.path.append("..")
+import unittest
+from Generator import Automata
+from Generator import Regex
+from Generator.CoverageSet import CoverageSet
+
+class TestDFAConstruction(unittest.TestCase):
+    def test_long_chain(self):
+        # Both the DFA and each epsilon closure are far deeper than the recursion limit
+        length = sys.getrecursionlimit() * 2
+        nfa = Automata.NonDeterministicFinite()
+        state = nfa.start_state
+        for i in xrange(length):
+            next_state = nfa.add_state()
+            nfa.add_edge(state, CoverageSet([(ord('a'), ord('a'))]), next_state)
+            state = next_state
+            for j in xrange(2):
+                next_state = nfa.add_state()
+                nfa.add_epsilon_edge(state, next_state)
+                state = next_state
+        nfa.add_epsilon_edge(state, nfa.end_state)
+        nfa.final_ids[nfa.end_state] = nfa.get_rule_id_bit('Chain')
+        dfa = Automata.DeterministicFiniteBuilder.build(nfa)
+        dfa_states = [i for i in dfa]
+        self.assertEqual(len(dfa_states), length + 1)
+        self.assertEqual([i.final_ids for i in dfa_states if i.is_final], [set(['Chain'])])
+        
+    def test_epsilon_cycle(self):
+        # (a|b)*a(a|b) has four DFA states, one for each combination of the last two characters
+        nfa = Automata.NonDeterministicFinite()
+        states = [nfa.add_state() for i in xrange(3)]
+        nfa.add_epsilon_edge(nfa.start_state, states[0])
+        nfa.add_epsilon_edge(states[0], nfa.start_state)
+        nfa.add_edge(states[0], CoverageSet([(ord('a'), ord('b'))]), nfa.start_state)
+        nfa.add_edge(states[0], CoverageSet([(ord('a'), ord('a'))]), states[1])
+        nfa.add_edge(states[1], CoverageSet([(ord('a'), ord('b'))]), states[2])
+        nfa.add_epsilon_edge(states[2], nfa.end_state)
+        dfa = Automata.DeterministicFiniteBuilder.build(nfa)
+        self.assertEqual(len([i for i in dfa]), 4)
+        self.assertEqual(len([i for i in dfa if i.is_final]), 2)
+        
+    def test_alternate(self):
+        nfas = []
+        for rule_id, values in [('A', CoverageSet([(1, 5)])), ('B', CoverageSet([(4, 8)]))]:
+            nfa = Automata.NonDeterministicFinite()
+            nfa.add_edge(nfa.start_state, values, nfa.end_state)
+            nfa.ids = [nfa.get_rule_id_bit(rule_id)] * nfa.get_state_count()
+            nfa.final_ids[nfa.end_state] = nfa.get_rule_id_bit(rule_id)
+            nfas.append(nfa)
+        alternated_nfa = Automata.NonDeterministicFinite.alternate(nfas)
+        self.assertEqual(alternated_nfa.get_state_count(), 6)
+        self.assertEqual(nfas[1].rule_ids, ['B'])
+        
+        # States may be walked as views, which translate the ids of the copied states
+        start_state = [i for i in alternated_nfa][0]
+        self.assertEqual(start_state.ids, set())
+        self.assertEqual(len(start_state.epsilon_edges), 2)
+        self.assertEqual(sorted(list(j.final_ids) for i in start_state.epsilon_edges for j in i.edges), [['A'], ['B']])
+        
+        dfa = Automata.DeterministicFiniteBuilder.build(alternated_nfa)
+        final_ids = sorted((sorted(i.final_ids), list(edge)) for state in dfa for i, edge in state.edges.iteritems())
+        self.assertEqual(final_ids, [(['A'], [(1, 3)]), (['A', 'B'], [(4, 5)]), (['B'], [(6, 8)])])
+        
+    def test_fragment_cache(self):
+        # Sub-expressions compare by structure, so the same pattern parsed twice is one cache entry
+        defines = {'Digit': Regex.Parser(u"[0-9]").parse()}
+        patterns = [u"(ab|c)+{Digit}x", u"y(ab|c)+{Digit}", u"(ab|c)+[0-9]x"]
+        self.assertEqual(Regex.Parser(patterns[0]).parse(), Regex.Parser(patterns[0]).parse())
+        self.assertEqual(hash(Regex.Parser(patterns[0]).parse()), hash(Regex.Parser(patterns[0]).parse()))
+        self.assertNotEqual(Regex.Parser(patterns[0]).parse(), Regex.Parser(patterns[1]).parse())
+        
+        fragment_cache = Automata.FragmentCache()
+        for i, pattern in enumerate(patterns):
+            regex = Regex.Parser(pattern).parse()
+            cached_nfa = Automata.NonDeterministicFiniteBuilder.build(str(i), defines, regex, fragment_cache)
+            uncached_nfa = Automata.NonDeterministicFiniteBuilder.build(str(i), defines, regex)
+            self.assertEqual(cached_nfa.get_state_count(), uncached_nfa.get_state_count())
+            self.assertEqual(Automata.DeterministicFiniteBuilder.build(cached_nfa), Automata.DeterministicFiniteBuilder.build(uncached_nfa))
+        repeated = Regex.Parser(u"(ab|c)+").parse()
+        self.assertTrue(isinstance(fragment_cache.fragments[repeated], Automata.NonDeterministicFinite))
+        self.assertEqual(fragment_cache.fragments[Regex.Parser(u"y(ab|c)+[0-9]").parse()], None)
+        
+if __name__ == '__main__':
+    unittest.main()
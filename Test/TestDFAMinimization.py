@@ -1,10 +1,13 @@
 import sys
 sys.path.append("..")
 import unittest
+import pickle
 from Generator import Automata
 from Generator.CoverageSet import CoverageSet
 from Generator.Automata import Minimizer
 from Generator import RulesFile
+from Generator import Regex
+from Generator.Profiler import Profiler
 
 class TestDFAMinimization(unittest.TestCase):
     def test_minimization_simple(self):
@@ -84,6 +87,52 @@ class TestDFAMinimization(unittest.TestCase):
         self.assertEqual(dfa, min_dfa)
         self.assertEqual(dfa, dfa_copy)
 
+    def test_minimization_partial(self):
+        # States 1 and 2 differ only in that state 2 has no transition on 2, so they may not be merged
+        dfa = Automata.DeterministicFinite()
+        states = [Automata.DeterministicState() for i in xrange(5)]
+        states[0].edges[states[1]] = CoverageSet([(1, 1)])
+        states[0].edges[states[2]] = CoverageSet([(2, 2)])
+        states[0].edges[states[3]] = CoverageSet([(3, 3)])
+        states[1].edges[states[4]] = CoverageSet([(1, 2)])
+        states[2].edges[states[4]] = CoverageSet([(1, 1)])
+        states[3].edges[states[4]] = CoverageSet([(1, 2)])
+        dfa.start_state = states[0]
+        states[4].is_final = True
+        states[4].final_ids = set(['Final'])
+        Minimizer.hopcroft(dfa)
+        
+        min_dfa = Automata.DeterministicFinite()
+        min_states = [Automata.DeterministicState() for i in xrange(4)]
+        min_states[0].edges[min_states[1]] = CoverageSet([(1, 1), (3, 3)])
+        min_states[0].edges[min_states[2]] = CoverageSet([(2, 2)])
+        min_states[1].edges[min_states[3]] = CoverageSet([(1, 2)])
+        min_states[2].edges[min_states[3]] = CoverageSet([(1, 1)])
+        min_dfa.start_state = min_states[0]
+        min_states[3].is_final = True
+        min_states[3].final_ids = set(['Final'])
+        
+        self.assertEqual(dfa, min_dfa)
+        
+    def test_minimization_long_chains(self):
+        # Two identical chains, each far longer than the number of refinement passes a naive algorithm could afford
+        for minimizer, length in [(Minimizer.hopcroft, 5000), (Minimizer.polynomial, 500)]:
+            dfa = Automata.DeterministicFinite()
+            dfa.start_state = Automata.DeterministicState()
+            for first_value in (1, 2):
+                state = dfa.start_state
+                value = first_value
+                for i in xrange(length):
+                    next_state = Automata.DeterministicState()
+                    state.edges[next_state] = CoverageSet([(value, value)])
+                    state = next_state
+                    value = 3 + i % 2
+                state.is_final = True
+                state.final_ids = set(['Final'])
+            minimizer(dfa)
+            self.assertEqual(len([state for state in dfa]), length + 1)
+            self.assertEqual(dfa.start_state.edges.values(), [CoverageSet([(1, 2)])])
+        
     def test_complex_dfa_minimization_case(self):
         polynomial_rules = RulesFile.Parser.parse("TestDFAMinimization.rules", "utf8")
         polynomial_nfa_ir = RulesFile.NonDeterministicIR(polynomial_rules)
@@ -100,5 +149,61 @@ class TestDFAMinimization(unittest.TestCase):
         self.assertEqual(len([state for state in polynomial_dfa]), final_state_count_expected)
         self.assertEqual(len([state for state in hopcroft_dfa]), final_state_count_expected)
         
+    def test_nfa_minimizers(self):
+        rules = RulesFile.Parser.parse("TestDFAMinimization.rules", "utf8")
+        nfa_ir = RulesFile.NonDeterministicIR(rules)
+        nfas = [rule.nfa for rule in nfa_ir.sections['::main::'].rules]
+        hopcroft_dfa = Minimizer.build(nfas, Minimizer.hopcroft)
+        
+        # A batch size of one merges the DFA of each rule in turn
+        for dfa in [Minimizer.build(nfas, Minimizer.brzozowski), Minimizer.build(nfas, Minimizer.auto), Minimizer.incremental(nfas, batch_size=1)]:
+            self.assertEqual(dfa, hopcroft_dfa)
+            self.assertEqual(len([state for state in dfa]), 224)
+            self.assertEqual(dfa.start_state.ids, hopcroft_dfa.start_state.ids)
+            
+    def test_brzozowski_start_state(self):
+        # The start of the second determinization is the set of final states, which is reached again after any 'c'
+        for i, pattern in enumerate([u"(b|a)*c", u"((b)*)*", u"x(a|b)*xc"]):
+            nfa = Automata.NonDeterministicFiniteBuilder.build(str(i), {}, Regex.Parser(pattern).parse())
+            hopcroft_dfa = Minimizer.build([nfa], Minimizer.hopcroft)
+            brzozowski_dfa = Minimizer.build([nfa], Minimizer.brzozowski)
+            self.assertEqual(len([state for state in brzozowski_dfa]), len([state for state in hopcroft_dfa]))
+            self.assertEqual(brzozowski_dfa, hopcroft_dfa)
+            
+    def test_jobs(self):
+        rules = RulesFile.Parser.parse("../Example/FBCLexer/FreeBasicLexer.rules", "utf8")
+        rules.accept(RulesFile.Traverser(RulesFile.Validator()))
+        nfa_ir = RulesFile.NonDeterministicIR(rules)
+        
+        # NFAs are sent to worker processes, and DFAs sent back, in compact form
+        nfa = nfa_ir.sections['::main::'].rules[0].nfa
+        copied_nfa = pickle.loads(pickle.dumps(nfa, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(Automata.DeterministicFiniteBuilder.build(copied_nfa), Automata.DeterministicFiniteBuilder.build(nfa))
+        self.assertEqual(copied_nfa.get_rule_id_bit(copied_nfa.rule_ids[0]), 1)
+        
+        serial_profiler = Profiler()
+        parallel_profiler = Profiler()
+        serial_dfa_ir = RulesFile.DeterministicIR(nfa_ir, minimizer=Minimizer.hopcroft, profiler=serial_profiler)
+        parallel_dfa_ir = RulesFile.DeterministicIR(nfa_ir, minimizer=Minimizer.hopcroft, jobs=3, profiler=parallel_profiler)
+        self.assertTrue(len(serial_dfa_ir.sections) > 1)
+        self.assertEqual(sorted(serial_dfa_ir.sections), sorted(parallel_dfa_ir.sections))
+        for id, section in serial_dfa_ir.sections.iteritems():
+            parallel_dfa = parallel_dfa_ir.sections[id].dfa
+            self.assertEqual(parallel_dfa, section.dfa)
+            self.assertEqual(parallel_dfa.start_state.ids, section.dfa.start_state.ids)
+            self.assertEqual(len([state for state in parallel_dfa]), len([state for state in section.dfa]))
+            self.assertEqual([rule.id for rule in parallel_dfa_ir.sections[id].rules], [rule.id for rule in section.rules])
+            
+        # Phases run in worker processes are recorded too, and count the same objects
+        def get_counts(profiler):
+            return dict(((record['phase'], record['section']), record['counts']) for record in profiler.records)
+        serial_counts = get_counts(serial_profiler)
+        self.assertEqual(serial_counts, get_counts(parallel_profiler))
+        self.assertEqual(sorted(serial_counts), sorted((phase, id) for phase in ['nfa', 'dfa', 'minimize'] for id in serial_dfa_ir.sections))
+        for id, section in serial_dfa_ir.sections.iteritems():
+            self.assertEqual(serial_counts[('minimize', id)]['dfa_states'], len([state for state in section.dfa]))
+            self.assertTrue(serial_counts[('dfa', id)]['dfa_states'] >= serial_counts[('minimize', id)]['dfa_states'])
+            self.assertTrue(serial_counts[('nfa', id)]['nfa_states'] > 0)
+        
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import sys
+sys.path.append("..")
+import unittest
+from Generator import Automata
+from Generator.CoverageSet import CoverageSet
+
+class TestEquivalenceClasses(unittest.TestCase):
+    def test_partition(self):
+        letters = CoverageSet([(ord('A'), ord('Z')), (ord('a'), ord('z'))])
+        vowels = CoverageSet([(ord(i), ord(i)) for i in 'aeiou'])
+        digits = CoverageSet([(ord('0'), ord('9'))])
+        alphabet = Automata.EquivalenceClasses([letters, vowels, digits, CoverageSet(letters)])
+        
+        # Upper case letters and non-vowel lower case letters are indistinguishable, vowels and digits are not
+        self.assertEqual(len(alphabet), 3)
+        classes = sorted([i for i in values] for values in alphabet.classes)
+        expected_consonants = [(ord('A'), ord('Z')), (ord('b'), ord('d')), (ord('f'), ord('h')), (ord('j'), ord('n')), (ord('p'), ord('t')), (ord('v'), ord('z'))]
+        self.assertEqual(classes, [[(ord('0'), ord('9'))], expected_consonants, [(ord(i), ord(i)) for i in 'aeiou']])
+        
+        # Each set is relabelled as the classes it covers, and converts back to the same values
+        self.assertEqual(len(alphabet.get_class_ids(letters)), 2)
+        self.assertEqual(len(alphabet.get_class_ids(vowels)), 1)
+        for coverage_set in [letters, vowels, digits]:
+            self.assertEqual(alphabet.get_values(alphabet.get_class_ids(coverage_set)), coverage_set)
+        self.assertEqual(alphabet.get_values(CoverageSet()), CoverageSet())
+        
+    def test_unicode(self):
+        coverage_sets = [CoverageSet([(0x41, 0x5a), (0xc0, 0xd6), (0x391, 0x3a9), (0x10400, 0x10427)]), CoverageSet([(1, 0x10ffff)])]
+        alphabet = Automata.EquivalenceClasses(coverage_sets)
+        self.assertEqual(len(alphabet), 2)
+        self.assertEqual(alphabet.get_class_ids(coverage_sets[0]), CoverageSet([(1, 1)]))
+        self.assertEqual(alphabet.get_class_ids(coverage_sets[1]), CoverageSet([(0, 1)]))
+        self.assertEqual(alphabet.get_values(CoverageSet([(0, 0)])), CoverageSet.difference(coverage_sets[1], coverage_sets[0]))
+        
+if __name__ == '__main__':
+    unittest.main()
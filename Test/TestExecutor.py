@@ -0,0 +1,81 @@
+import sys
+sys.path.append("..")
+import os
+import os.path
+import shutil
+import unittest
+import tempfile
+
+from Generator import RulesFile
+from Generator import LanguagePlugins
+
+base_directory = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        rules_file = RulesFile.Parser.parse(os.path.join(base_directory, "Example", "SimpleLexer", "SimpleLexer.rules"), "utf-8")
+        rules_file.accept(RulesFile.Traverser(RulesFile.Validator()))
+        dfa_ir = RulesFile.DeterministicIR(RulesFile.NonDeterministicIR(rules_file))
+        language_plugins, default_language = LanguagePlugins.load(os.path.join(base_directory, "Plugins/Plugins.json"), 'utf-8')
+        self.language_plugin = language_plugins['cpp']
+        self.language_plugin.load()
+        self.emitter = self.language_plugin.create(dfa_ir, LanguagePlugins.PluginOptions())
+        
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+        
+    def execute(self, inputs):
+        executor = LanguagePlugins.Executor(self.emitter, self.language_plugin.plugin_files_directory, self.output_dir, inputs)
+        executor.execute()
+        
+    def get_times(self):
+        return dict((output_file, os.path.getmtime(os.path.join(self.output_dir, output_file))) for template_file, output_file in self.emitter.get_files_to_generate())
+        
+    def set_back_times(self):
+        # Times are set back by a minute, so that any file written afterwards has a different time
+        for output_file, time in self.get_times().iteritems():
+            os.utime(os.path.join(self.output_dir, output_file), (time - 60, time - 60))
+        
+    def test_incremental(self):
+        inputs = LanguagePlugins.hash_inputs(self.language_plugin.get_source_files(), ['cpp'])
+        self.execute(inputs)
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, LanguagePlugins.Executor.manifest_file)))
+        self.set_back_times()
+        times = self.get_times()
+        
+        # Unchanged inputs skip generation, and changed inputs only replace files with different contents
+        self.execute(inputs)
+        self.assertEqual(self.get_times(), times)
+        self.execute(inputs + "changed")
+        self.assertEqual(self.get_times(), times)
+        
+        # Files changed or removed since they were generated are written again
+        header_file = os.path.join(self.output_dir, "LexicalAnalyzer.h")
+        with open(header_file, 'r') as f:
+            header = f.read()
+        with open(header_file, 'a') as f:
+            f.write("// Changed")
+        os.remove(os.path.join(self.output_dir, "LexicalAnalyzer.cpp"))
+        self.execute(inputs)
+        with open(header_file, 'r') as f:
+            self.assertEqual(f.read(), header)
+        new_times = self.get_times()
+        self.assertNotEqual(new_times["LexicalAnalyzer.h"], times["LexicalAnalyzer.h"])
+        self.assertEqual(new_times[os.path.join("demo", "demo.cpp")], times[os.path.join("demo", "demo.cpp")])
+        self.assertEqual(sorted(os.listdir(self.output_dir)), sorted(["demo", "LexicalAnalyzer.h", "LexicalAnalyzer.cpp", LanguagePlugins.Executor.manifest_file]))
+        
+    def test_failed_generation(self):
+        inputs = LanguagePlugins.hash_inputs(self.language_plugin.get_source_files(), ['cpp'])
+        self.execute(inputs)
+        files = sorted(os.listdir(self.output_dir))
+        
+        # A file which fails to generate leaves the last one in place, and no partly generated file
+        def process(token):
+            raise Exception("Failed")
+        self.emitter.process = process
+        self.assertRaises(Exception, self.execute, inputs + "changed")
+        self.assertEqual(sorted(os.listdir(self.output_dir)), files)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import sys
 sys.path.append("..")
+import os.path
 import unittest
 from Generator import Regex
 from Generator.Regex import RegexParserExpected, RegexParserInvalidCharacter, RegexParserInvalidCharacterRange, RegexParserExceptionInternal, RegexParserUnicodeCodepointOutOfRange
+from Generator.Regex.UnicodeQuery import UnicodeQuery
 
 class TestRegexParser(unittest.TestCase):
     def test_float_pattern(self):
@@ -58,6 +60,14 @@ class TestRegexParser(unittest.TestCase):
             (0xFE63, 0xFE63), (0xFF0D, 0xFF0D)
         ])))
         
+    def test_unicode_db_not_needed(self):
+        # Expressions without Unicode properties must not look for, or load, the database
+        missing_db = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MissingUnicodeData")
+        for pattern in [u"[a-z_][[:alnum:]_]*", u"\\xa3|\\u00e9+", u"[^\\s]{2,3}"]:
+            Regex.Parser(pattern, is_case_insensitive=True, unicode_db=missing_db).parse()
+        self.assertFalse(os.path.realpath(missing_db) in UnicodeQuery._instance)
+        self.assertRaises(IOError, Regex.Parser(u"\\p{Lu}", unicode_db=missing_db).parse)
+        
     def test_grouping_and_subexpressions(self):
         parsed = Regex.Parser("[a-z--h]").parse()
         self.assertEqual(repr(parsed), repr(Regex.Literal([(97, 103), (105, 122)])))
@@ -3,6 +3,9 @@ sys.path.append("..")
 import unittest
 
 from Generator import RulesFile
+from Generator.RulesFile.AST import Section, Rule, Define, Pattern
+from Generator.RulesFile.Visitor import Traverser
+from Generator.RulesFile import NonDeterministicIR
 from Generator import Regex
 from Generator.Regex import RegexParserCircularReference, RegexParserUndefinedVariable
 
@@ -47,6 +50,29 @@ class TestRegexResolver(unittest.TestCase):
         unresolved = Regex.Parser("Hello{Dog}Goodbye").parse()
         resolver = Regex.VariableResolver({})
         self.assertRaises(RegexParserUndefinedVariable, lambda: unresolved.accept(resolver))
+
+    def test_define_cache(self):
+        define_shared = Section('::main::', None, rule = [
+            Rule('First', Pattern('a{char}')),
+            Rule('Second', Pattern('b{char}{Char}'))], define = [
+            Define('char', Pattern('[a-z]')),
+            Define('digit', Pattern('[0-9]'))], section = [
+            Section('ChildSection', None, rule = [
+                Rule('Third', Pattern('c{char}{digit}'))], define = [
+                Define('digit', Pattern('[0-7]'))])])
+        builder = NonDeterministicIR.Builder()
+        define_shared.accept(Traverser(builder))
+        
+        # Each definition used is parsed once, and shared with child sections unless hidden by another definition
+        child_section = define_shared.find('section', 'childsection')[0]
+        main_lookup = builder.define_lookups[define_shared]
+        child_lookup = builder.define_lookups[child_section]
+        self.assertEqual(len(builder.parsed_defines), 2)
+        self.assertTrue(main_lookup['char'] is child_lookup['char'])
+        self.assertTrue(main_lookup['char'] is main_lookup['Char'])
+        self.assertTrue(child_lookup['digit'] is not main_lookup['digit'])
+        self.assertEqual(len(builder.parsed_defines), 3)
+        self.assertFalse('missing' in child_lookup)
     
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import sys
+sys.path.append("..")
+import os
+import os.path
+import json
+import shutil
+import tempfile
+import unittest
+from Generator.CoverageSet import CoverageSet
+from Generator.Regex import UnicodeDatabase
+from Generator.Regex.UnicodeQuery import UnicodeQuery
+
+class TestUnicodeDatabase(unittest.TestCase):
+    def setUp(self):
+        # A small copy of the UCD, in the same layout as the JSON files in UnicodeData
+        self.path = tempfile.mkdtemp()
+        files = {
+            "AliasesProperties.json": {"generalcategory": "gc", "gc": "gc", "alphabetic": "alpha", "alpha": "alpha"},
+            "AliasesValues.json": {"gc": {"uppercaseletter": "lu", "lu": "lu", "lowercaseletter": "ll", "ll": "ll", "decimalnumber": "nd", "nd": "nd"}},
+            "BinaryProperties.json": {"alpha": [[65, 90], [97, 122], [170, 170]]},
+            "Propertygc.json": {"lu": [[65, 90], [192, 214]], "ll": [[97, 122], [223, 246]], "nd": [[48, 57]]}
+        }
+        for file_name, contents in files.iteritems():
+            with open(os.path.join(self.path, file_name), 'w') as f:
+                json.dump(contents, f)
+        
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        
+    def test_compiled_queries(self):
+        json_query = UnicodeQuery(self.path)
+        self.assertEqual(json_query.database, None)
+        UnicodeDatabase.compile_database(self.path)
+        compiled_query = UnicodeQuery(self.path)
+        self.assertNotEqual(compiled_query.database, None)
+        
+        # Both copies of the database must give the same answers, including for missing properties and values
+        for property, value in [('alpha', None), ('Alphabetic', None), ('gc', 'Lu'), ('General_Category', 'lowercase letter'), ('Nd', None), ('gc', 'L'), ('gc', 'Zs')]:
+            self.assertEqual(compiled_query.query(property, value), json_query.query(property, value))
+        self.assertEqual(list(compiled_query.query('gc', 'L')), [(65, 90), (97, 122), (192, 214), (223, 246)])
+        self.assertEqual(list(compiled_query.query('alpha')), [(65, 90), (97, 122), (170, 170)])
+        self.assertTrue(compiled_query.query('gc', 'Zs').is_empty())
+        for query in [json_query, compiled_query]:
+            self.assertRaises(ValueError, query.query, 'sc', 'Greek')
+            self.assertRaises(ValueError, query.query, 'Unknown')
+            
+    def test_stale_database(self):
+        UnicodeDatabase.compile_database(self.path)
+        self.assertNotEqual(UnicodeQuery(self.path).database, None)
+        
+        # A database compiled from older JSON files must not be used
+        with open(os.path.join(self.path, "Propertygc.json"), 'w') as f:
+            json.dump({"lu": [[65, 90]], "ll": [[97, 122]], "nd": [[48, 57], [1632, 1641]]}, f)
+        query = UnicodeQuery(self.path)
+        self.assertEqual(query.database, None)
+        self.assertEqual(list(query.query('gc', 'Nd')), [(48, 57), (1632, 1641)])
+        
+    def test_query_cache(self):
+        query = UnicodeQuery(self.path)
+        letters = query.query('gc', 'L')
+        self.assertTrue(letters is query.query('General_Category', 'l'))
+        self.assertTrue(query.query('gc', 'Lu') is query.results[('gc', 'lu')])
+        self.assertRaises(TypeError, letters.add, 48, 57)
+        
+        # Results are only saved and read back if the persistent cache is enabled
+        cache_path = os.path.join(self.path, UnicodeQuery._db_results)
+        query.save_results()
+        UnicodeQuery.use_persistent_cache = True
+        try:
+            self.assertFalse(os.path.exists(cache_path))
+            query = UnicodeQuery(self.path)
+            query.query('gc', 'L')
+            query.save_results()
+            self.assertTrue(os.path.exists(cache_path))
+            saved_query = UnicodeQuery(self.path)
+            self.assertEqual(saved_query.get_saved_results()[('gc', 'l')], ([65, 97, 192, 223], [90, 122, 214, 246]))
+            self.assertTrue(saved_query.query('gc', 'L') is letters)
+            
+            # Changing the database must discard the saved results
+            UnicodeDatabase.compile_database(self.path)
+            self.assertEqual(UnicodeQuery(self.path).get_saved_results(), {})
+        finally:
+            UnicodeQuery.use_persistent_cache = False
+        
+if __name__ == '__main__':
+    unittest.main()
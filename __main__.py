@@ -22,11 +22,18 @@ from __future__ import print_function
 import os
 import sys
 import shutil
+import multiprocessing
 from Generator.Automata.Minimizer import hopcroft
 from Generator.Automata.Minimizer import polynomial
+from Generator.Automata.Minimizer import brzozowski
+from Generator.Automata.Minimizer import incremental
+from Generator.Automata.Minimizer import auto
 from Generator import CommandArguments
 from Generator import LanguagePlugins
 from Generator import RulesFile
+from Generator.Regex.UnicodeQuery import UnicodeQuery
+from Generator.Regex import UnicodeDatabase
+from Generator.Profiler import Profiler
 from Generator import LanguagePlugins
 
 this_file = sys.executable
@@ -37,9 +44,15 @@ this_folder = os.path.dirname(os.path.normcase(os.path.realpath(this_file)))
 minimizers = {
     'hopcroft': ('Minimize using Hopcroft\'s partition refinement algorithm', hopcroft),
     'polynomial': ('Minimize using a polynomial algorithm comparing each state', polynomial),
-    'none': ('Do not minimize', lambda: None)
+    'brzozowski': ('Minimize using Brzozowski\'s algorithm, reversing and determinizing the NFA twice', brzozowski),
+    'incremental': ('Minimize while building the DFA, a batch of rules at a time, to bound memory use', incremental),
+    'auto': ('Minimize using hopcroft, or incremental for large sections', auto),
+    'none': ('Do not minimize', None)
 }
 
+# Allow worker processes to start when frozen into an executable
+multiprocessing.freeze_support()
+
 # Handle 'list' commands
 command, arguments = CommandArguments.handle()
 if command == 'list-minimizers':
@@ -56,6 +69,15 @@ elif command == 'list-forms':
     print("    nfa     Non-deterministic finite automata")
     print("    dfa     Minimized deterministic finit automata")
     print("    default Use the default specified for the language")
+elif command == 'compile-unicode':
+    try:
+        unicode_db = UnicodeQuery.find_db()
+        UnicodeDatabase.compile_database(unicode_db)
+    except Exception as e:
+        print("Unable to compile Unicode database: %s\n" % str(e), file=sys.stderr)
+        sys.exit(1)
+    print("Compiled Unicode database to '%s'" % os.path.join(unicode_db, UnicodeDatabase.database_file), file=sys.stderr)
+    sys.exit(0)
     
 # Check minimizer
 if arguments.minimizer not in minimizers:
@@ -63,6 +85,20 @@ if arguments.minimizer not in minimizers:
     sys.exit(1)
 minimizer_description, minimizer = minimizers[arguments.minimizer]
 
+# Check number of jobs
+if arguments.jobs < 0:
+    print("Number of jobs must not be negative\n", file=sys.stderr)
+    sys.exit(1)
+    
+# Set up DFA cache
+cache = None
+if not arguments.no_cache:
+    cache = RulesFile.DFACache(arguments.cache_dir, arguments.cache_size*1024*1024)
+    UnicodeQuery.use_persistent_cache = True
+    
+# Set up profiler
+profiler = Profiler(arguments.profile or arguments.profile_json is not None)
+
 # Load language plug-ins file and list languages if requested
 language_plugins = None
 default_language = None
@@ -93,10 +129,12 @@ rules_file = None
 ir = None
 form = LanguagePlugins.PluginOptions.DFA_IR
 try:
-    rules_file = RulesFile.parse(arguments.RULES_FILE, arguments.encoding)
-    validator = RulesFile.Validator()
-    traverser = RulesFile.Traverser(validator)
-    rules_file.accept(traverser)
+    with profiler.measure("parse"):
+        rules_file = RulesFile.parse(arguments.RULES_FILE, arguments.encoding)
+    with profiler.measure("validate"):
+        validator = RulesFile.Validator()
+        traverser = RulesFile.Traverser(validator)
+        rules_file.accept(traverser)
 except Exception as e:
     print("Error parsing rules file. %s" % str(e), file=sys.stderr)
     sys.exit(1)
@@ -111,9 +149,13 @@ try:
             form = LanguagePlugins.PluginOptions.DFA_IR
     if form not in language_plugin.forms:
         raise Exception("Specified state machine form '{0}' not supported by language plugin".format(arguments.form))
-    ir = RulesFile.NonDeterministicIR(rules_file)
+    with profiler.measure("regex") as counts:
+        ir = RulesFile.NonDeterministicIR(rules_file)
+        counts['sections'] = len(ir.sections)
+        counts['rules'] = sum(len(section.rules) for section in ir.sections.itervalues())
     if form == LanguagePlugins.PluginOptions.DFA_IR:
-        ir = RulesFile.DeterministicIR(ir, minimizer)
+        ir = RulesFile.DeterministicIR(ir, minimizer, arguments.jobs, cache, profiler)
+    UnicodeQuery.save_caches()
 
 except Exception as e:
     print("Error processing rules. %s" % str(e), file=sys.stderr)
@@ -126,13 +168,32 @@ try:
     plugin_options.namespace = arguments.namespace
     plugin_options.file_name = arguments.file_name
     plugin_options.form = form
+    plugin_options.is_token_view = arguments.token_view
+    plugin_options.code_form = arguments.code_form
     
     emitter = language_plugin.create(ir, plugin_options)
     if os.path.normcase(os.path.realpath(arguments.OUTPUT_DIR)) == this_folder:
         print("Output directory cannot be same as executable directory", file=sys.stderr)
         sys.exit(1)
-    executor = LanguagePlugins.Executor(emitter, language_plugin.plugin_files_directory, arguments.OUTPUT_DIR)
-    executor.execute()
+        
+    # Identify everything the output is generated from, so that unchanged files can be skipped
+    inputs = None
+    if arguments.incremental:
+        generator_files = []
+        for directory, directory_names, file_names in os.walk(os.path.join(this_folder, "Generator")):
+            generator_files.extend(os.path.join(directory, i) for i in file_names if i.endswith(".py"))
+        input_files = [arguments.RULES_FILE] + language_plugin.get_source_files() + sorted(generator_files)
+        try:
+            # Classes such as \p{L} are looked up in the Unicode database, so output depends on its version too
+            unicode_fingerprint = UnicodeQuery.instance(UnicodeQuery.find_db()).get_fingerprint()
+        except Exception:
+            # Rules which don't use Unicode properties can be processed without the database
+            unicode_fingerprint = None
+        options = [language, arguments.encoding, arguments.minimizer, form, arguments.class_name, arguments.namespace, arguments.file_name, arguments.token_view, arguments.code_form, unicode_fingerprint]
+        inputs = LanguagePlugins.hash_inputs(input_files, options)
+    executor = LanguagePlugins.Executor(emitter, language_plugin.plugin_files_directory, arguments.OUTPUT_DIR, inputs)
+    with profiler.measure("emit"):
+        executor.execute()
         
 except IOError as e:
     print("Unable to write to output directory because of an error", file=sys.stderr)
@@ -141,3 +202,14 @@ except IOError as e:
 except Exception as e:
     print("Unable to create lexical analyzer: %s" % str(e))
     sys.exit(1)
+
+# Report profile
+if profiler.is_enabled:
+    print(profiler.get_table(), file=sys.stderr)
+    if arguments.profile_json is not None:
+        try:
+            with open(arguments.profile_json, 'w') as f:
+                f.write(profiler.get_json())
+        except IOError as e:
+            print("Unable to write profile: %s" % str(e), file=sys.stderr)
+            sys.exit(1)
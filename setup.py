@@ -20,7 +20,17 @@
 
 import os.path
 import platform
-from cx_Freeze import setup,Executable
+from cx_Freeze import setup,Executable,build_exe
+from Generator.Regex import UnicodeDatabase
+
+class build_exe_with_database(build_exe):
+    """
+    Compiles the Unicode database before building the executable, so that it is shipped compiled and property 
+    lookups do not need to parse JSON
+    """
+    def run(self):
+        UnicodeDatabase.compile_database('UnicodeData')
+        build_exe.run(self)
 
 includefiles = [
     os.path.join('Plugins', 'Plugins.json'),
@@ -82,6 +92,7 @@ includefiles = [
     os.path.join('UnicodeData', 'AliasesProperties.json'),
     os.path.join('UnicodeData', 'AliasesValues.json'),
     os.path.join('UnicodeData', 'BinaryProperties.json'),
+    os.path.join('UnicodeData', UnicodeDatabase.database_file),
     os.path.join('UnicodeData', 'Propertyage.json'),
     os.path.join('UnicodeData', 'Propertyahex.json'),
     os.path.join('UnicodeData', 'Propertyalpha.json'),
@@ -302,7 +313,7 @@ includes = [
     'Generator.Emitter.PluginTemplate'
 ]
 excludes = []
-packages = ['blist']
+packages = []
 target_name = "Poodle-Lex"
 if platform.system() == "Windows":
     target_name += ".exe"
@@ -323,5 +334,6 @@ setup(
             'upgrade_code': '{d7bbdad8-411a-4662-bc31-f5494b9cd11f}'
         }
     }, 
+    cmdclass = {'build_exe': build_exe_with_database},
     executables = [Executable('__main__.py', targetName=target_name)]
 )